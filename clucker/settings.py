@@ -46,22 +46,28 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'microblogs.middleware.RequestMetricsMiddleware',
+    'microblogs.middleware.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'microblogs.middleware.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'clucker.urls'
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -69,23 +75,153 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Templates are compiled once per process unless DEBUG is on.
+            'loaders': TEMPLATE_LOADERS if DEBUG else [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)],
         },
     },
 ]
 
 WSGI_APPLICATION = 'clucker.wsgi.application'
+ASGI_APPLICATION = 'clucker.asgi.application'
+
+# Serve the feed, user list and profiles from async views, for deployments on clucker/asgi.py
+ASYNC_READ_VIEWS = os.environ.get('CLUCKER_ASYNC_VIEWS') == '1'
+
+# Log in from an async view that checks passwords on the password hashing threads, for ASGI deployments
+ASYNC_LOG_IN = os.environ.get('CLUCKER_ASYNC_LOG_IN') == '1'
 
 
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# CLUCKER_DB_PROFILE picks how SQLite connections are set up: 'default' keeps SQLite's defaults and
+# a connection per request; 'tuned' keeps connections open and sets the pragmas below on each new one.
+# WAL lets readers run while a writer commits, and synchronous=NORMAL is durable against application
+# crashes (a power loss may drop the last commits).
+SQLITE_PROFILES = {
+    'default': {
+        'CONN_MAX_AGE': 0,
+        'PRAGMAS': {},
+    },
+    'tuned': {
+        'CONN_MAX_AGE': 600,
+        'PRAGMAS': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 5000,
+            # Negative sizes are in KiB: a 64 MiB page cache per connection.
+            'cache_size': -64000,
+            'mmap_size': 256 * 1024 * 1024,
+            'temp_store': 'MEMORY',
+        },
+    },
+}
+SQLITE_PROFILE = SQLITE_PROFILES[os.environ.get('CLUCKER_DB_PROFILE', 'default')]
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': SQLITE_PROFILE['CONN_MAX_AGE'],
     }
 }
 
+# Pragmas set on every new SQLite connection by microblogs.db.
+SQLITE_PRAGMAS = SQLITE_PROFILE['PRAGMAS']
+
+# CLUCKER_DB_REPLICAS=n reads the feed, user list and profiles from n read-only copies of the
+# database, db.replica1.sqlite3 and up, which `manage.py sync_replicas` keeps in step with it.
+# replica1 is always defined so tests can turn routing on; it mirrors the test database.
+DATABASE_REPLICAS = [f'replica{number}' for number in range(1, int(os.environ.get('CLUCKER_DB_REPLICAS', '0')) + 1)]
+for alias in DATABASE_REPLICAS or ['replica1']:
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f'file:{BASE_DIR / f"db.{alias}.sqlite3"}?mode=ro',
+        'CONN_MAX_AGE': SQLITE_PROFILE['CONN_MAX_AGE'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# CLUCKER_POST_SHARDS=n spreads posts by author over n databases, db.posts1.sqlite3 and up; see
+# microblogs/sharding.py. posts1 and posts2 are always defined so tests can turn sharding on.
+POST_SHARD_COUNT = int(os.environ.get('CLUCKER_POST_SHARDS', '1'))
+POST_SHARDS = [f'posts{number}' for number in range(1, POST_SHARD_COUNT + 1)] if POST_SHARD_COUNT > 1 else ['default']
+for alias in sorted({'posts1', 'posts2', *POST_SHARDS} - {'default'}):
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'db.{alias}.sqlite3',
+        'CONN_MAX_AGE': SQLITE_PROFILE['CONN_MAX_AGE'],
+    }
+
+# Ids of posts on shards are handed out by the default database, this many at a time per process
+POST_ID_BLOCK_SIZE = 100
+
+DATABASE_ROUTERS = ['microblogs.sharding.ShardRouter', 'microblogs.db.ReplicaRouter']
+
+# Seconds a client reads from the default database after writing, a skipped replica waits before
+# it is tried again, and the cookie that marks pinned clients
+REPLICA_PIN_SECONDS = 5
+REPLICA_RETRY_SECONDS = 30
+REPLICA_PIN_COOKIE = 'clucker_primary'
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# CLUCKER_CACHE picks a profile: 'locmem' (an in-process LRU, the default), 'file', or
+# 'external' to use any Django cache backend, e.g. memcached or redis, named by
+# CLUCKER_CACHE_BACKEND and CLUCKER_CACHE_LOCATION. Tests run without a cache, see clucker/test_settings.py.
+
+CACHE_PROFILES = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'clucker',
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {'MAX_ENTRIES': 200000},
+    },
+    'external': {
+        'BACKEND': os.environ.get('CLUCKER_CACHE_BACKEND', 'django.core.cache.backends.memcached.PyMemcacheCache'),
+        'LOCATION': os.environ.get('CLUCKER_CACHE_LOCATION', '127.0.0.1:11211'),
+    },
+    'dummy': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    },
+}
+
+CACHES = {
+    'default': CACHE_PROFILES[os.environ.get('CLUCKER_CACHE', 'locmem')],
+}
+
+# Sessions
+# https://docs.djangoproject.com/en/3.2/topics/http/sessions/
+# CLUCKER_SESSIONS picks where sessions are kept: 'db' (the default) reads the session table on every
+# request, 'cached_db' only on cache misses, 'cache' keeps sessions in the cache alone, so they end when
+# evicted, and 'signed_cookies' keeps them in the client's cookie, where logging out cannot revoke copies.
+# Every engine but 'db' needs a cache shared by all processes, such as CLUCKER_CACHE=external.
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = SESSION_ENGINES[os.environ.get('CLUCKER_SESSIONS', 'db')]
+
+# Caching the logged in user for request.user, turned on with CLUCKER_USER_CACHE=1. Each process has its
+# own locmem cache, where a user changed by another process stays cached, so only turn it on together with
+# a cache shared by all processes, such as CLUCKER_CACHE=external.
+USER_CACHE_ENABLED = os.environ.get('CLUCKER_USER_CACHE') == '1'
+
+# Seconds the logged in user is cached for request.user, unless they are saved first
+USER_CACHE_TIMEOUT = 5 * 60
+
+# Seconds that rendered post rows and profile cards stay cached
+FRAGMENT_CACHE_TIMEOUT = 60 * 60
+
+# Send absolute post timestamps and let the browser format them relative to now
+RELATIVE_TIMESTAMPS_ON_CLIENT = os.environ.get('CLUCKER_CLIENT_TIMESTAMPS') == '1'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -106,6 +242,30 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# https://docs.djangoproject.com/en/3.2/topics/auth/passwords/
+# CLUCKER_PASSWORD_HASHER picks the hasher of new passwords: 'pbkdf2' (the default) runs
+# PASSWORD_PBKDF2_ITERATIONS rounds, set by CLUCKER_PBKDF2_ITERATIONS; 'scrypt' and 'argon2', which needs
+# argon2-cffi installed, are memory-hard and so cost attackers more per unit of server CPU. Every hasher
+# stays listed, so existing passwords still verify and are rehashed with the picked one at log in.
+PASSWORD_HASHER_PROFILES = {
+    'pbkdf2': 'microblogs.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'microblogs.hashers.ScryptPasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+}
+PASSWORD_HASHER = os.environ.get('CLUCKER_PASSWORD_HASHER', 'pbkdf2')
+PASSWORD_HASHERS = [
+    PASSWORD_HASHER_PROFILES[PASSWORD_HASHER],
+    *(hasher for name, hasher in PASSWORD_HASHER_PROFILES.items() if name != PASSWORD_HASHER),
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get('CLUCKER_PBKDF2_ITERATIONS', '260000'))
+
+# Threads that the async log in view checks passwords on, by default one per CPU
+PASSWORD_HASHING_THREADS = None
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
 
@@ -148,6 +308,51 @@ message_constants.DEBUG: 'dark',
 message_constants.ERROR: 'danger',
 }
 
+# Runs the tests with the overrides in clucker/test_settings.py
+TEST_RUNNER = 'microblogs.tests.runner.TestRunner'
+
 # Page lengths
 USERS_PER_PAGE = 10
 POSTS_PER_PAGE = 20
+
+# Seconds the user count and page anchors of the user list are cached, unless a user signs up or is renamed first
+USER_LIST_CACHE_TIMEOUT = 5 * 60
+# Largest page the JSON API serves, and the number of rows serialized and sent per streamed chunk
+API_MAX_PAGE_SIZE = 1000
+API_STREAM_CHUNK_SIZE = 100
+
+# Search: the index class (by default FTS5 on SQLite, otherwise in memory), query terms, the newest
+# matches ranked per query, and page sizes
+SEARCH_BACKEND = os.environ.get('CLUCKER_SEARCH_BACKEND')
+SEARCH_MAX_TERMS = 8
+SEARCH_RANK_CANDIDATES = 10000
+SEARCH_RESULTS_PER_PAGE = 20
+SEARCH_USERS_SHOWN = 5
+
+# Most users one bulk follow request may follow or unfollow
+BULK_FOLLOW_MAX_USERS = 1000
+
+# Throttling of the views that write: (requests, seconds) allowed per logged in user, or per client IP
+# when logged out. REMOTE_ADDR must hold the client address, so a reverse proxy has to set it. The
+# in-process backend keeps token buckets for the THROTTLE_MAX_CLIENTS most recent clients of each
+# process; 'microblogs.throttling.CacheThrottle' counts in the cache, across processes sharing it.
+THROTTLE_ENABLED = True
+THROTTLE_BACKEND = 'microblogs.throttling.InProcessThrottle'
+THROTTLE_MAX_CLIENTS = 100000
+THROTTLE_RATES = {
+    'new_post': (10, 60),
+    'follow': (60, 60),
+    'log_in': (10, 60),
+}
+
+# Live feed updates, turned on with CLUCKER_LIVE_UPDATES=1 for deployments on clucker/asgi.py, where waiting
+# requests do not each hold a worker: the pub/sub broker class, and how long an update request waits for a new post
+LIVE_UPDATES_ENABLED = os.environ.get('CLUCKER_LIVE_UPDATES') == '1'
+LIVE_UPDATES_BROKER = 'microblogs.live.InProcessBroker'
+LIVE_UPDATES_TIMEOUT = 25
+
+# Per-request query and timing instrumentation, opted into with CLUCKER_REQUEST_METRICS=1.
+# Each process flushes its histograms to REQUEST_METRICS_DIR for the request_metrics command.
+REQUEST_METRICS_ENABLED = os.environ.get('CLUCKER_REQUEST_METRICS') == '1'
+REQUEST_METRICS_DIR = BASE_DIR / 'request_metrics'
+REQUEST_METRICS_FLUSH_EVERY = 100
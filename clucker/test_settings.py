@@ -0,0 +1,15 @@
+"""Settings for running the tests.
+
+Test runners that take a settings module, such as pytest-django, can use this
+module as DJANGO_SETTINGS_MODULE; `manage.py test` applies TEST_SETTINGS on top
+of the usual settings through TEST_RUNNER.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import CACHE_PROFILES
+
+# Tests run without a cache and without throttling, and turn them on with override_settings where they test them.
+TEST_SETTINGS = {
+    'CACHES': {'default': CACHE_PROFILES['dummy']},
+    'THROTTLE_ENABLED': False,
+}
+globals().update(TEST_SETTINGS)
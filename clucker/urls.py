@@ -13,21 +13,39 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path
-from microblogs import views
+from microblogs import api, views
+
+if settings.ASYNC_READ_VIEWS:
+    feed_view = views.feed_async
+    user_list_view = views.user_list_async
+    show_user_view = views.show_user_async
+else:
+    feed_view = views.feed
+    user_list_view = views.UserListView.as_view()
+    show_user_view = views.ShowUserView.as_view()
+
+log_in_view = views.log_in_async if settings.ASYNC_LOG_IN else views.LogInView.as_view()
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', views.home, name='home'),
-    path('feed/', views.feed, name='feed'),
+    path('feed/', feed_view, name='feed'),
+    path('feed/updates/', views.feed_updates, name='feed_updates'),
     path('follow_toggle/<int:user_id>/', views.follow_toggle, name='follow_toggle'),
     path('new_post/', views.new_post, name='new_post'),
-    path('users/', views.UserListView.as_view(), name='user_list'),
-    path('user/<int:user_id>/', views.ShowUserView.as_view(), name='show_user'),
-    path('log_in/', views.LogInView.as_view(), name='log_in'),
+    path('users/', user_list_view, name='user_list'),
+    path('search/', views.search, name='search'),
+    path('user/<int:user_id>/', show_user_view, name='show_user'),
+    path('log_in/', log_in_view, name='log_in'),
     path('log_out/', views.log_out, name='log_out'),
     path('sign_up/', views.SignUpView.as_view(), name='sign_up'),
     path('update_profile/', views.ProfileUpdateView.as_view(), name='update_profile'),
     path('update_password/', views.update_password, name='update_password'),
+    path('api/feed/', api.feed, name='api_feed'),
+    path('api/users/', api.user_list, name='api_users'),
+    path('api/user/<int:user_id>/posts/', api.user_posts, name='api_user_posts'),
+    path('api/follows/', api.follows, name='api_follows'),
 ]
@@ -0,0 +1,201 @@
+"""JSON API for the feed, user posts and the user list, and for bulk follows.
+
+Rows are read with values() querysets and serialized straight from the
+resulting dicts, without instantiating models. Each page is read in the view,
+then its JSON is streamed in chunks as it is serialized. Pages use the same
+cursors as the HTML views: ?before=<cursor> for the older page, ?after=<cursor>
+for the newer.
+"""
+import json
+from functools import wraps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET, require_POST
+from .gravatar import gravatar_url
+from .models import User, Post
+from .pagination import CursorPaginator, cursor_paginator
+from .sharding import is_sharded
+from .throttling import throttle
+
+POST_COLUMNS = ('id', 'text', 'created_at', 'author_id')
+AUTHOR_FIELDS = ('username', 'first_name', 'last_name', 'gravatar_hash')
+POST_FIELDS = (*POST_COLUMNS, *(f'author__{field}' for field in AUTHOR_FIELDS))
+USER_FIELDS = ('id', 'username', 'first_name', 'last_name', 'bio', 'gravatar_hash', 'date_joined')
+
+_encoder = DjangoJSONEncoder(ensure_ascii=False)
+
+def api_login_required(view_function):
+    """Decorator that answers anonymous API requests with 401 instead of redirecting to the log in page."""
+    @wraps(view_function)
+    def modified_view_function(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required.'}, status=401)
+        return view_function(request, *args, **kwargs)
+    return modified_view_function
+
+def page_size(request, default):
+    """Returns the page size asked for by the limit parameter, capped at API_MAX_PAGE_SIZE."""
+    try:
+        limit = int(request.GET.get('limit', default))
+    except ValueError:
+        return default
+    return max(1, min(limit, settings.API_MAX_PAGE_SIZE))
+
+def serialize_post(row):
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'created_at': row['created_at'],
+        'author': {
+            'id': row['author_id'],
+            'username': row['author__username'],
+            'full_name': f"{row['author__first_name']} {row['author__last_name']}",
+            'gravatar': gravatar_url(row['author__gravatar_hash'], 60),
+        },
+    }
+
+def serialize_user(row):
+    return {
+        'id': row['id'],
+        'username': row['username'],
+        'full_name': f"{row['first_name']} {row['last_name']}",
+        'bio': row['bio'],
+        'gravatar': gravatar_url(row['gravatar_hash'], 60),
+    }
+
+def post_fields():
+    """Returns the fields to read of posts: POST_FIELDS, or only POST_COLUMNS if authors are on another database."""
+    return POST_COLUMNS if is_sharded() else POST_FIELDS
+
+def with_authors(rows):
+    """Yields post rows read without their author fields with those filled in, reading authors once per chunk."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == settings.API_STREAM_CHUNK_SIZE:
+            yield from _add_authors(chunk)
+            chunk = []
+    if chunk:
+        yield from _add_authors(chunk)
+
+def _add_authors(rows):
+    authors = User.objects.filter(pk__in={row['author_id'] for row in rows}).values('id', *AUTHOR_FIELDS)
+    authors = {author['id']: author for author in authors}
+    for row in rows:
+        author = authors[row['author_id']]
+        row.update({f'author__{field}': author[field] for field in AUTHOR_FIELDS})
+    return rows
+
+def stream_page(page, serialize):
+    """Yields a JSON page of the serialized objects, API_STREAM_CHUNK_SIZE objects per chunk.
+
+    The page must already be read: under ASGI the response is iterated in the
+    event loop, where queries cannot run.
+    """
+    yield '{"results": ['
+    chunk = []
+    separator = ''
+    for obj in page:
+        chunk.append(separator + _encoder.encode(serialize(obj)))
+        separator = ', '
+        if len(chunk) == settings.API_STREAM_CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+    yield f'], "older": {json.dumps(page.older_cursor)}, "newer": {json.dumps(page.newer_cursor)}}}'
+
+def streamed_page_response(request, paginator, serialize, prepare=None):
+    """Reads a page of at most API_MAX_PAGE_SIZE rows, and streams it serialized.
+
+    prepare, if given, takes the rows of the page and returns them ready for serialize.
+    """
+    page = paginator.page(before=request.GET.get('before'), after=request.GET.get('after'))
+    if prepare:
+        page.object_list = list(prepare(page.object_list))
+    return StreamingHttpResponse(stream_page(page, serialize), content_type='application/json')
+
+def streamed_posts_response(request, paginator):
+    """Streams a page of post rows read with post_fields()."""
+    return streamed_page_response(request, paginator, serialize_post, with_authors if is_sharded() else None)
+
+@require_GET
+@api_login_required
+def feed(request):
+    """API view for the posts on the user's timeline, newest first."""
+    paginator = cursor_paginator(
+        [
+            posts.values(*post_fields(), 'timeline_created_at', 'timeline_post_id')
+            for posts in request.user.timeline_shards()
+        ],
+        per_page=page_size(request, settings.POSTS_PER_PAGE),
+        key=('timeline_created_at', 'timeline_post_id'),
+    )
+    return streamed_posts_response(request, paginator)
+
+@require_GET
+@api_login_required
+def user_posts(request, user_id):
+    """API view for the posts of a user, newest first."""
+    if not User.objects.filter(id=user_id).exists():
+        return JsonResponse({'error': 'User not found.'}, status=404)
+    posts = Post.objects.filter(author_id=user_id).values(*post_fields())
+    paginator = CursorPaginator(posts, per_page=page_size(request, settings.POSTS_PER_PAGE))
+    return streamed_posts_response(request, paginator)
+
+@require_GET
+@api_login_required
+def user_list(request):
+    """API view for all users, most recently joined first."""
+    users = User.objects.values(*USER_FIELDS)
+    paginator = CursorPaginator(
+        users,
+        per_page=page_size(request, settings.USERS_PER_PAGE),
+        key=('date_joined', 'id'),
+    )
+    return streamed_page_response(request, paginator, serialize_user)
+
+def user_id_list(value):
+    """Returns value as a list of user ids, or None if it is not a list of integers."""
+    if value is None:
+        return []
+    if not isinstance(value, list) or not all(type(user_id) is int for user_id in value):
+        return None
+    return value
+
+@require_POST
+@api_login_required
+@throttle('follow', as_json=True)
+def follows(request):
+    """API view that follows and unfollows many users at once.
+
+    The body is a JSON object with lists of user ids under "follow" and
+    "unfollow", applied in one transaction. Following a followed user or
+    unfollowing one that is not followed does nothing, so requests can be
+    retried safely.
+    """
+    try:
+        body = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'The body must be JSON.'}, status=400)
+    follow = user_id_list(body.get('follow')) if isinstance(body, dict) else None
+    unfollow = user_id_list(body.get('unfollow')) if isinstance(body, dict) else None
+    if follow is None or unfollow is None:
+        return JsonResponse({'error': '"follow" and "unfollow" must be lists of user ids.'}, status=400)
+    if set(follow) & set(unfollow):
+        return JsonResponse({'error': 'A user cannot be both followed and unfollowed.'}, status=400)
+    if len(follow) + len(unfollow) > settings.BULK_FOLLOW_MAX_USERS:
+        return JsonResponse({'error': f'At most {settings.BULK_FOLLOW_MAX_USERS} users per request.'}, status=400)
+    user = request.user
+    with transaction.atomic():
+        unfollowed = user.unfollow_many(unfollow)
+        followed = user.follow_many(follow)
+        following = user.following_ids(follow + unfollow)
+    return JsonResponse({
+        'followed': sorted(followed),
+        'unfollowed': sorted(unfollowed),
+        'following': sorted(following),
+        'followee_count': user.followee_count(),
+    })
@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete
 
 
 class MicroblogsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'microblogs'
+
+    def ready(self):
+        from .auth import forget_deleted_user
+        from .db import apply_sqlite_pragmas
+        from .models import invalidate_user_list
+        from .sharding import delete_author_posts
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='microblogs.apply_sqlite_pragmas')
+        post_delete.connect(delete_author_posts, sender='microblogs.User', dispatch_uid='microblogs.delete_author_posts')
+        post_delete.connect(forget_deleted_user, sender='microblogs.User', dispatch_uid='microblogs.forget_deleted_user')
+        post_delete.connect(invalidate_user_list, sender='microblogs.User', dispatch_uid='microblogs.invalidate_user_list')
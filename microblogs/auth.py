@@ -0,0 +1,62 @@
+"""Loading the user of a request from the cache instead of the database.
+
+With USER_CACHE_ENABLED, the logged in user is cached by id for
+USER_CACHE_TIMEOUT seconds. Saving or deleting a user, and changing their
+follow counts, forgets the cached copy.
+"""
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.crypto import constant_time_compare
+from .db import read_from_default
+
+def _user_key(user_id):
+    return f'session_user:{user_id}'
+
+def get_user(request):
+    """Returns the user of the request like django.contrib.auth.get_user, reading it from the cache when cached."""
+    if not settings.USER_CACHE_ENABLED:
+        return _load_user(request)
+    user_id = request.session.get(SESSION_KEY)
+    user = cache.get(_user_key(user_id)) if user_id is not None else None
+    if user is not None and _session_matches(request, user):
+        return user
+    # Loaded and checked by Django, which also flushes sessions whose password has changed.
+    user = _load_user(request)
+    if user.is_authenticated:
+        cache.set(_user_key(user.pk), user, settings.USER_CACHE_TIMEOUT)
+    return user
+
+def _load_user(request):
+    """Loads the user of the request with django.contrib.auth.get_user, from the default database.
+
+    Like sessions, the user is never read from a replica, whose copy may still
+    have the password of before an update and keep other sessions logged in.
+    """
+    with read_from_default():
+        return auth.get_user(request)
+
+def _session_matches(request, user):
+    """Returns whether the session was logged in as the cached user, with their current password."""
+    session_hash = request.session.get(HASH_SESSION_KEY)
+    return (
+        request.session.get(BACKEND_SESSION_KEY) in settings.AUTHENTICATION_BACKENDS
+        and session_hash is not None
+        and constant_time_compare(session_hash, user.get_session_auth_hash())
+    )
+
+def forget_cached_users(user_ids):
+    """Drops the cached copies of the given users, now and again once the current transaction commits.
+
+    The second time covers requests that read the old rows and cached them
+    before the change was committed.
+    """
+    keys = [_user_key(user_id) for user_id in user_ids]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+def forget_deleted_user(sender, instance, **kwargs):
+    """Drops the cached copy of a deleted user; connected to post_delete of User."""
+    forget_cached_users([instance.pk])
@@ -0,0 +1,157 @@
+"""Per-connection database setup, and routing of reads to replicas.
+
+Views decorated with read_from_replica read from one of DATABASE_REPLICAS,
+unless the request wrote first or came within REPLICA_PIN_SECONDS of a write
+by the same client, which ReplicaPinningMiddleware marks with a cookie, so
+clients always see their own writes. Every write goes to the default database.
+A replica that cannot be reached is skipped for REPLICA_RETRY_SECONDS, and a
+view that fails on a replica is run again on the default database.
+"""
+import asyncio
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+_routing = ContextVar('replica_routing', default=None)
+_replica_down_until = {}
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Sets SQLITE_PRAGMAS on a new SQLite connection; connected to connection_created."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            # Pragma values cannot be bound as parameters; they come from settings, not user input.
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+class ReplicaRouting:
+    """Where the reads of the current request go, and whether it has written."""
+
+    def __init__(self):
+        self.replica = None
+        self.wrote = False
+
+def current_routing():
+    """Returns the routing of the current request, or None outside ReplicaPinningMiddleware."""
+    return _routing.get()
+
+def start_routing():
+    """Starts routing the current request; returns the routing and a token for end_routing."""
+    routing = ReplicaRouting()
+    return routing, _routing.set(routing)
+
+def end_routing(token):
+    _routing.reset(token)
+
+@contextmanager
+def read_from_default():
+    """Sends the reads of the current request to the default database within the block."""
+    routing = _routing.get()
+    if routing is None or routing.replica is None:
+        yield
+        return
+    replica, routing.replica = routing.replica, None
+    try:
+        yield
+    finally:
+        routing.replica = replica
+
+def healthy_replica():
+    """Returns the alias of a replica that accepts connections, or None if none does."""
+    now = time.monotonic()
+    replicas = [alias for alias in settings.DATABASE_REPLICAS if _replica_down_until.get(alias, 0) <= now]
+    random.shuffle(replicas)
+    for alias in replicas:
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            mark_replica_down(alias)
+        else:
+            return alias
+    return None
+
+def mark_replica_down(alias):
+    """Stops sending reads to a replica for REPLICA_RETRY_SECONDS."""
+    logger.warning('Database replica %s is unavailable; reading from %s instead.', alias, DEFAULT_DB_ALIAS)
+    _replica_down_until[alias] = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+
+class ReplicaRouter:
+    """Sends the reads of replica-routed requests to a replica, and everything else to the default database."""
+
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        # Sessions stay on the default database, so a lagging replica cannot log a client out.
+        if routing is None or routing.replica is None or routing.wrote or model._meta.app_label == 'sessions':
+            return DEFAULT_DB_ALIAS
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold copies of the same rows.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas, replica1 and up, get their schema along with their data from sync_replicas.
+        return not db.startswith('replica')
+
+def _replica_for(request):
+    """Returns the replica to read from for request, or None to read from the default database."""
+    routing = _routing.get()
+    if (routing is None or routing.wrote or request.method not in ('GET', 'HEAD')
+            or settings.REPLICA_PIN_COOKIE in request.COOKIES):
+        return None
+    return healthy_replica()
+
+def _render(response):
+    # Render template responses while still routed, since their querysets are read as they render.
+    if callable(getattr(response, 'render', None)):
+        response = response.render()
+    return response
+
+def read_from_replica(view):
+    """Decorator for read-only views whose queries may be served by a replica."""
+    if asyncio.iscoroutinefunction(view):
+        @wraps(view)
+        async def replica_view(request, *args, **kwargs):
+            replica = await sync_to_async(_replica_for)(request)
+            if replica is None:
+                return await view(request, *args, **kwargs)
+            routing = _routing.get()
+            routing.replica = replica
+            try:
+                return _render(await view(request, *args, **kwargs))
+            except DatabaseError:
+                mark_replica_down(replica)
+            finally:
+                routing.replica = None
+            return await view(request, *args, **kwargs)
+        return replica_view
+
+    @wraps(view)
+    def replica_view(request, *args, **kwargs):
+        replica = _replica_for(request)
+        if replica is None:
+            return view(request, *args, **kwargs)
+        routing = _routing.get()
+        routing.replica = replica
+        try:
+            return _render(view(request, *args, **kwargs))
+        except DatabaseError:
+            mark_replica_down(replica)
+        finally:
+            routing.replica = None
+        return view(request, *args, **kwargs)
+    return replica_view
@@ -0,0 +1,55 @@
+"""Caching of rendered post rows and profile cards.
+
+Fragments are cached under keys that embed a digest of every value they show,
+taken from the same objects they are rendered from. Changing a user changes
+the keys of their fragments, so stale fragments are never read again and
+simply age out of the cache.
+"""
+from hashlib import md5
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.html import escape
+from .rendering import post_row_template, render_post_row
+
+# Stands in for the post timestamp in cached rows, which is relative to the time of rendering.
+TIMESTAMP_PLACEHOLDER = 'CLUCKER-POST-TIMESTAMP'
+
+def _digest(*values):
+    """Returns a short digest of the given values, to key a fragment on what it shows."""
+    return md5('\0'.join(map(str, values)).encode()).hexdigest()
+
+def render_post_rows(posts, format_timestamp):
+    """Returns the table rows of the given posts, rendering only the rows that are not cached."""
+    posts = list(posts)
+    mode = int(settings.RELATIVE_TIMESTAMPS_ON_CLIENT)
+    keys = [
+        f'post_row:{post.id}:{post.created_at.timestamp()}:{_digest(*post.author_card)}:{mode}' for post in posts
+    ]
+    cached = cache.get_many(keys)
+    rendered = {}
+    template = post_row_template()
+    for key, post in zip(keys, posts):
+        if key not in cached:
+            rendered[key] = render_post_row(template, post, TIMESTAMP_PLACEHOLDER)
+    if rendered:
+        cache.set_many(rendered, timeout=settings.FRAGMENT_CACHE_TIMEOUT)
+        cached.update(rendered)
+    return ''.join(
+        cached[key].replace(TIMESTAMP_PLACEHOLDER, escape(str(format_timestamp(post.created_at))))
+        for key, post in zip(keys, posts)
+    )
+
+def render_profile_card(user, following, followable):
+    """Returns the profile card of user, from the cache when it is unchanged."""
+    shown = _digest(
+        user.gravatar(), user.first_name, user.full_name(), user.username, user.bio,
+        user.followee_count(), user.follower_count(),
+    )
+    key = f'profile_card:{user.pk}:{shown}:{int(following)}:{int(followable)}'
+    card = cache.get(key)
+    if card is None:
+        context = {'user': user, 'following': following, 'followable': followable}
+        card = get_template('partials/user_profile.html').render(context)
+        cache.set(key, card, timeout=settings.FRAGMENT_CACHE_TIMEOUT)
+    return card
@@ -0,0 +1,16 @@
+"""Gravatar URL building from a stored email hash."""
+from functools import lru_cache
+from hashlib import md5
+
+GRAVATAR_URL = 'https://www.gravatar.com/avatar/{hash}?size={size}&default=mp'
+
+def email_hash(email):
+    """Returns the gravatar hash of an email address."""
+    return md5(email.strip().lower().encode('utf-8')).hexdigest()
+
+@lru_cache(maxsize=8192)
+def gravatar_url(hash, size):
+    """Returns the URL of the gravatar with the given hash, at the given size."""
+    if not 0 < size < 2048:
+        raise ValueError('Invalid image size.')
+    return GRAVATAR_URL.format(hash=hash, size=size)
@@ -0,0 +1,137 @@
+"""Password hashers, and password checks run on dedicated threads.
+
+PASSWORD_HASHERS lists every hasher below, with the one picked by
+CLUCKER_PASSWORD_HASHER first. Django hashes new passwords with the first one
+and rehashes a password with it when its user logs in, so changing the hasher
+or its cost upgrades users as they come back.
+"""
+import asyncio
+import base64
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.utils.crypto import constant_time_compare
+from django.utils.translation import gettext_noop as _
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """Django's PBKDF2 SHA256 hasher, run for PASSWORD_PBKDF2_ITERATIONS iterations."""
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+class ScryptPasswordHasher(hashers.BasePasswordHasher):
+    """Memory-hard hashing with scrypt, as added to Django in 4.0.
+
+    A work factor of 2 ** 14 with a block size of 8 takes 16 MiB per hash.
+    """
+    algorithm = 'scrypt'
+    work_factor = 2 ** 14
+    block_size = 8
+    parallelism = 1
+    maximum_memory = 64 * 1024 * 1024
+
+    def encode(self, password, salt, work_factor=None, block_size=None, parallelism=None):
+        assert password is not None
+        assert salt and '$' not in salt
+        work_factor = work_factor or self.work_factor
+        block_size = block_size or self.block_size
+        parallelism = parallelism or self.parallelism
+        hash = hashlib.scrypt(
+            password.encode(), salt=salt.encode(), n=work_factor, r=block_size, p=parallelism,
+            maxmem=self.maximum_memory, dklen=64,
+        )
+        hash = base64.b64encode(hash).decode('ascii').strip()
+        return f'{self.algorithm}${work_factor}${salt}${block_size}${parallelism}${hash}'
+
+    def decode(self, encoded):
+        algorithm, work_factor, salt, block_size, parallelism, hash = encoded.split('$', 5)
+        assert algorithm == self.algorithm
+        return {
+            'algorithm': algorithm,
+            'work_factor': int(work_factor),
+            'salt': salt,
+            'block_size': int(block_size),
+            'parallelism': int(parallelism),
+            'hash': hash,
+        }
+
+    def verify(self, password, encoded):
+        decoded = self.decode(encoded)
+        encoded_2 = self.encode(
+            password, decoded['salt'], decoded['work_factor'], decoded['block_size'], decoded['parallelism'],
+        )
+        return constant_time_compare(encoded, encoded_2)
+
+    def safe_summary(self, encoded):
+        decoded = self.decode(encoded)
+        return {
+            _('algorithm'): decoded['algorithm'],
+            _('work factor'): decoded['work_factor'],
+            _('block size'): decoded['block_size'],
+            _('parallelism'): decoded['parallelism'],
+            _('salt'): hashers.mask_hash(decoded['salt']),
+            _('hash'): hashers.mask_hash(decoded['hash']),
+        }
+
+    def must_update(self, encoded):
+        decoded = self.decode(encoded)
+        return (
+            decoded['work_factor'] != self.work_factor
+            or decoded['block_size'] != self.block_size
+            or decoded['parallelism'] != self.parallelism
+            or hashers.must_update_salt(decoded['salt'], self.salt_entropy)
+        )
+
+    def harden_runtime(self, password, encoded):
+        # The cost of scrypt cannot be topped up like the iterations of PBKDF2.
+        pass
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def hashing_executor():
+    """Returns the pool of PASSWORD_HASHING_THREADS threads that offloaded password hashing runs on."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASHING_THREADS or os.cpu_count(),
+                thread_name_prefix='password-hashing',
+            )
+        return _executor
+
+async def run_hashing(function, *args):
+    """Runs function, which must not touch the database, on the password hashing threads."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(hashing_executor(), function, *args)
+
+async def authenticate_offloaded(username, password):
+    """Returns the active user with the given username and password, or None, like ModelBackend.
+
+    The user is read from the database on the usual thread, and the password
+    checked on the password hashing threads, so that hashing neither blocks the
+    event loop nor the thread that sync views and queries share under ASGI.
+    The returned user has its backend set for login().
+    """
+    from .models import User
+    user = await sync_to_async(User.objects.filter(username=username).first)()
+    if user is None:
+        # Hash once anyway, so unknown usernames take as long as wrong passwords.
+        await run_hashing(hashers.make_password, password)
+        return None
+    upgraded = []
+    valid = await run_hashing(
+        hashers.check_password, password, user.password, lambda raw: upgraded.append(hashers.make_password(raw)),
+    )
+    if not valid or not user.is_active:
+        return None
+    if upgraded:
+        user.password = upgraded[0]
+        await sync_to_async(user.save)(update_fields=['password'])
+    user.backend = 'django.contrib.auth.backends.ModelBackend'
+    return user
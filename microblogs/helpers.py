@@ -1,6 +1,9 @@
+from collections import namedtuple
 from django.conf import settings
 from django.shortcuts import redirect
 
+AuthorCard = namedtuple('AuthorCard', ['full_name', 'username', 'mini_gravatar'])
+
 def login_prohibited(view_function):
     def modified_view_function(request):
         if request.user.is_authenticated:
@@ -28,3 +31,15 @@ class LoginProhibitedMixin:
             raise ImproperlyConfigured("LoginProhibitedMixin requires value")
         else:
             return self.redirect_when_logged_in_url
+
+def attach_author_cards(posts):
+    """Attach a render payload to each post, computed once per distinct author."""
+    cards = {}
+    for post in posts:
+        card = cards.get(post.author_id)
+        if card is None:
+            author = post.author
+            card = AuthorCard(author.full_name(), author.username, author.mini_gravatar())
+            cards[post.author_id] = card
+        post.author_card = card
+    return posts
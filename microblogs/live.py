@@ -0,0 +1,76 @@
+"""Publish/subscribe of new timeline entries, for live feed updates.
+
+Fanning out a post publishes the ids of the users whose timelines it was
+added to, once the transaction commits. Feed update requests wait on a
+subscription for their user instead of re-reading the feed until something
+arrives. The broker class is set by LIVE_UPDATES_BROKER; the in-process broker
+only reaches subscribers in the process that saved the post.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+class Subscription:
+    """A wait for the timeline of a user to change, bound to the running event loop."""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+
+    def notify(self):
+        """Wakes the waiter; safe to call from any thread."""
+        try:
+            self._loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError:
+            # The loop of the waiter has already closed.
+            pass
+
+    async def wait(self, timeout):
+        """Returns whether the timeline changed within timeout seconds."""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+class InProcessBroker:
+    """Delivers notifications to the subscriptions made in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, user_id):
+        """Returns a Subscription to the timeline of user_id; call from a coroutine."""
+        subscription = Subscription(user_id)
+        with self._lock:
+            self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def publish(self, user_ids):
+        """Notifies the subscribers of each of the given users' timelines."""
+        with self._lock:
+            subscriptions = [
+                subscription
+                for user_id in user_ids
+                for subscription in self._subscriptions.get(user_id, ())
+            ]
+        for subscription in subscriptions:
+            subscription.notify()
+
+@lru_cache(maxsize=None)
+def get_broker():
+    """Returns the broker configured by LIVE_UPDATES_BROKER."""
+    return import_string(settings.LIVE_UPDATES_BROKER)()
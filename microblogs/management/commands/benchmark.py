@@ -0,0 +1,158 @@
+import json
+import random
+import statistics
+import time
+from io import StringIO
+from pathlib import Path
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment,
+)
+from django.urls import reverse
+from microblogs.management.commands.seed import SEED_USERNAME_PREFIX
+from microblogs.models import User
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'
+
+def percentile(samples, fraction):
+    """Returns the nearest-rank percentile of the samples."""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+class Command(BaseCommand):
+    help = 'Seed a throwaway test database and measure latency, queries and throughput of the core views.'
+
+    scenarios = ['feed', 'show_user', 'user_list', 'follow_toggle', 'new_post']
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000, help='Number of seeded users.')
+        parser.add_argument('--posts-per-user', type=float, default=10, help='Mean number of seeded posts per user.')
+        parser.add_argument('--follows-per-user', type=float, default=20, help='Mean number of seeded followees per user.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the dataset and the request mix.')
+        parser.add_argument('--requests', type=int, default=200, help='Measured requests per scenario.')
+        parser.add_argument('--warmup', type=int, default=20, help='Unmeasured requests per scenario.')
+        parser.add_argument('--scenario', action='append', choices=self.scenarios, help='Only run these scenarios.')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='Baseline file to compare against.')
+        parser.add_argument('--save-baseline', action='store_true', help='Store the results as the new baseline.')
+        parser.add_argument('--tolerance', type=float, default=0.5, help='Allowed fractional p90 latency increase.')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.random = random.Random(options['seed'])
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            # One client sends every request, which the rate limits would soon answer with 429.
+            with override_settings(THROTTLE_ENABLED=False):
+                self._seed()
+                results = {name: self._run(name) for name in options['scenario'] or self.scenarios}
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        self._print(results)
+        report = {'dataset': self._dataset(), 'results': results}
+        if options['save_baseline']:
+            path = Path(options['baseline'])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(report, indent=2) + '\n')
+            self.stdout.write(f'Saved baseline to {path}.')
+        else:
+            self._compare(report)
+
+    def _dataset(self):
+        return {key: self.options[key] for key in ('users', 'posts_per_user', 'follows_per_user', 'seed')}
+
+    def _seed(self):
+        self.stdout.write('Seeding benchmark database...')
+        call_command(
+            'seed',
+            users=self.options['users'],
+            posts_per_user=self.options['posts_per_user'],
+            follows_per_user=self.options['follows_per_user'],
+            seed=self.options['seed'],
+            stdout=StringIO(),
+        )
+        seeded = User.objects.filter(username__startswith=SEED_USERNAME_PREFIX)
+        # The reader follows the most accounts; the celebrity has the most followers.
+        self.reader = seeded.order_by('-num_followees', 'id').first()
+        self.celebrity = seeded.order_by('-num_followers', 'id').first()
+        self.max_user_id = seeded.aggregate(last=Max('id'))['last']
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def _run(self, name):
+        request = getattr(self, f'_request_{name}')
+        for _ in range(self.options['warmup']):
+            request()
+        timings = []
+        query_counts = []
+        started = time.perf_counter()
+        for _ in range(self.options['requests']):
+            with CaptureQueriesContext(connection) as queries:
+                request_started = time.perf_counter()
+                response = request()
+                timings.append((time.perf_counter() - request_started) * 1000)
+            if response.status_code >= 400:
+                raise CommandError(f'{name} responded with status {response.status_code}.')
+            query_counts.append(len(queries))
+        elapsed = time.perf_counter() - started
+        return {
+            'p50_ms': round(percentile(timings, 0.50), 2),
+            'p90_ms': round(percentile(timings, 0.90), 2),
+            'p99_ms': round(percentile(timings, 0.99), 2),
+            'mean_ms': round(statistics.mean(timings), 2),
+            'queries': max(query_counts),
+            'throughput_rps': round(len(timings) / elapsed, 1),
+        }
+
+    def _request_feed(self):
+        return self.client.get(reverse('feed'))
+
+    def _request_show_user(self):
+        return self.client.get(reverse('show_user', kwargs={'user_id': self.celebrity.id}))
+
+    def _request_user_list(self):
+        pages = max(1, self.options['users'] // settings.USERS_PER_PAGE)
+        return self.client.get(reverse('user_list'), {'page': self.random.randint(1, pages)})
+
+    def _request_follow_toggle(self):
+        user_id = self.random.randint(1, self.max_user_id)
+        return self.client.get(reverse('follow_toggle', kwargs={'user_id': user_id}))
+
+    def _request_new_post(self):
+        return self.client.post(reverse('new_post'), {'text': f'Benchmark cluck {self.random.random()}'})
+
+    def _print(self, results):
+        columns = ['p50_ms', 'p90_ms', 'p99_ms', 'mean_ms', 'queries', 'throughput_rps']
+        self.stdout.write(f"{'scenario':<15}" + ''.join(f'{column:>16}' for column in columns))
+        for name, result in results.items():
+            self.stdout.write(f'{name:<15}' + ''.join(f'{result[column]:>16}' for column in columns))
+
+    def _compare(self, report):
+        path = Path(self.options['baseline'])
+        if not path.exists():
+            self.stdout.write(f'No baseline at {path}; run with --save-baseline to create one.')
+            return
+        baseline = json.loads(path.read_text())
+        if baseline['dataset'] != report['dataset']:
+            self.stdout.write('Baseline was recorded with a different dataset; skipping comparison.')
+            return
+        regressions = []
+        for name, result in report['results'].items():
+            expected = baseline['results'].get(name)
+            if expected is None:
+                continue
+            if result['queries'] > expected['queries']:
+                regressions.append(f"{name}: {result['queries']} queries, baseline {expected['queries']}")
+            allowed = expected['p90_ms'] * (1 + self.options['tolerance'])
+            if result['p90_ms'] > allowed:
+                regressions.append(f"{name}: p90 {result['p90_ms']}ms, baseline {expected['p90_ms']}ms")
+        if regressions:
+            raise CommandError('Performance regressions:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('No regressions against baseline.'))
@@ -0,0 +1,137 @@
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from io import StringIO
+from pathlib import Path
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection, connections
+from django.db.utils import OperationalError
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from microblogs.management.commands.benchmark import percentile
+from microblogs.management.commands.seed import SEED_USERNAME_PREFIX
+from microblogs.models import User
+
+class Command(BaseCommand):
+    help = 'Run a mixed read/write load from many threads against a throwaway SQLite file with each connection profile.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500, help='Number of seeded users.')
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent clients.')
+        parser.add_argument('--seconds', type=float, default=10, help='Duration of the load per profile.')
+        parser.add_argument('--write-fraction', type=float, default=0.2, help='Fraction of requests that write.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the dataset and the request mix.')
+        parser.add_argument(
+            '--profile', action='append', choices=list(settings.SQLITE_PROFILES),
+            help='Only run these connection profiles.',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The concurrency benchmark compares SQLite connection profiles.')
+        self.options = options
+        directory = tempfile.mkdtemp(prefix='clucker-benchmark-')
+        settings_dict = connection.settings_dict
+        old_test_settings = settings_dict.get('TEST', {})
+        old_conn_max_age = settings_dict['CONN_MAX_AGE']
+        # A file, rather than the in-memory test database, so that locking behaves as in production.
+        settings_dict['TEST'] = {**old_test_settings, 'NAME': str(Path(directory) / 'benchmark.sqlite3')}
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            # Each thread writes as one user, far more often than the rate limits allow.
+            with override_settings(THROTTLE_ENABLED=False):
+                self._seed()
+                results = {name: self._run(name) for name in options['profile'] or settings.SQLITE_PROFILES}
+        finally:
+            settings_dict['CONN_MAX_AGE'] = old_conn_max_age
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            settings_dict['TEST'] = old_test_settings
+            teardown_test_environment()
+            shutil.rmtree(directory, ignore_errors=True)
+        self._print(results)
+
+    def _seed(self):
+        self.stdout.write('Seeding benchmark database...')
+        call_command('seed', users=self.options['users'], seed=self.options['seed'], stdout=StringIO())
+        self.user_ids = list(
+            User.objects.filter(username__startswith=SEED_USERNAME_PREFIX).values_list('id', flat=True)
+        )
+
+    def _run(self, profile_name):
+        profile = settings.SQLITE_PROFILES[profile_name]
+        # Every profile sets the journal mode, which is stored in the database file.
+        pragmas = {'journal_mode': 'DELETE', **profile['PRAGMAS']}
+        connections.close_all()
+        connection.settings_dict['CONN_MAX_AGE'] = profile['CONN_MAX_AGE']
+        self.stdout.write(f"Running profile '{profile_name}'...")
+        with override_settings(SQLITE_PRAGMAS=pragmas):
+            samples = {'read': [], 'write': []}
+            errors = []
+            deadline = time.perf_counter() + self.options['seconds']
+            workers = [
+                threading.Thread(target=self._work, args=(index, deadline, samples, errors))
+                for index in range(self.options['threads'])
+            ]
+            started = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - started
+        connections.close_all()
+        result = {'throughput_rps': round((len(samples['read']) + len(samples['write'])) / elapsed, 1)}
+        for kind, timings in samples.items():
+            timings = timings or [0]
+            result[f'{kind}_p50_ms'] = round(percentile(timings, 0.50), 2)
+            result[f'{kind}_p95_ms'] = round(percentile(timings, 0.95), 2)
+            result[f'{kind}_mean_ms'] = round(statistics.mean(timings), 2)
+        result['errors'] = len(errors)
+        return result
+
+    def _work(self, index, deadline, samples, errors):
+        rng = random.Random(self.options['seed'] * 1000 + index)
+        client = Client()
+        client.force_login(User.objects.get(pk=rng.choice(self.user_ids)))
+        try:
+            while time.perf_counter() < deadline:
+                write = rng.random() < self.options['write_fraction']
+                request = self._write if write else self._read
+                started = time.perf_counter()
+                try:
+                    response = request(client, rng)
+                except OperationalError as error:
+                    # 'database is locked' once the busy timeout runs out.
+                    errors.append(error)
+                    continue
+                if response.status_code >= 400:
+                    errors.append(response.status_code)
+                    continue
+                samples['write' if write else 'read'].append((time.perf_counter() - started) * 1000)
+        finally:
+            close_old_connections()
+            connections.close_all()
+
+    def _read(self, client, rng):
+        if rng.random() < 0.5:
+            return client.get(reverse('feed'))
+        return client.get(reverse('show_user', kwargs={'user_id': rng.choice(self.user_ids)}))
+
+    def _write(self, client, rng):
+        if rng.random() < 0.5:
+            return client.post(reverse('new_post'), {'text': f'Concurrent cluck {rng.random()}'})
+        return client.get(reverse('follow_toggle', kwargs={'user_id': rng.choice(self.user_ids)}))
+
+    def _print(self, results):
+        columns = [
+            'throughput_rps', 'read_p50_ms', 'read_p95_ms', 'write_p50_ms', 'write_p95_ms', 'errors',
+        ]
+        self.stdout.write(f"{'profile':<10}" + ''.join(f'{column:>16}' for column in columns))
+        for name, result in results.items():
+            self.stdout.write(f'{name:<10}' + ''.join(f'{result[column]:>16}' for column in columns))
@@ -0,0 +1,74 @@
+import os
+import statistics
+import threading
+import time
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from microblogs.management.commands.benchmark import percentile
+
+BENCHMARK_PASSWORD = 'Password123'
+
+class Command(BaseCommand):
+    help = 'Measure how many password checks, the bulk of the cost of a log in, each hasher profile runs per second and per core.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=os.cpu_count(), help='Threads checking passwords at once.')
+        parser.add_argument('--seconds', type=float, default=5, help='Duration of the load per hasher.')
+        parser.add_argument(
+            '--hasher', action='append', choices=list(settings.PASSWORD_HASHER_PROFILES),
+            help='Only run these hasher profiles.',
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        results = {}
+        for name in options['hasher'] or settings.PASSWORD_HASHER_PROFILES:
+            with override_settings(PASSWORD_HASHERS=[settings.PASSWORD_HASHER_PROFILES[name]]):
+                try:
+                    make_password(BENCHMARK_PASSWORD)
+                except ValueError as error:
+                    # A hasher whose library, such as argon2-cffi, is not installed.
+                    self.stdout.write(f"Skipping '{name}': {error}")
+                    continue
+                self.stdout.write(f"Running hasher '{name}'...")
+                results[name] = self._run()
+        self._print(results)
+
+    def _run(self):
+        encoded = make_password(BENCHMARK_PASSWORD)
+        timings = []
+        deadline = time.perf_counter() + self.options['seconds']
+        workers = [
+            threading.Thread(target=self._work, args=(encoded, deadline, timings))
+            for _ in range(self.options['threads'])
+        ]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        throughput = len(timings) / elapsed
+        # Threads beyond the number of cores only queue for them.
+        cores = min(self.options['threads'], os.cpu_count())
+        return {
+            'logins_per_s': round(throughput, 1),
+            'per_core': round(throughput / cores, 1),
+            'p50_ms': round(percentile(timings, 0.50), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'mean_ms': round(statistics.mean(timings), 2),
+        }
+
+    def _work(self, encoded, deadline, timings):
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            check_password(BENCHMARK_PASSWORD, encoded)
+            timings.append((time.perf_counter() - started) * 1000)
+
+    def _print(self, results):
+        columns = ['logins_per_s', 'per_core', 'p50_ms', 'p95_ms', 'mean_ms']
+        self.stdout.write(f"{'hasher':<10}" + ''.join(f'{column:>14}' for column in columns))
+        for name, result in results.items():
+            self.stdout.write(f'{name:<10}' + ''.join(f'{result[column]:>14}' for column in columns))
@@ -0,0 +1,81 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.humanize.templatetags.humanize import naturaltime
+from django.core.management.base import BaseCommand
+from django.template import Context, Engine
+from django.utils import timezone
+from microblogs.helpers import attach_author_cards
+from microblogs.models import User, Post
+from microblogs.rendering import post_row_template, render_post_row
+from microblogs.timestamps import RelativeTimeFormatter, absolute_time
+
+INCLUDE_LOOP = (
+    "{% for post in posts %}"
+    "{% include 'partials/post_as_table_row.html' with post=post timestamp=timestamp %}"
+    "{% endfor %}"
+)
+
+class Command(BaseCommand):
+    help = 'Measure the per-row cost of rendering post tables with each rendering strategy.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help='Rows rendered per table.')
+        parser.add_argument('--repeat', type=int, default=50, help='Tables rendered per strategy.')
+
+    def handle(self, *args, **options):
+        self.options = options
+        posts = self._posts(options['rows'])
+        uncached = Engine(loaders=settings.TEMPLATE_LOADERS)
+        cached = Engine(loaders=[('django.template.loaders.cached.Loader', settings.TEMPLATE_LOADERS)])
+        strategies = {
+            'include loop, uncached loader': self._include_loop(uncached, posts),
+            'include loop, cached loader': self._include_loop(cached, posts),
+            'compiled row renderer': self._compiled(posts),
+            'timestamps, naturaltime': self._timestamps(posts, lambda: naturaltime),
+            'timestamps, formatter': self._timestamps(posts, RelativeTimeFormatter),
+            'timestamps, client side': self._timestamps(posts, lambda: absolute_time),
+        }
+        self.stdout.write(f"{'strategy':<32}{'us/row':>10}")
+        for name, render in strategies.items():
+            self.stdout.write(f'{name:<32}{self._time_per_row(render):>10.1f}')
+
+    def _posts(self, count):
+        now = timezone.now()
+        authors = [
+            User(pk=pk, username=f'@author{pk}', first_name='Author', last_name=str(pk), email=f'author{pk}@example.org')
+            for pk in range(1, 11)
+        ]
+        posts = [
+            Post(
+                pk=pk,
+                author=authors[pk % len(authors)],
+                text=f'Benchmark post <{pk}> & friends',
+                created_at=now - timedelta(minutes=7 * pk),
+            )
+            for pk in range(count)
+        ]
+        return attach_author_cards(posts)
+
+    def _include_loop(self, engine, posts):
+        template = engine.from_string(INCLUDE_LOOP)
+        return lambda: template.render(Context({'posts': posts, 'timestamp': 'now'}))
+
+    def _compiled(self, posts):
+        template = post_row_template()
+        return lambda: ''.join(render_post_row(template, post, 'now') for post in posts)
+
+    def _timestamps(self, posts, make_formatter):
+        # A formatter is made per table, as each request makes its own.
+        def render():
+            format_timestamp = make_formatter()
+            return [str(format_timestamp(post.created_at)) for post in posts]
+        return render
+
+    def _time_per_row(self, render):
+        render()
+        started = time.perf_counter()
+        for _ in range(self.options['repeat']):
+            render()
+        elapsed = time.perf_counter() - started
+        return elapsed / (self.options['repeat'] * self.options['rows']) * 1e6
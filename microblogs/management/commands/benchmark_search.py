@@ -0,0 +1,103 @@
+import itertools
+import random
+import time
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from microblogs.management.commands.benchmark import percentile
+from microblogs.models import User, Post
+from microblogs.search import InMemorySearchIndex, SQLiteSearchIndex
+
+INSERT_POSTS_SQL = 'INSERT INTO microblogs_post (author_id, text, created_at) VALUES (%s, %s, %s)'
+
+class Command(BaseCommand):
+    help = 'Fill a throwaway test database with generated posts and measure search latency of each index.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000, help='Number of generated posts.')
+        parser.add_argument('--users', type=int, default=1000, help='Number of generated authors.')
+        parser.add_argument('--vocabulary', type=int, default=20_000, help='Number of distinct words.')
+        parser.add_argument('--queries', type=int, default=50, help='Measured queries per query kind.')
+        parser.add_argument('--scan-queries', type=int, default=3, help='Measured queries per kind for the LIKE scan.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the posts and queries.')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.random = random.Random(options['seed'])
+        # Word frequencies follow Zipf's law, as in natural text.
+        self.words = [f'w{rank}x' for rank in range(options['vocabulary'])]
+        self.cumulative_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(options['vocabulary'])))
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self._fill()
+            self._run()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def _fill(self):
+        password = make_password('Password123')
+        User.objects.bulk_create([
+            User(username=f'@bench{pk}', first_name='Bench', last_name=str(pk), email=f'bench{pk}@example.org', password=password)
+            for pk in range(self.options['users'])
+        ])
+        author_ids = list(User.objects.values_list('id', flat=True))
+        now = timezone.now()
+        started = time.perf_counter()
+        batch = 10_000
+        with transaction.atomic(), connection.cursor() as cursor:
+            for first in range(0, self.options['posts'], batch):
+                count = min(batch, self.options['posts'] - first)
+                cursor.executemany(INSERT_POSTS_SQL, [
+                    (self.random.choice(author_ids), self._text(), now) for _ in range(count)
+                ])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"Inserted {self.options['posts']} posts, indexed by FTS5 triggers, in {elapsed:.1f}s.")
+
+    def _text(self):
+        return ' '.join(self.random.choices(self.words, cum_weights=self.cumulative_weights, k=self.random.randint(5, 20)))
+
+    def _queries(self):
+        """Returns (kind, queries) pairs of the measured query kinds."""
+        vocabulary = self.options['vocabulary']
+        common = self.words[:10]
+        medium = self.words[100:1000]
+        rare = self.words[vocabulary // 2:]
+        count = self.options['queries']
+        return [
+            ('common word', [self.random.choice(common) for _ in range(count)]),
+            ('medium word', [self.random.choice(medium) for _ in range(count)]),
+            ('rare word', [self.random.choice(rare) for _ in range(count)]),
+            ('two words', [f'{self.random.choice(common)} {self.random.choice(medium)}' for _ in range(count)]),
+            ('prefix', [self.random.choice(medium)[:3] for _ in range(count)]),
+        ]
+
+    def _run(self):
+        indexes = {}
+        if connection.vendor == 'sqlite':
+            indexes['fts5'] = SQLiteSearchIndex()
+        in_memory = InMemorySearchIndex()
+        started = time.perf_counter()
+        in_memory.search_posts('warmup', 0, 1)
+        self.stdout.write(f'Built the in-memory index in {time.perf_counter() - started:.1f}s.')
+        indexes['in memory'] = in_memory
+        self.stdout.write(f"{'index':<12}{'query':<14}{'p50_ms':>10}{'p95_ms':>10}")
+        for kind, queries in self._queries():
+            for name, index in indexes.items():
+                self._report(name, kind, [lambda query=query: index.search_posts(query, 0, 20) for query in queries])
+            scans = [
+                lambda query=query: list(Post.objects.filter(text__icontains=query).values_list('id', flat=True)[:20])
+                for query in queries[:self.options['scan_queries']]
+            ]
+            self._report('LIKE scan', kind, scans)
+
+    def _report(self, name, kind, searches):
+        timings = []
+        for search in searches:
+            started = time.perf_counter()
+            search()
+            timings.append((time.perf_counter() - started) * 1000)
+        self.stdout.write(f'{name:<12}{kind:<14}{percentile(timings, 0.50):>10.2f}{percentile(timings, 0.95):>10.2f}')
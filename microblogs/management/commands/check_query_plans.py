@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from microblogs.pagination import CursorPaginator, KeysetPaginator, encode_cursor
+from microblogs.models import USER_LIST, User, Post, TimelineEntry
+
+# Plan fragments that show a query reads a whole table or sorts its results in a temporary structure.
+BAD_PLAN_MARKERS = {
+    'sqlite': ['SCAN ', 'USE TEMP B-TREE'],
+    'postgresql': ['Seq Scan', 'Sort'],
+    'mysql': ['type: ALL', 'Using filesort'],
+}
+
+# Plan fragments that show a flagged step walks an index in order, which a LIMIT stops early.
+INDEX_ORDER_MARKERS = {
+    'sqlite': ['USING INDEX', 'USING COVERING INDEX'],
+}
+
+def hot_queries():
+    """Returns the (name, queryset) pairs of the queries served on every feed, profile and follow request."""
+    user = User(pk=1)
+    other = User(pk=2)
+    cursor = encode_cursor(timezone.now(), 1)
+    follows = User.followers.through.objects
+    timeline = CursorPaginator(
+        user.timeline().select_related('author'),
+        per_page=settings.POSTS_PER_PAGE,
+        key=('timeline_created_at', 'timeline_post_id'),
+    )
+    profile = CursorPaginator(
+        Post.objects.filter(author=other).select_related('author'),
+        per_page=settings.POSTS_PER_PAGE,
+    )
+    users = CursorPaginator(User.objects.values('id'), per_page=settings.USERS_PER_PAGE, key=('date_joined', 'id'))
+    user_list = KeysetPaginator(
+        User.objects.all(),
+        settings.USERS_PER_PAGE,
+        key=('last_name', 'first_name', 'id'),
+        name=USER_LIST,
+    )
+    return [
+        ('feed first page', timeline.queryset_for()),
+        ('feed older page', timeline.queryset_for(before=cursor)),
+        ('feed newer page', timeline.queryset_for(after=cursor)),
+        ('profile first page', profile.queryset_for()),
+        ('profile older page', profile.queryset_for(before=cursor)),
+        ('profile newer page', profile.queryset_for(after=cursor)),
+        ('is following', follows.filter(from_user=other, to_user=user)),
+        ('following ids', follows.filter(to_user=user, from_user__in=[2, 3]).values_list('from_user_id')),
+        ('followers of author', follows.filter(from_user=other).values_list('to_user_id')),
+        ('followees of user', follows.filter(to_user=user).values_list('from_user_id')),
+        ('timeline backfill', Post.objects.filter(author_id__in=[2, 3]).order_by().values_list('id', 'created_at')),
+        ('api user list first page', users.queryset_for()),
+        ('api user list older page', users.queryset_for(before=cursor)),
+        ('user list first page', user_list.queryset_from(None)[:settings.USERS_PER_PAGE]),
+        ('user list deep page', user_list.queryset_from(('Doe', 'John', 1))[50:50 + settings.USERS_PER_PAGE]),
+        ('timeline prune', TimelineEntry.objects.filter(user=user, post__author_id__in=[2, 3])),
+        ('existing users', User.objects.filter(pk__in=[2, 3]).order_by().values_list('pk')),
+    ]
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot timeline and follow-graph queries and fail if any scans a table or sorts.'
+
+    def handle(self, *args, **options):
+        markers = BAD_PLAN_MARKERS.get(connection.vendor)
+        index_order_markers = INDEX_ORDER_MARKERS.get(connection.vendor, [])
+        if markers is None:
+            raise CommandError(f'Query plan checks are not supported on {connection.vendor}.')
+        failures = []
+        for name, queryset in hot_queries():
+            plan = queryset.explain()
+            bad = [
+                line.strip() for line in plan.splitlines()
+                if any(marker in line for marker in markers)
+                and not any(marker in line for marker in index_order_markers)
+            ]
+            if bad:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f'{name}: ' + '; '.join(bad)))
+            elif options['verbosity'] > 1:
+                self.stdout.write(f'{name}:\n{plan}')
+            else:
+                self.stdout.write(f'{name}: ok')
+        if failures:
+            raise CommandError(f'{len(failures)} hot queries fall back to a full scan or temporary sort.')
+        self.stdout.write(self.style.SUCCESS('All hot queries use indexes.'))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from microblogs.auth import forget_cached_users
+from microblogs.models import User
+
+BATCH_SIZE = 500
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized follower/followee counters of users that have drifted.'
+
+    def handle(self, *args, **options):
+        follows = User.followers.through.objects
+        actual_followers = follows.filter(from_user=OuterRef('pk')).values('from_user').annotate(
+            total=Count('id')
+        ).values('total')
+        actual_followees = follows.filter(to_user=OuterRef('pk')).values('to_user').annotate(
+            total=Count('id')
+        ).values('total')
+        with transaction.atomic():
+            drifted = User.objects.annotate(
+                actual_followers=Coalesce(Subquery(actual_followers), 0),
+                actual_followees=Coalesce(Subquery(actual_followees), 0),
+            ).filter(
+                ~Q(num_followers=F('actual_followers')) | ~Q(num_followees=F('actual_followees'))
+            )
+            drifted_ids = list(drifted.values_list('id', flat=True))
+            for start in range(0, len(drifted_ids), BATCH_SIZE):
+                User.objects.filter(id__in=drifted_ids[start:start + BATCH_SIZE]).update(
+                    num_followers=Coalesce(Subquery(actual_followers), 0),
+                    num_followees=Coalesce(Subquery(actual_followees), 0),
+                )
+            forget_cached_users(drifted_ids)
+        self.stdout.write(f'Reconciled follow counts of {len(drifted_ids)} users.')
@@ -0,0 +1,30 @@
+import shutil
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from microblogs.metrics import METRICS, load_snapshots
+
+class Command(BaseCommand):
+    help = 'Print the per-URL request timing histograms recorded by RequestMetricsMiddleware.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Delete the recorded histograms.')
+
+    def handle(self, *args, **options):
+        directory = Path(settings.REQUEST_METRICS_DIR)
+        if options['reset']:
+            shutil.rmtree(directory, ignore_errors=True)
+            self.stdout.write('Deleted recorded request metrics.')
+            return
+        registry = load_snapshots(directory) if directory.exists() else None
+        if not registry or not registry.histograms:
+            self.stdout.write('No request metrics recorded. Run the server with CLUCKER_REQUEST_METRICS=1.')
+            return
+        self.stdout.write(f"{'url name':<20}{'requests':>10}" + ''.join(f'{metric:>24}' for metric in METRICS))
+        for url_name, histograms in sorted(registry.histograms.items()):
+            row = f'{url_name:<20}{histograms["total_ms"].count:>10}'
+            for metric in METRICS:
+                histogram = histograms[metric]
+                summary = f'{histogram.mean:.1f} (p90<={histogram.percentile(0.9):g})'
+                row += f'{summary:>24}'
+            self.stdout.write(row)
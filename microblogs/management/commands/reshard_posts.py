@@ -0,0 +1,74 @@
+from collections import defaultdict
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+from microblogs.management.commands.seed import _explicit_created_at
+from microblogs.models import Post, Sequence, TimelineEntry, User
+from microblogs.sharding import POST_ID_SEQUENCE, is_sharded, shard_for_author
+
+class Command(BaseCommand):
+    help = 'Move every post to the shard of its author under POST_SHARDS. Run it while no posts are written.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from', dest='sources', action='append', default=[], metavar='ALIAS',
+            help='Also move the posts off this database, e.g. the default one when sharding posts for the first time.',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Posts read and moved at a time.')
+
+    def handle(self, *args, **options):
+        sources = list(dict.fromkeys([*settings.POST_SHARDS, *options['sources']]))
+        unknown = [alias for alias in sources if alias not in settings.DATABASES]
+        if unknown:
+            raise CommandError(f'Unknown databases: {", ".join(unknown)}.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+        moved = 0
+        for source in sources:
+            moved += self._move_posts(source, options['batch_size'])
+        # Restart the post id sequence past the largest id now on any shard.
+        Sequence.objects.using(DEFAULT_DB_ALIAS).filter(name=POST_ID_SEQUENCE).delete()
+        self.stdout.write(f'Moved {moved} posts.')
+
+    def _move_posts(self, source, batch_size):
+        """Moves the posts on source that belong on another shard, batch_size at a time; returns how many moved."""
+        moved = 0
+        last_id = 0
+        while True:
+            posts = list(Post.objects.using(source).filter(id__gt=last_id).order_by('id')[:batch_size])
+            if not posts:
+                return moved
+            last_id = posts[-1].id
+            targets = defaultdict(list)
+            for post in posts:
+                target = shard_for_author(post.author_id)
+                if target != source:
+                    targets[target].append(post)
+            for target, batch in targets.items():
+                self._move_batch(source, target, batch)
+                moved += len(batch)
+            self.stdout.write(f'{source}: moved {moved} posts, up to id {last_id}.')
+
+    def _move_batch(self, source, target, posts):
+        # Copying before deleting lets an interrupted run be resumed, skipping the copies already made.
+        copies = [Post(id=post.id, author_id=post.author_id, text=post.text, created_at=post.created_at) for post in posts]
+        with transaction.atomic(using=target), _explicit_created_at():
+            Post.objects.using(target).bulk_create(copies, ignore_conflicts=True)
+            if target == DEFAULT_DB_ALIAS and not is_sharded():
+                self._fan_out(copies)
+        with transaction.atomic(using=source):
+            # Deleting also removes the timeline entries of posts leaving the default database.
+            Post.objects.using(source).filter(id__in=[post.id for post in posts]).delete()
+
+    def _fan_out(self, posts):
+        """Writes posts moved back onto the default database into the timelines of their authors and followers."""
+        follows = User.followers.through.objects.filter(from_user_id__in={post.author_id for post in posts})
+        followers = defaultdict(list)
+        for followee_id, follower_id in follows.values_list('from_user_id', 'to_user_id'):
+            followers[followee_id].append(follower_id)
+        entries = [
+            TimelineEntry(user_id=user_id, post_id=post.id, created_at=post.created_at)
+            for post in posts
+            for user_id in [post.author_id, *followers[post.author_id]]
+        ]
+        TimelineEntry.objects.bulk_create(entries, batch_size=1000, ignore_conflicts=True)
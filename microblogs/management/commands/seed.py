@@ -1,23 +1,232 @@
+import random
+import time
+from bisect import bisect
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate
+from multiprocessing import Pool
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
 from django.core.management.base import BaseCommand, CommandError
-from microblogs.models import User
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
 from faker import Faker
+from microblogs.gravatar import email_hash
+from microblogs.models import User, Post
+
+SEED_USERNAME_PREFIX = '@seed_'
+SEED_PASSWORD = 'Password123'
+
+TIMELINE_SQL = '''
+INSERT INTO microblogs_timelineentry (user_id, post_id, created_at)
+SELECT post.author_id, post.id, post.created_at
+FROM microblogs_post AS post
+WHERE post.id > %s
+UNION ALL
+SELECT follow.to_user_id, post.id, post.created_at
+FROM microblogs_post AS post
+JOIN microblogs_user_followers AS follow ON follow.from_user_id = post.author_id
+WHERE post.id > %s
+'''
+
+# Per-process generator state, set up by _init_worker.
+_faker = None
+_popularity = None
+
+def _init_worker(seed, user_count, follow_alpha):
+    """Prepare the generators of a worker process."""
+    global _faker, _popularity
+    _faker = Faker('en_GB')
+    _faker.seed_instance(seed)
+    # Cumulative Zipf weights: the user with rank r is followed in proportion to 1 / r ** alpha.
+    _popularity = list(accumulate(1 / (rank ** follow_alpha) for rank in range(1, user_count + 1)))
+
+def _chunk_random(seed, kind, start):
+    """Returns a generator seeded by the chunk alone, so output does not depend on the worker count."""
+    chunk_seed = f'{seed}:{kind}:{start}'
+    _faker.seed_instance(chunk_seed)
+    return random.Random(chunk_seed)
+
+def _generate_users(task):
+    seed, start, stop = task
+    _chunk_random(seed, 'users', start)
+    rows = []
+    for index in range(start, stop):
+        first_name = _faker.first_name()
+        last_name = _faker.last_name()
+        rows.append((
+            index,
+            first_name,
+            last_name,
+            f'{first_name}.{last_name}.{index}@example.org'.lower(),
+            _faker.sentence(),
+        ))
+    return rows
+
+def _generate_posts(task):
+    seed, start, stop, posts_per_user, max_age_seconds = task
+    rng = _chunk_random(seed, 'posts', start)
+    rows = []
+    for author_index in range(start, stop):
+        for _ in range(_sample_count(rng, posts_per_user)):
+            rows.append((author_index, _faker.sentence(), rng.randrange(max_age_seconds)))
+    return rows
+
+def _generate_follows(task):
+    seed, start, stop, follows_per_user = task
+    rng = _chunk_random(seed, 'follows', start)
+    total = _popularity[-1]
+    user_count = len(_popularity)
+    rows = []
+    for follower_index in range(start, stop):
+        count = min(_sample_count(rng, follows_per_user), user_count - 1)
+        followees = set()
+        attempts = 0
+        while len(followees) < count and attempts < count * 4:
+            attempts += 1
+            followee_index = bisect(_popularity, rng.random() * total)
+            if followee_index != follower_index and followee_index < user_count:
+                followees.add(followee_index)
+        rows.extend((followee_index, follower_index) for followee_index in followees)
+    return rows
+
+def _sample_count(rng, mean):
+    """Returns a heavy-tailed count whose mean is roughly the given mean."""
+    if mean <= 0:
+        return 0
+    return int(rng.expovariate(1 / mean))
+
+@contextmanager
+def _explicit_created_at():
+    """Let bulk-created posts keep their generated timestamps instead of auto_now_add."""
+    field = Post._meta.get_field('created_at')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
 
 class Command(BaseCommand):
-    def __init__(self):
-        super().__init__()
-        self.faker = Faker('en_GB')
+    help = 'Seed the database with generated users, posts and a power-law follow graph.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help='Number of users to create.')
+        parser.add_argument('--posts-per-user', type=float, default=10, help='Mean number of posts per user.')
+        parser.add_argument('--follows-per-user', type=float, default=20, help='Mean number of followees per user.')
+        parser.add_argument('--follow-alpha', type=float, default=1.0, help='Exponent of the follow popularity power law.')
+        parser.add_argument('--max-post-age-days', type=int, default=365, help='Posts are spread over this many past days.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows generated and inserted per batch.')
+        parser.add_argument('--workers', type=int, default=1, help='Processes used to generate rows.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, for reproducible datasets.')
 
-    # Generate 100 random users
     def handle(self, *args, **options):
-        for i in range(0, 100):
-            first_name= self.faker.first_name()
-            last_name=self.faker.last_name()
-            User.objects.create_user(
-                first_name=first_name,
-                last_name=last_name,
-                username=f"@seed-{first_name}{last_name}",
-                email=f"{first_name}.{last_name}@example.org",
-                bio=self.faker.sentence(),
-                password="Password123",
-            )
-        print('Generated 100 users.')
+        if options['users'] < 1 or options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--users, --batch-size and --workers must be positive.')
+        if User.objects.filter(username__startswith=SEED_USERNAME_PREFIX).exists():
+            raise CommandError('The database is already seeded. Run unseed first.')
+        self.options = options
+        self.now = timezone.now()
+        worker_args = (options['seed'], options['users'], options['follow_alpha'])
+        if options['workers'] > 1:
+            pool = Pool(options['workers'], initializer=_init_worker, initargs=worker_args)
+            self.map = pool.imap
+        else:
+            pool = None
+            _init_worker(*worker_args)
+            self.map = map
+        try:
+            started = time.monotonic()
+            user_ids = self._seed_users()
+            first_post_id = Post.objects.aggregate(last=Max('id'))['last'] or 0
+            self._seed_posts(user_ids)
+            self._seed_follows(user_ids)
+            self._build_timelines(first_post_id)
+            call_command('reconcile_follow_counts', stdout=self.stdout)
+            self.stdout.write(f'Seeding finished in {time.monotonic() - started:.1f}s.')
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+    def _tasks(self, *extra):
+        seed = self.options['seed']
+        batch_size = self.options['batch_size']
+        user_count = self.options['users']
+        for start in range(0, user_count, batch_size):
+            yield (seed, start, min(start + batch_size, user_count), *extra)
+
+    def _seed_users(self):
+        password = make_password(SEED_PASSWORD)
+        progress = self._progress('users', self.options['users'])
+        for rows in self.map(_generate_users, self._tasks()):
+            users = [
+                User(
+                    username=f'{SEED_USERNAME_PREFIX}{index}',
+                    first_name=first_name,
+                    last_name=last_name,
+                    email=email,
+                    gravatar_hash=email_hash(email),
+                    bio=bio,
+                    password=password,
+                )
+                for index, first_name, last_name, email, bio in rows
+            ]
+            User.objects.bulk_create(users)
+            progress(len(users))
+        user_ids = [0] * self.options['users']
+        seeded = User.objects.filter(username__startswith=SEED_USERNAME_PREFIX).values_list('id', 'username')
+        for user_id, username in seeded.iterator(chunk_size=self.options['batch_size']):
+            user_ids[int(username[len(SEED_USERNAME_PREFIX):])] = user_id
+        return user_ids
+
+    def _seed_posts(self, user_ids):
+        max_age_seconds = self.options['max_post_age_days'] * 24 * 60 * 60
+        total = int(self.options['users'] * self.options['posts_per_user'])
+        progress = self._progress('posts', total)
+        tasks = self._tasks(self.options['posts_per_user'], max(max_age_seconds, 1))
+        with _explicit_created_at():
+            for rows in self.map(_generate_posts, tasks):
+                posts = [
+                    Post(
+                        author_id=user_ids[author_index],
+                        text=text,
+                        created_at=self.now - timedelta(seconds=age),
+                    )
+                    for author_index, text, age in rows
+                ]
+                Post.objects.bulk_create(posts, batch_size=self.options['batch_size'])
+                progress(len(posts))
+
+    def _seed_follows(self, user_ids):
+        Follow = User.followers.through
+        total = int(self.options['users'] * self.options['follows_per_user'])
+        progress = self._progress('follows', total)
+        for rows in self.map(_generate_follows, self._tasks(self.options['follows_per_user'])):
+            follows = [
+                Follow(from_user_id=user_ids[followee_index], to_user_id=user_ids[follower_index])
+                for followee_index, follower_index in rows
+            ]
+            Follow.objects.bulk_create(follows, batch_size=self.options['batch_size'], ignore_conflicts=True)
+            progress(len(follows))
+
+    def _build_timelines(self, first_post_id):
+        started = time.monotonic()
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(TIMELINE_SQL, [first_post_id, first_post_id])
+            entries = cursor.rowcount
+        self._report('timeline entries', entries, entries, time.monotonic() - started)
+
+    def _progress(self, label, expected):
+        """Returns a callback that reports how many rows have been created, and how fast."""
+        started = time.monotonic()
+        created = 0
+        def advance(count):
+            nonlocal created
+            created += count
+            self._report(label, created, expected, time.monotonic() - started)
+        return advance
+
+    def _report(self, label, created, expected, elapsed):
+        rate = created / elapsed if elapsed > 0 else 0
+        self.stdout.write(f'{label}: {created}/~{expected} ({rate:,.0f} rows/s)')
@@ -0,0 +1,52 @@
+import sqlite3
+import time
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+def sqlite_path(database):
+    """Returns the file path of a SQLite database setting, whose NAME may be a file: URI."""
+    name = str(database['NAME'])
+    return urlsplit(name).path if name.startswith('file:') else name
+
+class Command(BaseCommand):
+    help = 'Copy the SQLite database to each of DATABASE_REPLICAS, standing in for replication.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Keep copying every this many seconds, rather than once; the replication lag to test against.',
+        )
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        if primary['ENGINE'] != 'django.db.backends.sqlite3' or ':memory:' in str(primary['NAME']):
+            raise CommandError('Replicas can only be copied from a SQLite database file.')
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('No replicas are configured; set CLUCKER_DB_REPLICAS.')
+        replica_paths = [sqlite_path(settings.DATABASES[alias]) for alias in settings.DATABASE_REPLICAS]
+        while True:
+            started = time.perf_counter()
+            self.sync(sqlite_path(primary), replica_paths)
+            self.stdout.write(
+                f'Synced {len(settings.DATABASE_REPLICAS)} replicas in {time.perf_counter() - started:.2f}s.'
+            )
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def sync(self, primary_path, replica_paths):
+        """Copies the database file at primary_path over each of replica_paths."""
+        source = sqlite3.connect(primary_path)
+        try:
+            for path in replica_paths:
+                # The backup API copies a consistent snapshot, page by page, under the replica's own locks,
+                # so open read-only connections to it see either the old or the new copy.
+                replica = sqlite3.connect(path)
+                try:
+                    source.backup(replica)
+                finally:
+                    replica.close()
+        finally:
+            source.close()
@@ -1,9 +1,10 @@
 from django.core.management.base import BaseCommand, CommandError
+from microblogs.management.commands.seed import SEED_USERNAME_PREFIX
 from microblogs.models import User
 
 class Command(BaseCommand):
 
     # Remove generated users
     def handle(self, *args, **options):
-        User.objects.filter(username__startswith='@seed-').delete()
+        User.objects.filter(username__startswith=SEED_USERNAME_PREFIX).delete()
         print('Removed generated users.')
@@ -0,0 +1,115 @@
+"""In-process histograms of per-request timings, aggregated by URL name."""
+import atexit
+import json
+import os
+import threading
+from bisect import bisect_left
+from pathlib import Path
+from django.conf import settings
+
+# Upper bounds of the histogram buckets, in milliseconds (or queries, for the query count).
+BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float('inf')]
+
+METRICS = ['total_ms', 'view_ms', 'db_ms', 'template_ms', 'queries']
+
+class Histogram:
+    """A fixed-bucket histogram that keeps a count and a sum of its observations."""
+
+    def __init__(self, counts=None, total=0.0):
+        self.counts = counts or [0] * len(BUCKETS)
+        self.total = total
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.total += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, fraction):
+        """Returns the upper bound of the bucket holding the given percentile."""
+        target = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if count and seen >= target:
+                return bound
+        return 0
+
+    def merge(self, other):
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, other.counts)]
+        self.total += other.total
+
+    def to_dict(self):
+        return {'counts': self.counts, 'total': self.total}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(list(data['counts']), data['total'])
+
+class MetricsRegistry:
+    """Thread-safe histograms of every metric, keyed by URL name."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.unflushed = 0
+
+    def record(self, url_name, timings):
+        with self.lock:
+            histograms = self.histograms.setdefault(url_name, {metric: Histogram() for metric in METRICS})
+            for metric in METRICS:
+                histograms[metric].observe(timings[metric])
+            self.unflushed += 1
+            should_flush = self.unflushed >= settings.REQUEST_METRICS_FLUSH_EVERY
+        if should_flush:
+            self.flush()
+
+    def merge(self, data):
+        """Merges a snapshot produced by to_dict into this registry."""
+        for url_name, metrics in data.items():
+            histograms = self.histograms.setdefault(url_name, {metric: Histogram() for metric in METRICS})
+            for metric, histogram in metrics.items():
+                histograms[metric].merge(Histogram.from_dict(histogram))
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                url_name: {metric: histogram.to_dict() for metric, histogram in histograms.items()}
+                for url_name, histograms in self.histograms.items()
+            }
+
+    def flush(self):
+        """Writes this process's histograms to REQUEST_METRICS_DIR, if it is set."""
+        directory = settings.REQUEST_METRICS_DIR
+        if not directory or not self.histograms:
+            return
+        snapshot = self.to_dict()
+        with self.lock:
+            self.unflushed = 0
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'{os.getpid()}.json'
+        temporary = path.with_suffix('.tmp')
+        temporary.write_text(json.dumps(snapshot))
+        temporary.replace(path)
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+            self.unflushed = 0
+
+registry = MetricsRegistry()
+atexit.register(registry.flush)
+
+def load_snapshots(directory):
+    """Returns a registry merging the histograms flushed by every process."""
+    merged = MetricsRegistry()
+    for path in sorted(Path(directory).glob('*.json')):
+        merged.merge(json.loads(path.read_text()))
+    return merged
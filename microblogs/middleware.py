@@ -0,0 +1,134 @@
+"""Middleware for the microblogs app."""
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import Template
+from django.utils.functional import SimpleLazyObject
+from .auth import get_user
+from .db import end_routing, start_routing
+from .metrics import registry
+
+_current_timings = ContextVar('request_timings', default=None)
+
+class RequestTimings:
+    """Timings collected while serving a single request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.view_started = None
+        self.view_seconds = 0.0
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.queries += 1
+
+def _timed_render(render):
+    """Wrap Template.render so top-level template rendering time is added to the current request."""
+    def timed_render(self, *args, **kwargs):
+        timings = _current_timings.get()
+        if timings is None:
+            return render(self, *args, **kwargs)
+        timings.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            timings.template_depth -= 1
+            if timings.template_depth == 0:
+                timings.template_seconds += time.perf_counter() - started
+    timed_render.is_timed = True
+    return timed_render
+
+class RequestMetricsMiddleware:
+    """Records query count, database, template and view time of each request.
+
+    Enabled by REQUEST_METRICS_ENABLED. Timings are sent back in a Server-Timing
+    header and aggregated per URL name into microblogs.metrics.registry.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        if not getattr(Template.render, 'is_timed', False):
+            Template.render = _timed_render(Template.render)
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings.record_query))
+                response = self.get_response(request)
+        finally:
+            _current_timings.reset(token)
+        total_seconds = time.perf_counter() - started
+        if timings.view_started is not None:
+            timings.view_seconds = time.perf_counter() - timings.view_started
+        values = {
+            'total_ms': total_seconds * 1000,
+            'view_ms': timings.view_seconds * 1000,
+            'db_ms': timings.db_seconds * 1000,
+            'template_ms': timings.template_seconds * 1000,
+            'queries': timings.queries,
+        }
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={values["db_ms"]:.1f};desc="{timings.queries} queries"',
+            f'tpl;dur={values["template_ms"]:.1f}',
+            f'view;dur={values["view_ms"]:.1f}',
+            f'total;dur={values["total_ms"]:.1f}',
+        ])
+        match = request.resolver_match
+        registry.record(match.view_name if match else '<unresolved>', values)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.view_started = time.perf_counter()
+
+class ReplicaPinningMiddleware:
+    """Routes reads of the request and pins clients that write to the default database.
+
+    Enabled when DATABASE_REPLICAS lists any replicas. A response to a request
+    that wrote sets a cookie that keeps the client's reads on the default
+    database for REPLICA_PIN_SECONDS, until the replicas have caught up.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routing, token = start_routing()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_routing(token)
+        if routing.wrote:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """Sets request.user like AuthenticationMiddleware, loading the user from the cache when it can."""
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_user(request))
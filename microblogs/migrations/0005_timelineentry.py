@@ -0,0 +1,50 @@
+# Generated by Django 3.2.12 on 2026-10-18 18:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+BACKFILL_TIMELINES_SQL = '''
+INSERT INTO microblogs_timelineentry (user_id, post_id, created_at)
+SELECT post.author_id, post.id, post.created_at
+FROM microblogs_post AS post
+UNION ALL
+SELECT follow.to_user_id, post.id, post.created_at
+FROM microblogs_post AS post
+JOIN microblogs_user_followers AS follow ON follow.from_user_id = post.author_id
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('microblogs', '0004_alter_user_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='microblogs.post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', '-created_at'], name='timeline_user_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_timeline_entry'),
+        ),
+        migrations.RunSQL(
+            BACKFILL_TIMELINES_SQL,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
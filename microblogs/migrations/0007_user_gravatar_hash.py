@@ -0,0 +1,28 @@
+# Generated by Django 3.2.12 on 2026-10-18 18:42
+
+from hashlib import md5
+from django.db import migrations, models
+
+
+def populate_gravatar_hashes(apps, schema_editor):
+    User = apps.get_model('microblogs', 'User')
+    users = list(User.objects.only('id', 'email'))
+    for user in users:
+        user.gravatar_hash = md5(user.email.strip().lower().encode('utf-8')).hexdigest()
+    User.objects.bulk_update(users, ['gravatar_hash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('microblogs', '0006_timeline_post_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='gravatar_hash',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+        migrations.RunPython(populate_gravatar_hashes, migrations.RunPython.noop),
+    ]
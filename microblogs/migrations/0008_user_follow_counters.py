@@ -0,0 +1,37 @@
+# Generated by Django 3.2.12 on 2026-10-18 18:43
+
+from django.db import migrations, models
+
+
+COUNT_FOLLOWS_SQL = '''
+UPDATE microblogs_user SET
+    num_followers = (
+        SELECT COUNT(*) FROM microblogs_user_followers
+        WHERE microblogs_user_followers.from_user_id = microblogs_user.id
+    ),
+    num_followees = (
+        SELECT COUNT(*) FROM microblogs_user_followers
+        WHERE microblogs_user_followers.to_user_id = microblogs_user.id
+    )
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('microblogs', '0007_user_gravatar_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='num_followees',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='num_followers',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(COUNT_FOLLOWS_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.12 on 2026-10-18 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('microblogs', '0008_user_follow_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-created_at', '-id'], name='post_author_created_idx'),
+        ),
+        # The auto-created follow table only has a unique (from_user, to_user) index, which
+        # serves "followers of X". This one serves "who does X follow" from the index alone.
+        migrations.RunSQL(
+            'CREATE INDEX follow_follower_followee_idx ON microblogs_user_followers (to_user_id, from_user_id)',
+            reverse_sql='DROP INDEX follow_follower_followee_idx',
+        ),
+    ]
@@ -0,0 +1,72 @@
+from django.db import migrations
+
+# External content FTS5 tables over the post texts and user profiles, kept in step by triggers,
+# so posts and users written by any code path, including bulk inserts, are searchable at once.
+# Migrations that rebuild microblogs_post or microblogs_user on SQLite drop these triggers with
+# the old table, so they must recreate them.
+CREATE_SEARCH_INDEX_SQL = [
+    "CREATE VIRTUAL TABLE microblogs_post_fts USING fts5(text, content='microblogs_post', content_rowid='id')",
+    """CREATE TRIGGER microblogs_post_fts_insert AFTER INSERT ON microblogs_post BEGIN
+        INSERT INTO microblogs_post_fts (rowid, text) VALUES (new.id, new.text);
+    END""",
+    """CREATE TRIGGER microblogs_post_fts_delete AFTER DELETE ON microblogs_post BEGIN
+        INSERT INTO microblogs_post_fts (microblogs_post_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    END""",
+    """CREATE TRIGGER microblogs_post_fts_update AFTER UPDATE OF text ON microblogs_post BEGIN
+        INSERT INTO microblogs_post_fts (microblogs_post_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO microblogs_post_fts (rowid, text) VALUES (new.id, new.text);
+    END""",
+    "INSERT INTO microblogs_post_fts (microblogs_post_fts) VALUES ('rebuild')",
+    """CREATE VIRTUAL TABLE microblogs_user_fts USING fts5(
+        username, first_name, last_name, bio, content='microblogs_user', content_rowid='id'
+    )""",
+    """CREATE TRIGGER microblogs_user_fts_insert AFTER INSERT ON microblogs_user BEGIN
+        INSERT INTO microblogs_user_fts (rowid, username, first_name, last_name, bio)
+        VALUES (new.id, new.username, new.first_name, new.last_name, new.bio);
+    END""",
+    """CREATE TRIGGER microblogs_user_fts_delete AFTER DELETE ON microblogs_user BEGIN
+        INSERT INTO microblogs_user_fts (microblogs_user_fts, rowid, username, first_name, last_name, bio)
+        VALUES ('delete', old.id, old.username, old.first_name, old.last_name, old.bio);
+    END""",
+    """CREATE TRIGGER microblogs_user_fts_update AFTER UPDATE OF username, first_name, last_name, bio
+    ON microblogs_user BEGIN
+        INSERT INTO microblogs_user_fts (microblogs_user_fts, rowid, username, first_name, last_name, bio)
+        VALUES ('delete', old.id, old.username, old.first_name, old.last_name, old.bio);
+        INSERT INTO microblogs_user_fts (rowid, username, first_name, last_name, bio)
+        VALUES (new.id, new.username, new.first_name, new.last_name, new.bio);
+    END""",
+    "INSERT INTO microblogs_user_fts (microblogs_user_fts) VALUES ('rebuild')",
+]
+
+DROP_SEARCH_INDEX_SQL = [
+    'DROP TRIGGER microblogs_user_fts_update',
+    'DROP TRIGGER microblogs_user_fts_delete',
+    'DROP TRIGGER microblogs_user_fts_insert',
+    'DROP TABLE microblogs_user_fts',
+    'DROP TRIGGER microblogs_post_fts_update',
+    'DROP TRIGGER microblogs_post_fts_delete',
+    'DROP TRIGGER microblogs_post_fts_insert',
+    'DROP TABLE microblogs_post_fts',
+]
+
+def create_search_index(apps, schema_editor):
+    # Other databases search with the in-memory index of microblogs.search.
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in CREATE_SEARCH_INDEX_SQL:
+            schema_editor.execute(statement)
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in DROP_SEARCH_INDEX_SQL:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('microblogs', '0010_user_joined_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
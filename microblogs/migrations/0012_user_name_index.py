@@ -0,0 +1,17 @@
+# Generated by Django 3.2.12 on 2026-10-18 19:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('microblogs', '0011_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['last_name', 'first_name', 'id'], name='user_name_idx'),
+        ),
+    ]
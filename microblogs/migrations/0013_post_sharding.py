@@ -0,0 +1,49 @@
+# Generated by Django 3.2.12 on 2026-10-18 19:42
+
+import importlib
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Rebuilding microblogs_post on SQLite drops the search index triggers of migration 0011 with the
+# old table, so they are dropped first and created again on the new one.
+search_index = importlib.import_module('microblogs.migrations.0011_search_index')
+CREATE_POST_TRIGGERS_SQL = [
+    statement for statement in search_index.CREATE_SEARCH_INDEX_SQL
+    if statement.startswith('CREATE TRIGGER microblogs_post_fts')
+]
+DROP_POST_TRIGGERS_SQL = [
+    statement for statement in search_index.DROP_SEARCH_INDEX_SQL
+    if statement.startswith('DROP TRIGGER microblogs_post_fts')
+]
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'sqlite':
+            for statement in statements:
+                schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('microblogs', '0012_user_name_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sequence',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('next_value', models.BigIntegerField()),
+            ],
+        ),
+        migrations.RunPython(run_on_sqlite(DROP_POST_TRIGGERS_SQL), run_on_sqlite(CREATE_POST_TRIGGERS_SQL)),
+        migrations.AlterField(
+            model_name='post',
+            name='author',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(run_on_sqlite(CREATE_POST_TRIGGERS_SQL), run_on_sqlite(DROP_POST_TRIGGERS_SQL)),
+    ]
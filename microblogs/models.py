@@ -1,10 +1,23 @@
 from django.core.validators import RegexValidator
-from django.db import models
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, models, router, transaction
 from django.contrib.auth.models import AbstractUser
-from libgravatar import Gravatar
+from .auth import forget_cached_users
+from .gravatar import email_hash, gravatar_url
+from .live import get_broker
+from .pagination import invalidate_keyset_anchors
+from .search import get_search_index
+from .sharding import PostQuerySet, allocate_post_ids, is_sharded
+
+# Name of the KeysetPaginator anchors of the user list, which follows the user name ordering.
+USER_LIST = 'user_list'
 
 class User(AbstractUser):
     """The application user model, also used for user authenticaion."""
+    # Fields shown about a user, which the search index keeps a copy of.
+    DISPLAYED_FIELDS = {'username', 'first_name', 'last_name', 'email', 'bio'}
+    # Counters only ever changed by F() updates, which saving a stale copy of the user must not undo.
+    FOLLOW_COUNT_FIELDS = {'num_followers', 'num_followees'}
+
     username = models.CharField(
         unique=True,
         blank=False,
@@ -18,6 +31,9 @@ class User(AbstractUser):
     last_name = models.CharField(blank=False, max_length=50)
     email = models.EmailField(unique=True, blank=False)
     bio = models.CharField(unique=False, blank=True, max_length=520)
+    gravatar_hash = models.CharField(blank=True, editable=False, max_length=32)
+    num_followers = models.IntegerField(default=0, editable=False)
+    num_followees = models.IntegerField(default=0, editable=False)
     followers = models.ManyToManyField(
         'self', symmetrical=False, related_name='followees'
     )
@@ -26,15 +42,36 @@ class User(AbstractUser):
         """Model options."""
 
         ordering = ['last_name', 'first_name']
+        indexes = [
+            models.Index(fields=['last_name', 'first_name', 'id'], name='user_name_idx'),
+            models.Index(fields=['-date_joined', '-id'], name='user_joined_idx'),
+        ]
 
     def full_name(self):
         return f'{self.first_name} {self.last_name}'
 
+    def save(self, *args, **kwargs):
+        self.gravatar_hash = email_hash(self.email)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'email' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'gravatar_hash'}
+        adding = self._state.adding
+        if update_fields is None and not adding:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.FOLLOW_COUNT_FIELDS
+            ]
+        super().save(*args, **kwargs)
+        if not adding:
+            forget_cached_users([self.pk])
+        if adding or update_fields is None or {'first_name', 'last_name'}.intersection(update_fields):
+            invalidate_keyset_anchors(USER_LIST)
+        if update_fields is None or self.DISPLAYED_FIELDS.intersection(update_fields):
+            transaction.on_commit(lambda: get_search_index().user_saved(self))
+
     def gravatar(self, size=120):
         """Return a URL to the user's gravatar."""
-        gravatar_object = Gravatar(self.email)
-        gravatar_url = gravatar_object.get_image(size=size, default='mp')
-        return gravatar_url
+        return gravatar_url(self.gravatar_hash or email_hash(self.email), size)
 
     def mini_gravatar(self):
         """Return a URL to the a small version of the user's gravatar."""
@@ -50,28 +87,224 @@ class User(AbstractUser):
             self._follow(followee)
 
     def _follow(self, user):
-        user.followers.add(self)
+        with transaction.atomic():
+            _, created = User.followers.through.objects.get_or_create(from_user=user, to_user=self)
+            if created:
+                self._adjust_follow_counts([user.pk], 1)
+                user.num_followers += 1
+                TimelineEntry.backfill(self, [user.pk])
+        return created
 
     def _unfollow(self, user):
-        user.followers.remove(self)
+        with transaction.atomic():
+            deleted, _ = User.followers.through.objects.filter(from_user=user, to_user=self).delete()
+            if deleted:
+                self._adjust_follow_counts([user.pk], -1)
+                user.num_followers -= 1
+                TimelineEntry.prune(self, [user.pk])
+        return bool(deleted)
+
+    def follow_many(self, users):
+        """Makes self follow each of the given users or user ids, in one transaction.
+
+        Unknown users and self are skipped. Returns the set of ids of the users
+        that self did not follow before.
+        """
+        follows = User.followers.through
+        with transaction.atomic():
+            self._lock_follows()
+            user_ids = self._other_user_ids(users)
+            new_ids = user_ids - self.following_ids(user_ids)
+            if new_ids:
+                follows.objects.bulk_create(
+                    [follows(from_user_id=user_id, to_user_id=self.pk) for user_id in new_ids],
+                    ignore_conflicts=True,
+                )
+                self._adjust_follow_counts(new_ids, 1)
+                TimelineEntry.backfill(self, new_ids)
+        return new_ids
+
+    def unfollow_many(self, users):
+        """Makes self stop following each of the given users or user ids, in one transaction.
+
+        Returns the set of ids of the users that self followed before.
+        """
+        user_ids = {getattr(user, 'pk', user) for user in users}
+        with transaction.atomic():
+            self._lock_follows()
+            old_ids = self.following_ids(user_ids)
+            if old_ids:
+                User.followers.through.objects.filter(to_user=self, from_user__in=old_ids).delete()
+                self._adjust_follow_counts(old_ids, -1)
+                TimelineEntry.prune(self, old_ids)
+        return old_ids
+
+    def _lock_follows(self):
+        """Locks the row of self until the transaction ends, so concurrent changes to whom self follows run one at a time.
+
+        It is a write rather than select_for_update(), which SQLite ignores: a
+        write takes SQLite's database lock up front, so a concurrent transaction
+        waits for it instead of failing with 'database is locked' when it
+        starts writing after a read.
+        """
+        User.objects.filter(pk=self.pk).update(num_followees=models.F('num_followees'))
+
+    def _other_user_ids(self, users):
+        """Returns the set of ids of the given users or user ids that exist, other than self."""
+        user_ids = {getattr(user, 'pk', user) for user in users}
+        user_ids.discard(self.pk)
+        return set(User.objects.filter(pk__in=user_ids).order_by().values_list('pk', flat=True))
+
+    def _adjust_follow_counts(self, followee_ids, delta):
+        """Shift the follow counters of self and the given followees by delta each, safely under concurrency."""
+        User.objects.filter(pk__in=followee_ids).update(num_followers=models.F('num_followers') + delta)
+        User.objects.filter(pk=self.pk).update(num_followees=models.F('num_followees') + delta * len(followee_ids))
+        self.num_followees += delta * len(followee_ids)
+        forget_cached_users([self.pk, *followee_ids])
 
     def is_following(self, user):
         """ Returns whether self follows the given user."""
-        return user in self.followees.all()
+        return User.followers.through.objects.filter(from_user=user, to_user=self).exists()
+
+    def following_ids(self, users):
+        """Returns the set of ids of the given users that self follows, in one query."""
+        user_ids = [getattr(user, 'pk', user) for user in users]
+        if not user_ids:
+            return set()
+        follows = User.followers.through.objects.filter(to_user=self, from_user__in=user_ids)
+        return set(follows.values_list('from_user_id', flat=True))
+
+    def timeline(self):
+        """Returns the posts in self's home timeline, newest first."""
+        return Post.objects.filter(timeline_entries__user=self).annotate(
+            timeline_created_at=models.F('timeline_entries__created_at'),
+            timeline_post_id=models.F('timeline_entries__post_id'),
+        ).order_by('-timeline_created_at', '-timeline_post_id')
+
+    def timeline_shards(self):
+        """Returns querysets that together select the posts in self's home timeline, one per post shard.
+
+        The posts are annotated with timeline_created_at and timeline_post_id,
+        as those of timeline(), which is the only queryset unless posts are sharded.
+        """
+        if not is_sharded():
+            return [self.timeline()]
+        author_ids = [self.pk, *self.followees.order_by().values_list('pk', flat=True)]
+        return [
+            posts.annotate(timeline_created_at=models.F('created_at'), timeline_post_id=models.F('id'))
+            for posts in Post.objects.for_authors(author_ids)
+        ]
 
     def follower_count(self):
         """Returns the number of followers of self."""
-        return self.followers.count()
+        return self.num_followers
 
     def followee_count(self):
         """Returns the number of followees of self."""
-        return self.followees.count()
+        return self.num_followees
+
+def invalidate_user_list(sender, **kwargs):
+    """Discards the cached count and anchors of the user list when a user is deleted; connected to post_delete of User."""
+    invalidate_keyset_anchors(USER_LIST)
 
 class Post(models.Model):
     """The application post model."""
-    author = models.ForeignKey(to=User, on_delete=models.CASCADE, blank=False)
+    # Without a database constraint, as sharded posts are stored apart from their authors.
+    author = models.ForeignKey(to=User, on_delete=models.CASCADE, blank=False, db_constraint=False)
     text = models.CharField(max_length=280)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['author', '-created_at', '-id'], name='post_author_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        if adding and self.pk is None and is_sharded():
+            self.pk = allocate_post_ids(1)[0]
+            kwargs['force_insert'] = True
+        using = kwargs.get('using') or router.db_for_write(Post, instance=self)
+        # A post is only committed together with its timeline entries.
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+            if adding:
+                TimelineEntry.fan_out(self)
+        transaction.on_commit(lambda: get_search_index().post_saved(self), using=self._state.db)
+
+class TimelineEntry(models.Model):
+    """A post materialized into the home timeline of a user."""
+    user = models.ForeignKey(to=User, on_delete=models.CASCADE, related_name='timeline_entries')
+    post = models.ForeignKey(to=Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    created_at = models.DateTimeField()
+
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-post'], name='timeline_user_created_post_idx'),
+        ]
+
+    @classmethod
+    def fan_out(cls, post):
+        """Write post into the timelines of its author and the author's followers.
+
+        With sharded posts, timelines are merged when read and only the live
+        feed updates of the recipients are sent.
+        """
+        follows = User.followers.through.objects.filter(from_user_id=post.author_id)
+        follower_ids = follows.values_list('to_user_id', flat=True)
+        recipient_ids = [post.author_id, *follower_ids]
+        if not is_sharded():
+            cls.objects.bulk_create(
+                [cls(user_id=user_id, post=post, created_at=post.created_at) for user_id in recipient_ids],
+                ignore_conflicts=True,
+            )
+        transaction.on_commit(lambda: get_broker().publish(recipient_ids), using=post._state.db)
+
+    @classmethod
+    def backfill(cls, user, followee_ids):
+        """Copy the existing posts of the given followees into the timeline of user."""
+        if is_sharded():
+            return
+        posts = Post.objects.filter(author_id__in=followee_ids).order_by().values_list('id', 'created_at')
+        cls.objects.bulk_create(
+            [cls(user=user, post_id=post_id, created_at=created_at) for post_id, created_at in posts],
+            ignore_conflicts=True,
+        )
+
+    @classmethod
+    def prune(cls, user, followee_ids):
+        """Remove the posts of the given followees from the timeline of user."""
+        if is_sharded():
+            return
+        cls.objects.filter(user=user, post__author_id__in=followee_ids).delete()
+
+class Sequence(models.Model):
+    """A named counter on the default database, from which blocks of values are reserved."""
+    name = models.CharField(max_length=50, primary_key=True)
+    next_value = models.BigIntegerField()
+
+    @classmethod
+    def reserve(cls, name, count, start):
+        """Returns the first of count consecutive values reserved from the named sequence.
+
+        A sequence that does not exist yet is created to begin at start().
+        """
+        sequences = cls.objects.using(DEFAULT_DB_ALIAS)
+        while True:
+            with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                # Updating before reading takes the write lock, so concurrent reservations cannot overlap.
+                if sequences.filter(name=name).update(next_value=models.F('next_value') + count):
+                    return sequences.get(name=name).next_value - count
+            try:
+                with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                    sequences.create(name=name, next_value=start())
+            except IntegrityError:
+                # Created concurrently; reserve from it.
+                pass
@@ -0,0 +1,258 @@
+"""Keyset (cursor) pagination for post lists, and keyset-backed page numbers for user lists."""
+import base64
+import heapq
+import itertools
+import time
+from functools import cached_property
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils.dateparse import parse_datetime
+
+def encode_cursor(timestamp, pk):
+    """Returns an opaque cursor for the given sort key."""
+    raw = f'{timestamp.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    """Returns the (timestamp, pk) sort key of a cursor, or None if it is invalid."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        timestamp, pk = raw.split('|')
+        timestamp = parse_datetime(timestamp)
+        pk = int(pk)
+    except (ValueError, UnicodeError):
+        return None
+    if timestamp is None:
+        return None
+    return timestamp, pk
+
+class CursorPage:
+    """A page of objects with cursors pointing at the neighbouring pages."""
+
+    def __init__(self, object_list, older_cursor=None, newer_cursor=None):
+        self.object_list = object_list
+        self.older_cursor = older_cursor
+        self.newer_cursor = newer_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    @property
+    def has_older(self):
+        return self.older_cursor is not None
+
+    @property
+    def has_newer(self):
+        return self.newer_cursor is not None
+
+class CursorPaginator:
+    """Paginates a queryset by seeking past a (timestamp, id) key instead of using offsets.
+
+    Every page is a range read starting at its cursor, so the cost of a page
+    does not grow with the number of pages before it.
+    """
+
+    def __init__(self, queryset, per_page=None, key=('created_at', 'id')):
+        self.queryset = queryset
+        self.per_page = per_page or settings.POSTS_PER_PAGE
+        self.timestamp_field, self.pk_field = key
+
+    def page(self, before=None, after=None):
+        """Returns the page older than the before cursor, or newer than the after cursor.
+
+        Without a valid cursor the newest page is returned.
+        """
+        before = decode_cursor(before) if before else None
+        after = decode_cursor(after) if after else None
+        if after is not None:
+            return self._newer_page(after)
+        return self._older_page(before)
+
+    def queryset_for(self, before=None, after=None):
+        """Returns the query that fetches the page for the given cursor, plus one lookahead row."""
+        before = decode_cursor(before) if before else None
+        after = decode_cursor(after) if after else None
+        if after is not None:
+            return self._newer_queryset(after)
+        return self._older_queryset(before)
+
+    def _older_queryset(self, before):
+        return self._older_slice(self.queryset, before)
+
+    def _newer_queryset(self, after):
+        return self._newer_slice(self.queryset, after)
+
+    def _older_slice(self, queryset, before):
+        if before is not None:
+            queryset = queryset.filter(self._seek('lt', *before))
+        ordering = (f'-{self.timestamp_field}', f'-{self.pk_field}')
+        return queryset.order_by(*ordering)[:self.per_page + 1]
+
+    def _newer_slice(self, queryset, after):
+        queryset = queryset.filter(self._seek('gt', *after))
+        ordering = (self.timestamp_field, self.pk_field)
+        return queryset.order_by(*ordering)[:self.per_page + 1]
+
+    def _older_page(self, before):
+        objects = list(self._older_queryset(before))
+        has_older = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        return self._build_page(objects, has_older=has_older, has_newer=before is not None)
+
+    def _newer_page(self, after):
+        objects = list(self._newer_queryset(after))
+        if len(objects) <= self.per_page:
+            # Nothing newer than a full page remains, so show the newest page.
+            return self._older_page(None)
+        objects = objects[:self.per_page]
+        objects.reverse()
+        return self._build_page(objects, has_older=True, has_newer=True)
+
+    def _seek(self, comparison, timestamp, pk):
+        """Returns a filter selecting rows strictly past (timestamp, pk) in the given direction."""
+        return (
+            Q(**{f'{self.timestamp_field}__{comparison}e': timestamp})
+            & (Q(**{f'{self.timestamp_field}__{comparison}': timestamp}) | Q(**{f'{self.pk_field}__{comparison}': pk}))
+        )
+
+    def _build_page(self, objects, has_older, has_newer):
+        older_cursor = None
+        newer_cursor = None
+        if objects and has_older:
+            older_cursor = self._cursor_for(objects[-1])
+        if objects and has_newer:
+            newer_cursor = self._cursor_for(objects[0])
+        return CursorPage(objects, older_cursor=older_cursor, newer_cursor=newer_cursor)
+
+    def _cursor_for(self, obj):
+        return encode_cursor(*self._key_of(obj))
+
+    def _key_of(self, obj):
+        if isinstance(obj, dict):
+            # A row of a values() queryset.
+            return obj[self.timestamp_field], obj[self.pk_field]
+        return getattr(obj, self.timestamp_field), getattr(obj, self.pk_field)
+
+class MergedCursorPaginator(CursorPaginator):
+    """A CursorPaginator over the union of several querysets, such as one per database.
+
+    Every page reads one page and a lookahead row from each queryset and
+    merges them by key, so the querysets must not share any keys.
+    """
+
+    def __init__(self, querysets, per_page=None, key=('created_at', 'id')):
+        super().__init__(None, per_page, key)
+        self.querysets = list(querysets)
+
+    def _older_queryset(self, before):
+        return self._merge([self._older_slice(queryset, before) for queryset in self.querysets], reverse=True)
+
+    def _newer_queryset(self, after):
+        return self._merge([self._newer_slice(queryset, after) for queryset in self.querysets], reverse=False)
+
+    def _merge(self, slices, reverse):
+        """Returns the first per_page + 1 objects of the sorted slices, in key order."""
+        merged = heapq.merge(*slices, key=self._key_of, reverse=reverse)
+        return list(itertools.islice(merged, self.per_page + 1))
+
+def cursor_paginator(querysets, per_page=None, key=('created_at', 'id')):
+    """Returns a CursorPaginator over the union of querysets, merging them if there are several."""
+    if len(querysets) == 1:
+        return CursorPaginator(querysets[0], per_page, key)
+    return MergedCursorPaginator(querysets, per_page, key)
+
+def _version_key(name):
+    return f'keyset_version:{name}'
+
+def invalidate_keyset_anchors(name):
+    """Discards the cached count and anchors of the named KeysetPaginator list."""
+    cache.set(_version_key(name), time.time_ns(), timeout=None)
+
+def seek_filter(fields, values):
+    """Returns a filter selecting rows whose fields sort at or after values, in ascending order."""
+    (field, *rest_fields), (value, *rest_values) = fields, values
+    if not rest_fields:
+        return Q(**{f'{field}__gte': value})
+    # The leading range lets the database seek in an index on the fields before testing the rest.
+    return Q(**{f'{field}__gte': value}) & (Q(**{f'{field}__gt': value}) | seek_filter(rest_fields, rest_values))
+
+class KeysetPaginator(Paginator):
+    """A numbered-page Paginator that seeks to pages by key instead of by large offsets.
+
+    The list must be ordered ascending by key, whose last field is unique. The
+    total count and the key of the first row of every anchor_stride-th page are
+    read in one pass and cached under name until invalidate_keyset_anchors(name)
+    or timeout. A page is then read by seeking to the nearest anchor at or
+    before it, with an offset of less than anchor_stride pages.
+    """
+
+    def __init__(self, object_list, per_page, key, name, anchor_stride=10, timeout=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.key = tuple(key)
+        self.name = name
+        self.anchor_stride = anchor_stride
+        self.timeout = timeout
+
+    @cached_property
+    def _anchors(self):
+        """Returns (count, anchor keys), from the cache when the list has not changed."""
+        version = cache.get_or_set(_version_key(self.name), time.time_ns, timeout=None)
+        cache_key = f'keyset_anchors:{self.name}:{version}:{self.per_page}:{self.anchor_stride}'
+        anchors = cache.get(cache_key)
+        if anchors is None:
+            anchors = self._read_anchors()
+            cache.set(cache_key, anchors, timeout=self.timeout)
+        return anchors
+
+    def _read_anchors(self):
+        count = self.object_list.count()
+        rows_per_anchor = self.per_page * self.anchor_stride
+        if count <= rows_per_anchor:
+            # The first page needs no anchor.
+            return count, []
+        numbered = self.object_list.order_by(*self.key).annotate(
+            keyset_row=Window(RowNumber(), order_by=[F(field).asc() for field in self.key]),
+        ).values_list(*self.key, 'keyset_row')
+        sql, params = numbered.query.sql_with_params()
+        columns = ', '.join(self.key)
+        with connections[self.object_list.db].cursor() as cursor:
+            cursor.execute(
+                f'SELECT {columns} FROM ({sql}) numbered'
+                f' WHERE keyset_row > %s AND (keyset_row - 1) %% %s = 0 ORDER BY keyset_row',
+                [*params, rows_per_anchor, rows_per_anchor],
+            )
+            return count, [tuple(row) for row in cursor.fetchall()]
+
+    @cached_property
+    def count(self):
+        return self._anchors[0]
+
+    def page(self, number):
+        """Return a Page object for the given 1-based page number."""
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+        anchor_index = (number - 1) // self.anchor_stride
+        anchor = self._anchors[1][anchor_index - 1] if anchor_index else None
+        offset = bottom - anchor_index * self.anchor_stride * self.per_page
+        queryset = self.queryset_from(anchor)
+        return self._get_page(list(queryset[offset:offset + top - bottom]), number, self)
+
+    def queryset_from(self, anchor):
+        """Returns the list from the row with the given key on, or from the start if anchor is None."""
+        queryset = self.object_list.order_by(*self.key)
+        if anchor is not None:
+            queryset = queryset.filter(seek_filter(self.key, anchor))
+        return queryset
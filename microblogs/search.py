@@ -0,0 +1,235 @@
+"""Full-text search over post texts and user names, usernames and bios.
+
+On SQLite, search reads the FTS5 tables created by migration 0011, which
+triggers keep in step with every insert, update and delete. With sharded
+posts, every shard has its own post index, and their results are merged. Other databases
+use an inverted index held in memory by each process. It is built from the
+database on the first search and updated as posts and profiles are saved in
+that process.
+
+Every search term must match, and the last term also matches as a prefix, so
+results narrow as the query is typed. Results are ranked by BM25 among the
+newest SEARCH_RANK_CANDIDATES matches, so a query matching a large share of
+all posts costs no more than one matching that many.
+"""
+import bisect
+import heapq
+import itertools
+import math
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.utils.module_loading import import_string
+
+_WORD = re.compile(r'\w+')
+
+# Relative weights of the user fields, in the column order of microblogs_user_fts.
+USER_FIELD_WEIGHTS = {'username': 10.0, 'first_name': 5.0, 'last_name': 5.0, 'bio': 1.0}
+
+def tokenize(text):
+    """Returns the lowercased words of text without diacritics, as FTS5's unicode61 tokenizer splits them."""
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(character for character in text if not unicodedata.combining(character))
+    return _WORD.findall(text)
+
+def search_terms(query):
+    """Returns the terms of a search query, at most SEARCH_MAX_TERMS of them."""
+    return tokenize(query)[:settings.SEARCH_MAX_TERMS]
+
+def in_rank_order(queryset, ids):
+    """Returns the objects of queryset with the given ids, in the order of ids."""
+    objects = queryset.order_by().in_bulk(ids)
+    return [objects[pk] for pk in ids if pk in objects]
+
+class SQLiteSearchIndex:
+    """Searches the FTS5 tables of SQLite, which triggers keep up to date."""
+
+    def post_saved(self, post):
+        pass
+
+    def user_saved(self, user):
+        pass
+
+    def search_posts(self, query, offset, limit):
+        """Returns the ids of the posts best matching query, from offset up to limit of them."""
+        shards = settings.POST_SHARDS
+        if len(shards) == 1:
+            matches = self._search(shards[0], 'microblogs_post_fts', 'rank', query, offset, limit)
+        else:
+            # Every shard has its own index, which scores its own posts; merge the best of each.
+            matches = heapq.merge(
+                *[self._search(alias, 'microblogs_post_fts', 'rank', query, 0, offset + limit) for alias in shards],
+                key=lambda match: (match[0], -match[1]),
+            )
+            matches = itertools.islice(matches, offset, offset + limit)
+        return [pk for _, pk in matches]
+
+    def search_users(self, query, offset, limit):
+        """Returns the ids of the users best matching query, from offset up to limit of them."""
+        weights = ', '.join(str(weight) for weight in USER_FIELD_WEIGHTS.values())
+        rank = f'bm25(microblogs_user_fts, {weights})'
+        return [pk for _, pk in self._search(DEFAULT_DB_ALIAS, 'microblogs_user_fts', rank, query, offset, limit)]
+
+    def _search(self, alias, table, rank, query, offset, limit):
+        """Returns the (score, id) of the best matches in table on the given database, best first."""
+        terms = search_terms(query)
+        if not terms:
+            return []
+        # Quoting every term keeps FTS5 query syntax in user input from being interpreted.
+        match = ' '.join(f'"{term}"' for term in terms) + '*'
+        # FTS5 reads matches in descending rowid order without sorting, so the LIMIT stops the read early.
+        sql = (
+            f'SELECT score, id FROM ('
+            f'SELECT rowid AS id, {rank} AS score FROM {table} WHERE {table} MATCH %s ORDER BY rowid DESC LIMIT %s'
+            f') ORDER BY score, id DESC LIMIT %s OFFSET %s'
+        )
+        with connections[alias].cursor() as cursor:
+            cursor.execute(sql, [match, settings.SEARCH_RANK_CANDIDATES, limit, offset])
+            return cursor.fetchall()
+
+class InvertedIndex:
+    """An in-memory map from terms to the documents containing them, scored with BM25."""
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self, weights):
+        self.weights = weights
+        self.postings = defaultdict(dict)
+        self.terms = []
+        self.document_terms = {}
+        self.document_lengths = {}
+        self.total_length = 0
+
+    def add(self, doc_id, fields):
+        """Indexes a document given as a dict of field name to text, replacing any earlier version."""
+        self.remove(doc_id)
+        frequencies = defaultdict(float)
+        length = 0
+        for name, text in fields.items():
+            words = tokenize(text or '')
+            length += len(words)
+            for word in words:
+                frequencies[word] += self.weights[name]
+        for term, frequency in frequencies.items():
+            postings = self.postings[term]
+            if not postings:
+                bisect.insort(self.terms, term)
+            postings[doc_id] = frequency
+        self.document_terms[doc_id] = list(frequencies)
+        self.document_lengths[doc_id] = length
+        self.total_length += length
+
+    def remove(self, doc_id):
+        terms = self.document_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self.postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self.postings[term]
+                del self.terms[bisect.bisect_left(self.terms, term)]
+        self.total_length -= self.document_lengths.pop(doc_id)
+
+    def search(self, terms, offset, limit):
+        """Returns the ids of the documents matching every term, the last one as a prefix, best first."""
+        if not terms or not self.document_lengths:
+            return []
+        postings = [self.postings.get(term, {}) for term in terms[:-1]]
+        postings.append(self._prefix_postings(terms[-1]))
+        # Intersect starting from the rarest term.
+        postings.sort(key=len)
+        matches = set(postings[0])
+        for other in postings[1:]:
+            matches.intersection_update(other)
+            if not matches:
+                return []
+        if len(matches) > settings.SEARCH_RANK_CANDIDATES:
+            matches = heapq.nlargest(settings.SEARCH_RANK_CANDIDATES, matches)
+        count = len(self.document_lengths)
+        average_length = self.total_length / count or 1
+        idfs = [math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5)) for posting in postings]
+        scores = []
+        for doc_id in matches:
+            norm = self.k1 * (1 - self.b + self.b * self.document_lengths[doc_id] / average_length)
+            score = 0.0
+            for idf, posting in zip(idfs, postings):
+                frequency = posting[doc_id]
+                score += idf * frequency * (self.k1 + 1) / (frequency + norm)
+            scores.append((score, doc_id))
+        best = heapq.nlargest(offset + limit, scores)
+        return [doc_id for _, doc_id in best[offset:]]
+
+    def _prefix_postings(self, prefix):
+        start = bisect.bisect_left(self.terms, prefix)
+        merged = {}
+        for term in itertools.islice(self.terms, start, None):
+            if not term.startswith(prefix):
+                break
+            for doc_id, frequency in self.postings[term].items():
+                merged[doc_id] = merged.get(doc_id, 0.0) + frequency
+        return merged
+
+class InMemorySearchIndex:
+    """Searches inverted indexes built in this process, for databases without a full-text index.
+
+    Posts and profiles saved by other processes are only seen after a restart.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._posts = None
+        self._users = None
+
+    def post_saved(self, post):
+        with self._lock:
+            if self._posts is not None:
+                self._posts.add(post.pk, {'text': post.text})
+
+    def user_saved(self, user):
+        with self._lock:
+            if self._users is not None:
+                self._users.add(user.pk, {name: getattr(user, name) for name in USER_FIELD_WEIGHTS})
+
+    def search_posts(self, query, offset, limit):
+        """Returns the ids of the posts best matching query, from offset up to limit of them."""
+        with self._lock:
+            if self._posts is None:
+                self._posts = self._build_post_index()
+            return self._posts.search(search_terms(query), offset, limit)
+
+    def search_users(self, query, offset, limit):
+        """Returns the ids of the users best matching query, from offset up to limit of them."""
+        with self._lock:
+            if self._users is None:
+                self._users = self._build_user_index()
+            return self._users.search(search_terms(query), offset, limit)
+
+    def _build_post_index(self):
+        from .models import Post
+        index = InvertedIndex({'text': 1.0})
+        for posts in Post.objects.order_by().on_each_shard():
+            for pk, text in posts.values_list('pk', 'text').iterator():
+                index.add(pk, {'text': text})
+        return index
+
+    def _build_user_index(self):
+        from .models import User
+        index = InvertedIndex(USER_FIELD_WEIGHTS)
+        for row in User.objects.order_by().values('pk', *USER_FIELD_WEIGHTS).iterator():
+            index.add(row.pop('pk'), row)
+        return index
+
+@lru_cache(maxsize=None)
+def get_search_index():
+    """Returns the search index set by SEARCH_BACKEND, or the best one the database supports."""
+    if settings.SEARCH_BACKEND:
+        return import_string(settings.SEARCH_BACKEND)()
+    if connection.vendor == 'sqlite' and 'microblogs_post_fts' in connection.introspection.table_names():
+        return SQLiteSearchIndex()
+    return InMemorySearchIndex()
@@ -0,0 +1,177 @@
+"""Horizontal sharding of posts by author.
+
+POST_SHARDS lists the databases that hold posts. By default it is just the
+default database, and posts are queried like any other model. With more
+shards, the posts of an author live on POST_SHARDS[author_id % len(POST_SHARDS)]
+while users, follows and everything else stay on the default database:
+
+* Post.objects.filter(author=...) is sent to the author's shard, and new posts
+  are saved there, with ids reserved from a sequence on the default database
+  so they stay unique across shards.
+* Lists of posts by many authors are read with one query per shard and merged
+  by (created_at, id), see for_authors() and MergedCursorPaginator.
+* Home timelines are merged from the shards when read, instead of being
+  written into TimelineEntry rows, which cannot refer to posts elsewhere.
+* After POST_SHARDS changes, the reshard_posts command moves posts to the
+  shard of their author.
+"""
+import threading
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, models
+from django.db.models import Max
+
+POST_ID_SEQUENCE = 'post_id'
+
+def is_sharded():
+    """Returns whether posts live on other databases than the default one."""
+    return settings.POST_SHARDS != [DEFAULT_DB_ALIAS]
+
+def shard_for_author(author_id):
+    """Returns the alias of the database holding the posts of the given author."""
+    shards = settings.POST_SHARDS
+    return shards[author_id % len(shards)]
+
+def shards_for_authors(author_ids):
+    """Returns a dict from shard alias to the ids of the given authors whose posts it holds."""
+    shards = {}
+    for author_id in author_ids:
+        shards.setdefault(shard_for_author(author_id), []).append(author_id)
+    return shards
+
+class ShardRouter:
+    """Sends queries for posts to the shard of their author, when the author can be told from the hints."""
+
+    def db_for_read(self, model, **hints):
+        return self._shard_for(model, hints.get('instance'))
+
+    def db_for_write(self, model, **hints):
+        return self._shard_for(model, hints.get('instance'))
+
+    def allow_relation(self, obj1, obj2, **hints):
+        from .models import Post
+        # Posts refer to authors on the default database.
+        if isinstance(obj1, Post) or isinstance(obj2, Post):
+            return True
+        return None
+
+    def _shard_for(self, model, instance):
+        from .models import Post, User
+        if not is_sharded() or model is not Post or instance is None:
+            return None
+        if isinstance(instance, Post):
+            return instance._state.db or shard_for_author(instance.author_id)
+        if isinstance(instance, User):
+            # Related managers, such as user.post_set, pass the author.
+            return shard_for_author(instance.pk)
+        return None
+
+class PostIdAllocator:
+    """Hands out post ids that are unique across shards.
+
+    Ids are reserved from a sequence on the default database POST_ID_BLOCK_SIZE
+    at a time, so most posts do not touch the default database for their id.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+
+    def allocate(self, count):
+        """Returns a list of count new post ids."""
+        ids = []
+        with self._lock:
+            while len(ids) < count:
+                if self._next == self._end:
+                    block_size = max(settings.POST_ID_BLOCK_SIZE, count - len(ids))
+                    self._next = self._reserve(block_size)
+                    self._end = self._next + block_size
+                taken = min(self._end - self._next, count - len(ids))
+                ids.extend(range(self._next, self._next + taken))
+                self._next += taken
+        return ids
+
+    def _reserve(self, count):
+        from .models import Sequence
+        return Sequence.reserve(POST_ID_SEQUENCE, count, start=first_free_post_id)
+
+_allocator = PostIdAllocator()
+
+def allocate_post_ids(count):
+    """Returns a list of count post ids that are unique across shards."""
+    return _allocator.allocate(count)
+
+def first_free_post_id():
+    """Returns one more than the largest post id on any shard, or on the default database."""
+    from .models import Post
+    aliases = {DEFAULT_DB_ALIAS, *settings.POST_SHARDS}
+    largest = [Post.objects.using(alias).aggregate(last=Max('id'))['last'] or 0 for alias in aliases]
+    return max(largest) + 1
+
+class PostQuerySet(models.QuerySet):
+    """Posts, read from and written to the shard of their author."""
+
+    def filter(self, *args, **kwargs):
+        queryset = super().filter(*args, **kwargs)
+        if self._db is None and is_sharded():
+            author = kwargs.get('author', kwargs.get('author_id'))
+            if author is not None:
+                queryset = queryset.using(shard_for_author(getattr(author, 'pk', author)))
+        return queryset
+
+    def create(self, **kwargs):
+        if self._db is not None or not is_sharded():
+            return super().create(**kwargs)
+        # Saved without naming a database, so the router picks the author's shard.
+        post = self.model(**kwargs)
+        post.save(force_insert=True)
+        return post
+
+    def bulk_create(self, objs, *args, **kwargs):
+        if self._db is not None or not is_sharded():
+            return super().bulk_create(objs, *args, **kwargs)
+        objs = list(objs)
+        new_posts = [post for post in objs if post.pk is None]
+        for post, post_id in zip(new_posts, allocate_post_ids(len(new_posts))):
+            post.pk = post_id
+        by_shard = {}
+        for post in objs:
+            by_shard.setdefault(shard_for_author(post.author_id), []).append(post)
+        for alias, posts in by_shard.items():
+            self.using(alias).bulk_create(posts, *args, **kwargs)
+        return objs
+
+    def in_bulk(self, id_list=None, *, field_name='pk'):
+        if self._db is not None or not is_sharded():
+            return super().in_bulk(id_list, field_name=field_name)
+        objects = {}
+        for queryset in self.on_each_shard():
+            objects.update(queryset.in_bulk(id_list, field_name=field_name))
+        return objects
+
+    def on_each_shard(self):
+        """Returns this queryset once for every shard."""
+        if not is_sharded():
+            return [self]
+        return [self.using(alias) for alias in settings.POST_SHARDS]
+
+    def for_authors(self, author_ids):
+        """Returns one queryset per shard, together selecting the posts of the given authors."""
+        if not is_sharded():
+            return [self.filter(author_id__in=author_ids)]
+        return [
+            self.using(alias).filter(author_id__in=ids)
+            for alias, ids in shards_for_authors(author_ids).items()
+        ]
+
+    def with_authors(self):
+        """Returns the posts with their authors, joined in unless they are on another database."""
+        if is_sharded():
+            return self.prefetch_related('author')
+        return self.select_related('author')
+
+def delete_author_posts(sender, instance, using, **kwargs):
+    """Deletes the posts of a deleted user from their shard; connected to post_delete of User."""
+    from .models import Post
+    if is_sharded() and using == DEFAULT_DB_ALIAS:
+        Post.objects.filter(author_id=instance.pk).delete()
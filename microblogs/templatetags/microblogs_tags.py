@@ -0,0 +1,28 @@
+from django import template
+from django.conf import settings
+from django.utils.safestring import mark_safe
+from microblogs.fragments import render_post_rows, render_profile_card
+from microblogs.timestamps import RelativeTimeFormatter, absolute_time
+
+register = template.Library()
+
+@register.simple_tag(takes_context=True)
+def post_rows(context, posts):
+    """Render the table rows of the given posts, reusing cached rows."""
+    return mark_safe(render_post_rows(posts, timestamp_formatter(context.get('request'))))
+
+@register.simple_tag
+def profile_card(user, following, followable):
+    """Render the profile card of user, reusing a cached card."""
+    return mark_safe(render_profile_card(user, following, followable))
+
+def timestamp_formatter(request):
+    """Returns the post timestamp formatter of the request, created on first use."""
+    if settings.RELATIVE_TIMESTAMPS_ON_CLIENT:
+        return absolute_time
+    formatter = getattr(request, 'relative_time_formatter', None)
+    if formatter is None:
+        formatter = RelativeTimeFormatter()
+        if request is not None:
+            request.relative_time_formatter = formatter
+    return formatter
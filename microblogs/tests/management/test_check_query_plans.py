@@ -0,0 +1,11 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+
+class CheckQueryPlansTestCase(TestCase):
+    """Test suite for the check_query_plans command."""
+
+    def test_hot_queries_use_indexes(self):
+        output = StringIO()
+        call_command('check_query_plans', stdout=output)
+        self.assertIn('All hot queries use indexes.', output.getvalue())
@@ -0,0 +1,33 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from microblogs.models import User
+
+class ReconcileFollowCountsTestCase(TestCase):
+    """Test suite for the reconcile_follow_counts command."""
+
+    fixtures = ['microblogs/tests/fixtures/default_user.json',
+                'microblogs/tests/fixtures/other_users.json']
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.jane = User.objects.get(username='@janedoe')
+
+    def test_reconcile_fixes_drifted_counters(self):
+        self.jane.followers.add(self.user)
+        User.objects.filter(pk=self.user.pk).update(num_followers=7)
+        output = StringIO()
+        call_command('reconcile_follow_counts', stdout=output)
+        self.assertIn('2 users', output.getvalue())
+        self.user.refresh_from_db()
+        self.jane.refresh_from_db()
+        self.assertEqual(self.user.num_followers, 0)
+        self.assertEqual(self.user.num_followees, 1)
+        self.assertEqual(self.jane.num_followers, 1)
+        self.assertEqual(self.jane.num_followees, 0)
+
+    def test_reconcile_leaves_consistent_counters(self):
+        self.user.toggle_follow(self.jane)
+        output = StringIO()
+        call_command('reconcile_follow_counts', stdout=output)
+        self.assertIn('0 users', output.getvalue())
@@ -0,0 +1,34 @@
+import sqlite3
+import tempfile
+from pathlib import Path
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, override_settings
+from microblogs.management.commands.sync_replicas import Command, sqlite_path
+
+class SyncReplicasTestCase(SimpleTestCase):
+    """Test suite for the sync_replicas command."""
+
+    def test_sync_copies_database_to_replicas(self):
+        with tempfile.TemporaryDirectory() as directory:
+            primary_path = str(Path(directory) / 'db.sqlite3')
+            replica_paths = [str(Path(directory) / f'db.replica{number}.sqlite3') for number in (1, 2)]
+            primary = sqlite3.connect(primary_path)
+            primary.execute('CREATE TABLE clucks (text)')
+            primary.execute("INSERT INTO clucks VALUES ('Cluck')")
+            primary.commit()
+            primary.close()
+            Command().sync(primary_path, replica_paths)
+            for path in replica_paths:
+                replica = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+                self.assertEqual(replica.execute('SELECT text FROM clucks').fetchall(), [('Cluck',)])
+                replica.close()
+
+    def test_sqlite_path_reads_file_uris(self):
+        self.assertEqual(sqlite_path({'NAME': 'file:/srv/db.replica1.sqlite3?mode=ro'}), '/srv/db.replica1.sqlite3')
+        self.assertEqual(sqlite_path({'NAME': Path('/srv/db.sqlite3')}), '/srv/db.sqlite3')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_sync_requires_replicas(self):
+        with self.assertRaises(CommandError):
+            call_command('sync_replicas')
@@ -0,0 +1,84 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from microblogs.models import User
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+@override_settings(CACHES=LOCMEM_CACHES, USER_CACHE_ENABLED=True)
+class CachedAuthenticationMiddlewareTestCase(TestCase):
+    """Test suite for loading request.user from the cache."""
+
+    fixtures = ['microblogs/tests/fixtures/default_user.json',
+                'microblogs/tests/fixtures/other_users.json']
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.get(username='@johndoe')
+        self.client.login(username=self.user.username, password='Password123')
+        self.url = reverse('update_password')
+
+    def _user_queries(self, client=None):
+        """Returns the response to a GET of the update password page, and the number of queries of the user table."""
+        with CaptureQueriesContext(connection) as queries:
+            response = (client or self.client).get(self.url)
+        return response, sum('"microblogs_user"' in query['sql'] for query in queries)
+
+    def test_user_is_loaded_from_cache(self):
+        self.assertEqual(self._user_queries()[1], 1)
+        response, user_queries = self._user_queries()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(user_queries, 0)
+        self.assertEqual(response.context['user'], self.user)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_cached_sessions_and_user_need_no_queries(self):
+        client = Client()
+        client.login(username=self.user.username, password='Password123')
+        client.get(self.url)
+        with self.assertNumQueries(0):
+            response = client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_profile_update_replaces_cached_user(self):
+        self._user_queries()
+        response = self.client.post(reverse('update_profile'), {
+            'first_name': 'Johnny', 'last_name': 'Doe', 'email': 'johndoe@example.org', 'bio': 'New bio',
+        })
+        self.assertRedirects(response, reverse('feed'), status_code=302, target_status_code=200)
+        response, user_queries = self._user_queries()
+        self.assertEqual(user_queries, 0)
+        self.assertEqual(response.context['user'].first_name, 'Johnny')
+
+    def test_password_update_logs_out_other_sessions(self):
+        other_client = Client()
+        other_client.login(username=self.user.username, password='Password123')
+        self._user_queries(other_client)
+        self.client.post(self.url, {
+            'old_password': 'Password123',
+            'new_password': 'BetterPassword123',
+            'password_confirmation': 'BetterPassword123',
+        })
+        self.assertEqual(self._user_queries()[0].status_code, 200)
+        response = other_client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+
+    def test_following_replaces_cached_users(self):
+        jane = User.objects.get(username='@janedoe')
+        self._user_queries()
+        self.client.get(reverse('follow_toggle', kwargs={'user_id': jane.id}))
+        response, _ = self._user_queries()
+        self.assertEqual(response.context['user'].followee_count(), 1)
+
+    @override_settings(USER_CACHE_ENABLED=False)
+    def test_user_is_not_cached_unless_enabled(self):
+        self._user_queries()
+        self.assertEqual(self._user_queries()[1], 1)
+
+    def test_deleted_user_is_logged_out(self):
+        self._user_queries()
+        User.objects.filter(pk=self.user.pk).delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,123 @@
+from unittest import mock
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError, connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from microblogs import db
+from microblogs.auth import _user_key
+from microblogs.models import Post, User
+from microblogs.tests.helpers import create_posts
+
+# The replica mirrors the test database, so reads from it only see committed rows.
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaPinningMiddlewareTestCase(TransactionTestCase):
+    """Test suite for routing reads to replicas and pinning clients that write."""
+
+    databases = {'default', 'replica1'}
+    fixtures = ['microblogs/tests/fixtures/default_user.json',
+                'microblogs/tests/fixtures/other_users.json']
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.other_user = User.objects.get(username='@janedoe')
+        self.client.login(username=self.user.username, password='Password123')
+        db._replica_down_until.clear()
+
+    def tearDown(self):
+        db._replica_down_until.clear()
+
+    def _get(self, url):
+        """Returns the response to a GET of url, and the number of queries run on the replica."""
+        with CaptureQueriesContext(connections['replica1']) as replica_queries:
+            response = self.client.get(url)
+        return response, len(replica_queries)
+
+    def test_read_views_read_from_replica(self):
+        create_posts(self.user, 100, 103)
+        for url in [reverse('feed'), reverse('user_list'), reverse('show_user', kwargs={'user_id': self.user.id})]:
+            response, replica_queries = self._get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertGreater(replica_queries, 0, url)
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+    @override_settings(ROOT_URLCONF='microblogs.tests.views.test_async_views')
+    def test_async_read_views_read_from_replica(self):
+        for url in [reverse('feed'), reverse('user_list'), reverse('show_user', kwargs={'user_id': self.user.id})]:
+            response, replica_queries = self._get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertGreater(replica_queries, 0, url)
+
+    def test_other_views_read_from_default(self):
+        response, replica_queries = self._get(reverse('search') + '?q=Post')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(replica_queries, 0)
+
+    def test_writing_pins_client_to_default(self):
+        response = self.client.post(reverse('new_post'), {'text': 'Read your writes'})
+        cookie = response.cookies[settings.REPLICA_PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_PIN_SECONDS)
+        response, replica_queries = self._get(reverse('feed'))
+        self.assertEqual(replica_queries, 0)
+        self.assertContains(response, 'Read your writes')
+
+    def test_follow_toggle_pins_client_to_default(self):
+        response = self.client.get(reverse('follow_toggle', kwargs={'user_id': self.other_user.id}))
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        _, replica_queries = self._get(response.url)
+        self.assertEqual(replica_queries, 0)
+
+    def test_pin_expires(self):
+        self.client.post(reverse('new_post'), {'text': 'Read your writes'})
+        del self.client.cookies[settings.REPLICA_PIN_COOKIE]
+        _, replica_queries = self._get(reverse('feed'))
+        self.assertGreater(replica_queries, 0)
+
+    @override_settings(
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}, USER_CACHE_ENABLED=True,
+    )
+    def test_logged_in_user_is_read_from_default_and_cached(self):
+        cache.clear()
+        with CaptureQueriesContext(connections['replica1']) as replica_queries:
+            response = self.client.get(reverse('feed'))
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(len(replica_queries), 0)
+        self.assertFalse(any('"microblogs_user"."password"' in query['sql'] for query in replica_queries))
+        self.assertEqual(cache.get(_user_key(self.user.pk))._state.db, 'default')
+
+    def test_unavailable_replica_falls_back_to_default(self):
+        replica = connections['replica1']
+        with CaptureQueriesContext(replica) as replica_queries, self.assertLogs('microblogs.db', 'WARNING'):
+            with mock.patch.object(replica, 'ensure_connection', side_effect=OperationalError):
+                response = self.client.get(reverse('feed'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(replica_queries), 0)
+        # The replica is skipped until REPLICA_RETRY_SECONDS pass.
+        _, replica_queries = self._get(reverse('feed'))
+        self.assertEqual(replica_queries, 0)
+        db._replica_down_until.clear()
+        _, replica_queries = self._get(reverse('feed'))
+        self.assertGreater(replica_queries, 0)
+
+    def test_view_failing_on_replica_is_run_again_on_default(self):
+        calls = []
+        def failing_on_replica(execute, sql, params, many, context):
+            calls.append(sql)
+            raise OperationalError('no such table')
+        with connections['replica1'].execute_wrapper(failing_on_replica), self.assertLogs('microblogs.db', 'WARNING'):
+            response = self.client.get(reverse('feed'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(calls), 1)
+
+    def test_writes_in_read_views_go_to_default(self):
+        router = db.ReplicaRouter()
+        routing, token = db.start_routing()
+        try:
+            routing.replica = 'replica1'
+            self.assertEqual(router.db_for_read(Post), 'replica1')
+            self.assertEqual(router.db_for_write(Post), 'default')
+            self.assertEqual(router.db_for_read(Post), 'default')
+        finally:
+            db.end_routing(token)
+        self.assertEqual(router.db_for_read(Post), 'default')
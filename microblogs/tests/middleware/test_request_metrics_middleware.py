@@ -0,0 +1,44 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from microblogs.metrics import registry
+from microblogs.models import User
+from microblogs.tests.helpers import create_posts
+
+@override_settings(REQUEST_METRICS_ENABLED=True, REQUEST_METRICS_DIR=None)
+class RequestMetricsMiddlewareTestCase(TestCase):
+    """Test suite for the request metrics middleware."""
+
+    fixtures = ['microblogs/tests/fixtures/default_user.json']
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        registry.reset()
+
+    def tearDown(self):
+        registry.reset()
+
+    def test_response_has_server_timing_header(self):
+        self.client.login(username=self.user.username, password='Password123')
+        response = self.client.get(reverse('feed'))
+        header = response['Server-Timing']
+        for metric in ['db;dur=', 'tpl;dur=', 'view;dur=', 'total;dur=']:
+            self.assertIn(metric, header)
+        self.assertRegex(header, r'desc="[1-9]\d* queries"')
+
+    def test_requests_are_aggregated_by_url_name(self):
+        self.client.login(username=self.user.username, password='Password123')
+        create_posts(self.user, 100, 103)
+        self.client.get(reverse('feed'))
+        self.client.get(reverse('feed'))
+        self.client.get(reverse('user_list'))
+        histograms = registry.histograms
+        self.assertEqual(histograms['feed']['total_ms'].count, 2)
+        self.assertEqual(histograms['user_list']['total_ms'].count, 1)
+        self.assertGreater(histograms['feed']['queries'].total, 0)
+        self.assertGreater(histograms['feed']['template_ms'].total, 0)
+
+    @override_settings(REQUEST_METRICS_ENABLED=False)
+    def test_middleware_is_opt_in(self):
+        response = self.client.get(reverse('home'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(registry.histograms, {})
@@ -1,4 +1,6 @@
+from unittest import mock
 from django.core.exceptions import ValidationError
+from django.db import DatabaseError
 from django.test import TestCase
 from microblogs.models import User, Post
 
@@ -25,6 +27,12 @@ class PostModelTestCase(TestCase):
         self.post.text = 'x' * 281
         self._assert_post_is_invalid()
 
+    def test_post_is_not_saved_when_fan_out_fails(self):
+        with mock.patch('microblogs.models.TimelineEntry.fan_out', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                Post.objects.create(author=self.user, text='Never fanned out')
+        self.assertFalse(Post.objects.filter(text='Never fanned out').exists())
+
     def _assert_post_is_valid(self):
         try:
             self.post.full_clean()
@@ -0,0 +1,64 @@
+from django.test import TestCase
+from microblogs.forms import PostForm
+from microblogs.models import User, Post, TimelineEntry
+from microblogs.tests.helpers import create_posts
+
+class TimelineEntryModelTestCase(TestCase):
+    """Test suite for the TimelineEntry model."""
+
+    fixtures = ['microblogs/tests/fixtures/default_user.json',
+                'microblogs/tests/fixtures/other_users.json']
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.jane = User.objects.get(username='@janedoe')
+
+    def test_new_post_is_written_to_author_timeline(self):
+        form = PostForm(data={'text': 'Hello world'})
+        post = form.save(self.user)
+        self.assertEqual(list(self.user.timeline()), [post])
+
+    def test_new_post_is_written_to_follower_timelines(self):
+        self.user.toggle_follow(self.jane)
+        post = Post.objects.create(author=self.jane, text='Hello followers')
+        self.assertIn(post, self.user.timeline())
+        self.assertEqual(TimelineEntry.objects.filter(post=post).count(), 2)
+
+    def test_new_post_is_not_written_to_other_timelines(self):
+        post = Post.objects.create(author=self.jane, text='Hello nobody')
+        self.assertNotIn(post, self.user.timeline())
+
+    def test_follow_backfills_timeline(self):
+        create_posts(self.jane, 100, 105)
+        self.user.toggle_follow(self.jane)
+        self.assertEqual(self.user.timeline().count(), 5)
+
+    def test_unfollow_prunes_timeline(self):
+        create_posts(self.user, 100, 102)
+        create_posts(self.jane, 200, 205)
+        self.user.toggle_follow(self.jane)
+        self.user.toggle_follow(self.jane)
+        texts = [post.text for post in self.user.timeline()]
+        self.assertEqual(texts, ['Post__101', 'Post__100'])
+
+    def test_bulk_follow_backfills_and_prunes_timeline(self):
+        petra = User.objects.get(username='@petrapickles')
+        create_posts(self.jane, 100, 103)
+        create_posts(petra, 200, 202)
+        self.user.follow_many([self.jane, petra])
+        self.assertEqual(self.user.timeline().count(), 5)
+        self.user.unfollow_many([self.jane])
+        self.assertEqual([post.text for post in self.user.timeline()], ['Post__201', 'Post__200'])
+
+    def test_timeline_is_ordered_newest_first(self):
+        self.user.toggle_follow(self.jane)
+        create_posts(self.jane, 100, 102)
+        create_posts(self.user, 200, 202)
+        texts = [post.text for post in self.user.timeline()]
+        self.assertEqual(texts, ['Post__201', 'Post__200', 'Post__101', 'Post__100'])
+
+    def test_deleting_post_removes_timeline_entries(self):
+        self.user.toggle_follow(self.jane)
+        post = Post.objects.create(author=self.jane, text='Short lived')
+        post.delete()
+        self.assertFalse(TimelineEntry.objects.exists())
@@ -1,5 +1,8 @@
+from hashlib import md5
 from django.core.exceptions import ValidationError
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from microblogs.models import User
 
 class UserModelTestCase(TestCase):
@@ -104,6 +107,28 @@ class UserModelTestCase(TestCase):
         self.assertFalse(self.user.is_following(jane))
         self.assertFalse(jane.is_following(self.user))
 
+    def test_saving_stale_user_keeps_follow_counts(self):
+        jane = User.objects.get(username='@janedoe')
+        stale_user = User.objects.get(pk=self.user.pk)
+        jane.toggle_follow(self.user)
+        stale_user.bio = 'Saved from a stale copy'
+        stale_user.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.bio, 'Saved from a stale copy')
+        self.assertEqual(self.user.follower_count(), 1)
+
+    def test_following_ids(self):
+        jane = User.objects.get(username='@janedoe')
+        petra = User.objects.get(username='@petrapickles')
+        peter = User.objects.get(username='@peterpickles')
+        self.user.toggle_follow(jane)
+        self.user.toggle_follow(peter)
+        with self.assertNumQueries(1):
+            following_ids = self.user.following_ids([jane, petra, peter, self.user])
+        self.assertEqual(following_ids, {jane.id, peter.id})
+        self.assertEqual(self.user.following_ids([petra.id]), set())
+        self.assertEqual(self.user.following_ids([]), set())
+
     def test_follow_counters(self):
         jane = User.objects.get(username='@janedoe')
         petra = User.objects.get(username='@petrapickles')
@@ -122,11 +147,93 @@ class UserModelTestCase(TestCase):
         self.assertEqual(peter.follower_count(), 2)
         self.assertEqual(peter.followee_count(), 0)
 
+    def test_follow_counters_are_stored(self):
+        jane = User.objects.get(username='@janedoe')
+        self.user.toggle_follow(jane)
+        self.assertEqual(User.objects.get(pk=jane.pk).num_followers, 1)
+        self.assertEqual(User.objects.get(pk=self.user.pk).num_followees, 1)
+        self.user.toggle_follow(jane)
+        self.assertEqual(User.objects.get(pk=jane.pk).num_followers, 0)
+        self.assertEqual(User.objects.get(pk=self.user.pk).num_followees, 0)
+
+    def test_follow_counters_ignore_repeated_follow(self):
+        jane = User.objects.get(username='@janedoe')
+        self.user._follow(jane)
+        self.user._follow(jane)
+        self.assertEqual(User.objects.get(pk=jane.pk).num_followers, 1)
+        self.user._unfollow(jane)
+        self.user._unfollow(jane)
+        self.assertEqual(User.objects.get(pk=jane.pk).num_followers, 0)
+
+    def test_follow_many(self):
+        jane = User.objects.get(username='@janedoe')
+        petra = User.objects.get(username='@petrapickles')
+        peter = User.objects.get(username='@peterpickles')
+        self.user.toggle_follow(jane)
+        followed = self.user.follow_many([jane, petra.id, peter.id, self.user.id, peter.id + 9999])
+        self.assertEqual(followed, {petra.id, peter.id})
+        self.assertEqual(self.user.following_ids([jane, petra, peter, self.user]), {jane.id, petra.id, peter.id})
+        self.assertEqual(self.user.followee_count(), 3)
+        self.assertEqual(User.objects.get(pk=self.user.pk).num_followees, 3)
+        self.assertEqual(User.objects.get(pk=petra.pk).num_followers, 1)
+        self.assertEqual(User.objects.get(pk=jane.pk).num_followers, 1)
+
+    def test_follow_many_is_idempotent(self):
+        petra = User.objects.get(username='@petrapickles')
+        self.user.follow_many([petra])
+        self.assertEqual(self.user.follow_many([petra]), set())
+        self.assertEqual(User.objects.get(pk=petra.pk).num_followers, 1)
+        self.assertEqual(User.objects.get(pk=self.user.pk).num_followees, 1)
+
+    def test_bulk_follow_changes_lock_follower_first(self):
+        petra = User.objects.get(username='@petrapickles')
+        for change in [self.user.follow_many, self.user.unfollow_many]:
+            with CaptureQueriesContext(connection) as queries:
+                change([petra])
+            statements = [query['sql'] for query in queries if not query['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+            self.assertTrue(statements[0].startswith('UPDATE "microblogs_user"'), statements[0])
+            self.assertIn(f'"id" = {self.user.pk}', statements[0])
+
+    def test_unfollow_many(self):
+        jane = User.objects.get(username='@janedoe')
+        petra = User.objects.get(username='@petrapickles')
+        peter = User.objects.get(username='@peterpickles')
+        self.user.follow_many([jane, petra])
+        unfollowed = self.user.unfollow_many([jane, peter, petra.id])
+        self.assertEqual(unfollowed, {jane.id, petra.id})
+        self.assertEqual(self.user.unfollow_many([jane]), set())
+        self.assertEqual(User.objects.get(pk=self.user.pk).num_followees, 0)
+        self.assertEqual(User.objects.get(pk=jane.pk).num_followers, 0)
+        self.assertEqual(User.objects.get(pk=peter.pk).num_followers, 0)
+
     def test_user_cannot_follow_self(self):
         self.user.toggle_follow(self.user)
         self.assertEqual(self.user.follower_count(), 0)
         self.assertEqual(self.user.followee_count(), 0)        
 
+    def test_gravatar_hash_is_stored_on_save(self):
+        self.user.email = ' JohnDoe2@Example.org '
+        self.user.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.gravatar_hash, md5(b'johndoe2@example.org').hexdigest())
+
+    def test_gravatar_hash_follows_email_update_fields(self):
+        self.user.email = 'johndoe2@example.org'
+        self.user.save(update_fields=['email'])
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.gravatar_hash, md5(b'johndoe2@example.org').hexdigest())
+
+    def test_gravatar_urls_use_stored_hash(self):
+        email_hash = self.user.gravatar_hash
+        self.assertEqual(
+            self.user.gravatar(),
+            f'https://www.gravatar.com/avatar/{email_hash}?size=120&default=mp',
+        )
+        self.assertEqual(
+            self.user.mini_gravatar(),
+            f'https://www.gravatar.com/avatar/{email_hash}?size=60&default=mp',
+        )
+
     def _assert_user_is_valid(self):
         try:
             self.user.full_clean()
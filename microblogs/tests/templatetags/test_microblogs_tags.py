@@ -0,0 +1,89 @@
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from microblogs import fragments
+from microblogs.fragments import render_post_rows, render_profile_card
+from microblogs.helpers import attach_author_cards
+from microblogs.models import User, Post
+from microblogs.tests.helpers import create_posts
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FragmentCacheTestCase(TestCase):
+    """Test suite for the cached post row and profile card tags."""
+
+    fixtures = ['microblogs/tests/fixtures/default_user.json',
+                'microblogs/tests/fixtures/other_users.json']
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.get(username='@johndoe')
+        self.jane = User.objects.get(username='@janedoe')
+        self.client.login(username=self.user.username, password='Password123')
+        self.url = reverse('show_user', kwargs={'user_id': self.jane.id})
+
+    def _get_rendering(self):
+        """Returns the response to a GET of the profile page, and the number of post rows and cards rendered."""
+        with mock.patch.object(fragments, 'render_post_row', wraps=fragments.render_post_row) as render_row, \
+                mock.patch.object(fragments, 'get_template', wraps=fragments.get_template) as get_card_template:
+            response = self.client.get(self.url)
+        return response, render_row.call_count, get_card_template.call_count
+
+    def test_post_rows_and_card_are_served_from_cache(self):
+        create_posts(self.jane, 100, 103)
+        self.assertEqual(self._get_rendering()[1:], (3, 1))
+        response, rows, cards = self._get_rendering()
+        self.assertEqual((rows, cards), (0, 0))
+        self.assertContains(response, 'Jane Doe')
+
+    def test_profile_update_invalidates_post_rows_and_card(self):
+        create_posts(self.jane, 100, 103)
+        self.client.get(self.url)
+        self.jane.first_name = 'Janet'
+        self.jane.save()
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Janet Doe', count=4)
+
+    def test_login_does_not_invalidate_fragments(self):
+        create_posts(self.jane, 100, 103)
+        self._get_rendering()
+        self.client.login(username=self.jane.username, password='Password123')
+        self.client.login(username=self.user.username, password='Password123')
+        self.assertEqual(self._get_rendering()[1:], (0, 0))
+
+    def test_follow_invalidates_profile_card_counts(self):
+        self.client.get(self.url)
+        self.user.toggle_follow(self.jane)
+        response = self.client.get(self.url)
+        self.assertContains(response, '<b>1</b> Followers', html=False)
+        self.assertContains(response, 'Unfollow')
+
+    def test_card_rendered_from_stale_counts_is_not_served_later(self):
+        # A concurrent request loaded jane before the follow, and caches its card after it.
+        stale_jane = User.objects.get(pk=self.jane.pk)
+        self.user.toggle_follow(self.jane)
+        render_profile_card(stale_jane, True, True)
+        card = render_profile_card(User.objects.get(pk=self.jane.pk), True, True)
+        self.assertIn('<b>1</b> Followers', card)
+
+    def test_rows_rendered_from_stale_author_are_not_served_later(self):
+        create_posts(self.jane, 100, 101)
+        stale_posts = attach_author_cards(list(Post.objects.filter(author=self.jane)))
+        self.jane.first_name = 'Janet'
+        self.jane.save()
+        render_post_rows(stale_posts, lambda created_at: 'just now')
+        rows = render_post_rows(
+            attach_author_cards(list(Post.objects.filter(author=self.jane))), lambda created_at: 'just now',
+        )
+        self.assertIn('Janet Doe', rows)
+
+    def test_cached_rows_render_current_timestamp(self):
+        posts = attach_author_cards([Post.objects.create(author=self.jane, text='Time flies')])
+        first = render_post_rows(posts, lambda created_at: 'just now')
+        User.objects.filter(pk=self.jane.pk).update(first_name='Uncached')
+        second = render_post_rows(posts, lambda created_at: '3 days ago')
+        self.assertIn('just now', first)
+        self.assertIn('3 days ago', second)
+        self.assertNotIn('Uncached', second)
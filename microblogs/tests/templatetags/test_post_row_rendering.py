@@ -0,0 +1,29 @@
+from django.template.loader import render_to_string
+from django.test import TestCase
+from microblogs.helpers import attach_author_cards
+from microblogs.models import User, Post
+from microblogs.rendering import post_row_template, render_post_row
+
+class PostRowRenderingTestCase(TestCase):
+    """Test suite for the compiled post row renderer."""
+
+    fixtures = ['microblogs/tests/fixtures/default_user.json']
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.post = Post.objects.create(author=self.user, text='<b>Bold</b> & "quoted"')
+        attach_author_cards([self.post])
+
+    def test_compiled_row_matches_template(self):
+        expected = render_to_string(
+            'partials/post_as_table_row.html',
+            {'post': self.post, 'timestamp': '2 minutes ago', 'datetime': self.post.created_at.isoformat()},
+        )
+        row = render_post_row(post_row_template(), self.post, '2 minutes ago')
+        self.assertEqual(row, expected)
+
+    def test_compiled_row_escapes_values(self):
+        row = render_post_row(post_row_template(), self.post, '<now>')
+        self.assertIn('&lt;b&gt;Bold&lt;/b&gt; &amp; &quot;quoted&quot;', row)
+        self.assertIn('&lt;now&gt;', row)
+        self.assertNotIn('<b>', row)
@@ -0,0 +1,54 @@
+from datetime import timedelta
+from django.contrib.humanize.templatetags.humanize import naturaltime
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from microblogs.templatetags.microblogs_tags import timestamp_formatter
+from microblogs.timestamps import RelativeTimeFormatter, absolute_time
+
+class RelativeTimeFormatterTestCase(TestCase):
+    """Test suite for the relative post timestamp formatter."""
+
+    # Half a second past each boundary, so the few microseconds between calls never change the bucket.
+    AGES = [
+        timedelta(seconds=seconds) + timedelta(milliseconds=500)
+        for seconds in [
+            0, 1, 59, 60, 61, 3599, 3600, 7300, 86399, 86400, 86400 + 3600, 2 * 86400,
+            7 * 86400, 8 * 86400, 30 * 86400, 45 * 86400, 364 * 86400, 365 * 86400, 400 * 86400,
+            1215 * 86400, 1216 * 86400, 1581 * 86400, 2000 * 86400,
+        ]
+    ]
+
+    def test_formatter_matches_naturaltime(self):
+        for age in self.AGES:
+            formatter = RelativeTimeFormatter()
+            value = formatter.now - age
+            with self.subTest(age=age):
+                self.assertEqual(formatter(value), naturaltime(value))
+
+    def test_formatter_leaves_out_leap_days_like_naturaltime(self):
+        now = timezone.datetime(2026, 10, 18, 12, tzinfo=timezone.utc)
+        formatter = RelativeTimeFormatter(now=now)
+        self.assertEqual(formatter(now - timedelta(days=3 * 365 + 4 * 30, hours=12)), '3\xa0years, 3\xa0months ago')
+        self.assertEqual(formatter(now - timedelta(days=3 * 365 + 4 * 30 + 1, hours=12)), '3\xa0years, 4\xa0months ago')
+
+    def test_future_time_is_now(self):
+        formatter = RelativeTimeFormatter()
+        self.assertEqual(formatter(formatter.now + timedelta(seconds=5)), 'now')
+
+    def test_formatter_uses_fixed_now(self):
+        now = timezone.now()
+        formatter = RelativeTimeFormatter(now=now)
+        self.assertEqual(formatter(now - timedelta(minutes=5)), '5\xa0minutes ago')
+        self.assertEqual(formatter(now - timedelta(days=3)), '3\xa0days ago')
+
+    def test_absolute_time(self):
+        value = timezone.datetime(2022, 3, 4, 5, 6, tzinfo=timezone.utc)
+        self.assertEqual(absolute_time(value), '2022-03-04 05:06 UTC')
+
+    def test_formatter_is_shared_within_a_request(self):
+        request = type('Request', (), {})()
+        self.assertIs(timestamp_formatter(request), timestamp_formatter(request))
+
+    @override_settings(RELATIVE_TIMESTAMPS_ON_CLIENT=True)
+    def test_client_mode_sends_absolute_times(self):
+        self.assertIs(timestamp_formatter(None), absolute_time)
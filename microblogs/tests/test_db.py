@@ -0,0 +1,31 @@
+from django.db import connection, connections
+from django.test import TestCase, override_settings
+from microblogs.db import apply_sqlite_pragmas
+
+class SQLitePragmasTestCase(TestCase):
+    """Test suite for the pragmas set on new SQLite connections."""
+
+    def _pragma(self, db_connection, name):
+        with db_connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -1234, 'temp_store': 'MEMORY'})
+    def test_new_connections_get_pragmas(self):
+        new_connection = connections.create_connection('default')
+        try:
+            self.assertEqual(self._pragma(new_connection, 'cache_size'), -1234)
+            self.assertEqual(self._pragma(new_connection, 'temp_store'), 2)
+        finally:
+            new_connection.close()
+
+    def test_apply_sqlite_pragmas_uses_setting(self):
+        old_cache_size = self._pragma(connection, 'cache_size')
+        try:
+            with override_settings(SQLITE_PRAGMAS={'cache_size': -4321}):
+                apply_sqlite_pragmas(sender=None, connection=connection)
+            self.assertEqual(self._pragma(connection, 'cache_size'), -4321)
+        finally:
+            with override_settings(SQLITE_PRAGMAS={'cache_size': old_cache_size}):
+                apply_sqlite_pragmas(sender=None, connection=connection)
+
@@ -0,0 +1,79 @@
+import asyncio
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+from django.test import TestCase, override_settings
+from django.urls import path, reverse
+from clucker import urls
+from microblogs import views
+from microblogs.hashers import ScryptPasswordHasher
+from microblogs.models import User
+from microblogs.tests.helpers import LogInTester
+
+SCRYPT_FIRST = ['microblogs.hashers.ScryptPasswordHasher', 'microblogs.hashers.PBKDF2PasswordHasher']
+
+urlpatterns = [
+    path('log_in/', views.log_in_async, name='log_in') if getattr(pattern, 'name', None) == 'log_in' else pattern
+    for pattern in urls.urlpatterns
+]
+
+class PasswordHashersTestCase(TestCase, LogInTester):
+    """Test suite for the password hashers and upgrading passwords at log in."""
+
+    fixtures = ['microblogs/tests/fixtures/default_user.json']
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.form_input = {'username': '@johndoe', 'password': 'Password123'}
+
+    def test_scrypt_round_trip(self):
+        hasher = ScryptPasswordHasher()
+        encoded = hasher.encode('Password123', hasher.salt())
+        self.assertTrue(encoded.startswith('scrypt$16384$'))
+        self.assertTrue(hasher.verify('Password123', encoded))
+        self.assertFalse(hasher.verify('Password124', encoded))
+        self.assertFalse(hasher.must_update(encoded))
+        self.assertTrue(hasher.must_update(hasher.encode('Password123', hasher.salt(), work_factor=2 ** 10)))
+
+    @override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+    def test_pbkdf2_iterations_follow_setting(self):
+        encoded = make_password('Password123')
+        self.assertTrue(encoded.startswith('pbkdf2_sha256$1000$'))
+        self.assertTrue(check_password('Password123', encoded))
+
+    @override_settings(PASSWORD_HASHERS=SCRYPT_FIRST)
+    def test_log_in_rehashes_with_preferred_hasher(self):
+        old_password = self.user.password
+        self.client.post(reverse('log_in'), self.form_input)
+        self.assertTrue(self._is_logged_in())
+        self.user.refresh_from_db()
+        self.assertNotEqual(self.user.password, old_password)
+        self.assertEqual(identify_hasher(self.user.password).algorithm, 'scrypt')
+        self.assertTrue(self.user.check_password('Password123'))
+
+    @override_settings(ROOT_URLCONF=__name__)
+    def test_async_log_in(self):
+        self.assertTrue(asyncio.iscoroutinefunction(views.log_in_async))
+        response = self.client.post(reverse('log_in'), self.form_input, follow=True)
+        self.assertTrue(self._is_logged_in())
+        self.assertRedirects(response, reverse('feed'), status_code=302, target_status_code=200)
+
+    @override_settings(ROOT_URLCONF=__name__)
+    def test_async_log_in_with_wrong_password(self):
+        response = self.client.post(reverse('log_in'), {'username': '@johndoe', 'password': 'WrongPassword123'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'log_in.html')
+        self.assertFalse(self._is_logged_in())
+        self.client.post(reverse('log_in'), {'username': '@nobody', 'password': 'Password123'})
+        self.assertFalse(self._is_logged_in())
+
+    @override_settings(ROOT_URLCONF=__name__, PASSWORD_HASHERS=SCRYPT_FIRST)
+    def test_async_log_in_rehashes_with_preferred_hasher(self):
+        self.client.post(reverse('log_in'), self.form_input)
+        self.assertTrue(self._is_logged_in())
+        self.user.refresh_from_db()
+        self.assertEqual(identify_hasher(self.user.password).algorithm, 'scrypt')
+
+    @override_settings(ROOT_URLCONF=__name__)
+    def test_async_log_in_redirects_when_logged_in(self):
+        self.client.login(username='@johndoe', password='Password123')
+        response = self.client.get(reverse('log_in'))
+        self.assertRedirects(response, reverse('feed'), status_code=302, target_status_code=200)
@@ -0,0 +1,118 @@
+import json
+from io import StringIO
+from unittest import mock
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from microblogs import sharding
+from microblogs.models import Post, TimelineEntry, User
+from microblogs.tests.helpers import create_posts
+
+FIXTURES = ['microblogs/tests/fixtures/default_user.json', 'microblogs/tests/fixtures/other_users.json']
+
+@override_settings(POST_SHARDS=['posts1', 'posts2'])
+class PostShardingTestCase(TransactionTestCase):
+    """Test suite for posts sharded by author."""
+
+    databases = {'default', 'posts1', 'posts2'}
+
+    def setUp(self):
+        # Loaded into the default database only, as the shards hold no users.
+        call_command('loaddata', *FIXTURES, database='default', verbosity=0)
+        self.user = User.objects.get(username='@johndoe')
+        self.jane = User.objects.get(username='@janedoe')
+        self.petra = User.objects.get(username='@petrapickles')
+        patcher = mock.patch.object(sharding, '_allocator', sharding.PostIdAllocator())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _posts_on(self, alias):
+        return list(Post.objects.using(alias).order_by('id').values_list('author_id', 'text'))
+
+    def test_posts_are_saved_on_the_shard_of_their_author(self):
+        create_posts(self.user, 0, 2)
+        create_posts(self.jane, 2, 3)
+        self.assertEqual(self._posts_on('posts2'), [(self.user.id, 'Post__0'), (self.user.id, 'Post__1')])
+        self.assertEqual(self._posts_on('posts1'), [(self.jane.id, 'Post__2')])
+        self.assertEqual(self._posts_on('default'), [])
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_post_ids_are_unique_across_shards(self):
+        create_posts(self.user, 0, 3)
+        create_posts(self.jane, 3, 6)
+        Post.objects.bulk_create([Post(author=self.petra, text='Bulk') for _ in range(3)])
+        ids = [post_id for alias in settings.POST_SHARDS for post_id in Post.objects.using(alias).values_list('id', flat=True)]
+        self.assertEqual(len(ids), 9)
+        self.assertEqual(len(set(ids)), 9)
+        self.assertEqual(Post.objects.using(sharding.shard_for_author(self.petra.id)).filter(text='Bulk').count(), 3)
+
+    def test_filter_by_author_reads_from_their_shard(self):
+        create_posts(self.user, 0, 2)
+        create_posts(self.jane, 2, 4)
+        self.assertEqual(Post.objects.filter(author=self.jane).db, 'posts1')
+        self.assertEqual(list(Post.objects.filter(author=self.jane).order_by('id').values_list('text', flat=True)), ['Post__2', 'Post__3'])
+        self.assertEqual(list(Post.objects.filter(author_id=self.user.id).values_list('text', flat=True).order_by('id')), ['Post__0', 'Post__1'])
+        self.assertEqual(self.user.post_set.count(), 2)
+
+    def test_feed_merges_posts_from_all_shards(self):
+        self.user.toggle_follow(self.jane)
+        self.user.toggle_follow(self.petra)
+        authors = [self.user, self.jane, self.petra]
+        for number in range(settings.POSTS_PER_PAGE + 5):
+            create_posts(authors[number % 3], number, number + 1)
+        self.client.login(username=self.user.username, password='Password123')
+        response = self.client.get(reverse('feed'))
+        newest = [post.text for post in response.context['posts']]
+        expected = [f'Post__{number}' for number in reversed(range(settings.POSTS_PER_PAGE + 5))]
+        self.assertEqual(newest, expected[:settings.POSTS_PER_PAGE])
+        self.assertContains(response, self.jane.username)
+        response = self.client.get(reverse('feed') + f"?before={response.context['posts'].older_cursor}")
+        self.assertEqual([post.text for post in response.context['posts']], expected[settings.POSTS_PER_PAGE:])
+
+    def test_api_feed_includes_authors(self):
+        self.user.toggle_follow(self.jane)
+        create_posts(self.user, 0, 1)
+        create_posts(self.jane, 1, 2)
+        self.client.login(username=self.user.username, password='Password123')
+        response = self.client.get(reverse('api_feed'))
+        results = json.loads(b''.join(response.streaming_content))['results']
+        self.assertEqual([(post['text'], post['author']['username']) for post in results], [
+            ('Post__1', self.jane.username),
+            ('Post__0', self.user.username),
+        ])
+
+    def test_search_finds_posts_on_all_shards(self):
+        Post.objects.create(author=self.user, text='Sharded clucks')
+        Post.objects.create(author=self.jane, text='More sharded clucks')
+        self.client.login(username=self.user.username, password='Password123')
+        response = self.client.get(reverse('search'), {'q': 'sharded'})
+        self.assertContains(response, 'Sharded clucks')
+        self.assertContains(response, 'More sharded clucks')
+
+    def test_deleting_user_deletes_their_posts(self):
+        create_posts(self.jane, 0, 2)
+        self.jane.delete()
+        self.assertEqual(self._posts_on('posts1'), [])
+
+    def test_reshard_moves_posts_to_the_shard_of_their_author(self):
+        with self.settings(POST_SHARDS=['default']):
+            self.user.toggle_follow(self.jane)
+            create_posts(self.user, 0, 2)
+            create_posts(self.jane, 2, 4)
+            self.assertEqual(TimelineEntry.objects.count(), 6)
+        output = StringIO()
+        call_command('reshard_posts', '--from', 'default', stdout=output)
+        self.assertIn('Moved 4 posts.', output.getvalue())
+        self.assertEqual(self._posts_on('default'), [])
+        self.assertEqual(len(self._posts_on('posts1')), 2)
+        self.assertEqual(len(self._posts_on('posts2')), 2)
+        self.assertFalse(TimelineEntry.objects.exists())
+        # Resharding again moves nothing.
+        call_command('reshard_posts', '--from', 'default', stdout=output)
+        self.assertIn('Moved 0 posts.', output.getvalue())
+        with self.settings(POST_SHARDS=['default']):
+            call_command('reshard_posts', '--from', 'posts1', '--from', 'posts2', stdout=output)
+            self.assertEqual(len(self._posts_on('default')), 4)
+            self.assertEqual(TimelineEntry.objects.count(), 6)
+            self.assertEqual([post.text for post in self.user.timeline()], ['Post__3', 'Post__2', 'Post__1', 'Post__0'])
@@ -0,0 +1,120 @@
+import json
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from microblogs import throttling
+from microblogs.models import Post, User
+from microblogs.throttling import CacheThrottle, InProcessThrottle
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+class ThrottleBackendsTestCase(TestCase):
+    """Test suite for the token bucket and sliding window throttles."""
+
+    def test_token_bucket_refills_over_time(self):
+        throttle = InProcessThrottle()
+        with mock.patch('microblogs.throttling.time.monotonic', return_value=100.0) as monotonic:
+            self.assertIsNone(throttle.hit('key', 2, 60))
+            self.assertIsNone(throttle.hit('key', 2, 60))
+            self.assertEqual(throttle.hit('key', 2, 60), 30)
+            self.assertIsNone(throttle.hit('other', 2, 60))
+            monotonic.return_value = 130.0
+            self.assertIsNone(throttle.hit('key', 2, 60))
+            self.assertEqual(throttle.hit('key', 2, 60), 30)
+
+    @override_settings(THROTTLE_MAX_CLIENTS=2)
+    def test_token_bucket_keeps_most_recent_clients(self):
+        throttle = InProcessThrottle()
+        for key in ['a', 'b', 'a', 'c']:
+            throttle.hit(key, 1, 60)
+        self.assertIsNotNone(throttle.hit('a', 1, 60))
+        # The bucket of b was dropped, so it starts full again.
+        self.assertIsNone(throttle.hit('b', 1, 60))
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_sliding_window_weighs_previous_window(self):
+        cache.clear()
+        throttle = CacheThrottle()
+        with mock.patch('microblogs.throttling.time.time', return_value=6000.0) as now:
+            for _ in range(4):
+                self.assertIsNone(throttle.hit('key', 4, 60))
+            self.assertEqual(throttle.hit('key', 4, 60), 60)
+            # A quarter into the next window, three quarters of the previous four requests still count.
+            now.return_value = 6075.0
+            self.assertIsNone(throttle.hit('key', 4, 60))
+            self.assertEqual(throttle.hit('key', 4, 60), 15)
+            now.return_value = 6090.0
+            self.assertIsNone(throttle.hit('key', 4, 60))
+
+@override_settings(
+    THROTTLE_ENABLED=True,
+    THROTTLE_BACKEND='microblogs.throttling.InProcessThrottle',
+    THROTTLE_RATES={'new_post': (2, 60), 'follow': (2, 60), 'log_in': (2, 60)},
+)
+class ThrottledViewsTestCase(TestCase):
+    """Test suite for throttling the views that write."""
+
+    fixtures = ['microblogs/tests/fixtures/default_user.json',
+                'microblogs/tests/fixtures/other_users.json']
+
+    def setUp(self):
+        throttling.get_throttle.cache_clear()
+        self.user = User.objects.get(username='@johndoe')
+        self.other_user = User.objects.get(username='@janedoe')
+
+    def tearDown(self):
+        throttling.get_throttle.cache_clear()
+
+    def test_new_post_is_throttled_per_user(self):
+        self.client.login(username=self.user.username, password='Password123')
+        for _ in range(2):
+            self.client.post(reverse('new_post'), {'text': 'Hello'})
+        response = self.client.post(reverse('new_post'), {'text': 'Hello'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(Post.objects.count(), 2)
+        self.client.login(username=self.other_user.username, password='Password123')
+        response = self.client.post(reverse('new_post'), {'text': 'Hello'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Post.objects.count(), 3)
+
+    def test_follow_toggle_is_throttled(self):
+        self.client.login(username=self.user.username, password='Password123')
+        url = reverse('follow_toggle', kwargs={'user_id': self.other_user.id})
+        for _ in range(2):
+            self.assertEqual(self.client.get(url).status_code, 302)
+        self.assertEqual(self.client.get(url).status_code, 429)
+
+    def test_log_in_attempts_are_throttled_per_ip(self):
+        form_input = {'username': '@johndoe', 'password': 'WrongPassword123'}
+        self.assertEqual(self.client.get(reverse('log_in')).status_code, 200)
+        for _ in range(2):
+            self.assertEqual(self.client.post(reverse('log_in'), form_input).status_code, 200)
+        response = self.client.post(reverse('log_in'), {'username': '@johndoe', 'password': 'Password123'})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        response = self.client.post(reverse('log_in'), form_input, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(ROOT_URLCONF='microblogs.tests.test_hashers')
+    def test_async_log_in_is_throttled(self):
+        form_input = {'username': '@johndoe', 'password': 'WrongPassword123'}
+        for _ in range(2):
+            self.assertEqual(self.client.post(reverse('log_in'), form_input).status_code, 200)
+        self.assertEqual(self.client.post(reverse('log_in'), form_input).status_code, 429)
+
+    def test_api_follows_answers_json(self):
+        self.client.login(username=self.user.username, password='Password123')
+        for _ in range(2):
+            self.client.post(reverse('api_follows'), json.dumps({'follow': [2]}), content_type='application/json')
+        response = self.client.post(reverse('api_follows'), json.dumps({'follow': [2]}), content_type='application/json')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('error', response.json())
+
+    @override_settings(THROTTLE_ENABLED=False)
+    def test_disabled_throttling_allows_every_request(self):
+        self.client.login(username=self.user.username, password='Password123')
+        for _ in range(3):
+            self.client.post(reverse('new_post'), {'text': 'Hello'})
+        self.assertEqual(Post.objects.count(), 3)
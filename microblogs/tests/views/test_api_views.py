@@ -0,0 +1,163 @@
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from microblogs.models import User, Post
+from microblogs.tests.helpers import create_posts
+
+class APIViewsTestCase(TestCase):
+    """Test suite for the JSON API views"""
+
+    fixtures = [
+        'microblogs/tests/fixtures/default_user.json',
+        'microblogs/tests/fixtures/other_users.json',
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.other_user = User.objects.get(username='@janedoe')
+        self.client.login(username=self.user.username, password='Password123')
+
+    def get_json(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_api_urls(self):
+        self.assertEqual(reverse('api_feed'), '/api/feed/')
+        self.assertEqual(reverse('api_users'), '/api/users/')
+        self.assertEqual(reverse('api_user_posts', kwargs={'user_id': 7}), '/api/user/7/posts/')
+
+    def test_feed_serializes_posts(self):
+        self.user.toggle_follow(self.other_user)
+        post = Post.objects.create(author=self.other_user, text='Hello <world>')
+        data = self.get_json(reverse('api_feed'))
+        self.assertEqual(data['results'], [{
+            'id': post.id,
+            'text': 'Hello <world>',
+            'created_at': DjangoJSONEncoder().default(post.created_at),
+            'author': {
+                'id': self.other_user.id,
+                'username': '@janedoe',
+                'full_name': 'Jane Doe',
+                'gravatar': self.other_user.mini_gravatar(),
+            },
+        }])
+        self.assertIsNone(data['older'])
+        self.assertIsNone(data['newer'])
+
+    def test_feed_pages_with_cursors(self):
+        create_posts(self.user, 0, 25)
+        data = self.get_json(reverse('api_feed'), limit=10)
+        texts = [post['text'] for post in data['results']]
+        self.assertEqual(texts, [f'Post__{count}' for count in range(24, 14, -1)])
+        self.assertIsNone(data['newer'])
+        older = self.get_json(reverse('api_feed'), limit=10, before=data['older'])
+        self.assertEqual(older['results'][0]['text'], 'Post__14')
+        oldest = self.get_json(reverse('api_feed'), limit=10, before=older['older'])
+        self.assertEqual(len(oldest['results']), 5)
+        self.assertIsNone(oldest['older'])
+        newer = self.get_json(reverse('api_feed'), limit=10, after=oldest['newer'])
+        self.assertEqual([post['text'] for post in newer['results']], [post['text'] for post in older['results']])
+        self.assertEqual(newer['older'], older['older'])
+
+    def test_feed_streams_large_pages_in_chunks(self):
+        create_posts(self.user, 0, settings.API_STREAM_CHUNK_SIZE + 5)
+        response = self.client.get(reverse('api_feed'), {'limit': settings.API_MAX_PAGE_SIZE})
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 3)
+        data = json.loads(b''.join(chunks))
+        self.assertEqual(len(data['results']), settings.API_STREAM_CHUNK_SIZE + 5)
+
+    async def test_feed_streams_through_asgi_handler(self):
+        await sync_to_async(create_posts)(self.user, 0, 3)
+        self.async_client.cookies = self.client.cookies
+        response = await self.async_client.get(reverse('api_feed'))
+        self.assertEqual(response.status_code, 200)
+        # Iterated in the event loop, as ASGIHandler does.
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([post['text'] for post in data['results']], ['Post__2', 'Post__1', 'Post__0'])
+
+    def test_feed_reads_posts_in_one_query(self):
+        create_posts(self.user, 0, 30)
+        self.get_json(reverse('api_feed'))
+        # Session, user and the page of posts.
+        with self.assertNumQueries(3):
+            self.get_json(reverse('api_feed'), limit=30)
+
+    def test_limit_is_capped(self):
+        create_posts(self.user, 0, 3)
+        data = self.get_json(reverse('api_feed'), limit=settings.API_MAX_PAGE_SIZE + 1)
+        self.assertEqual(len(data['results']), 3)
+        data = self.get_json(reverse('api_feed'), limit='x')
+        self.assertEqual(len(data['results']), 3)
+
+    def test_user_posts(self):
+        create_posts(self.other_user, 0, 3)
+        create_posts(self.user, 3, 5)
+        data = self.get_json(reverse('api_user_posts', kwargs={'user_id': self.other_user.id}))
+        self.assertEqual([post['text'] for post in data['results']], ['Post__2', 'Post__1', 'Post__0'])
+
+    def test_user_posts_of_unknown_user(self):
+        response = self.client.get(reverse('api_user_posts', kwargs={'user_id': self.user.id + 9999}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_user_list(self):
+        data = self.get_json(reverse('api_users'), limit=2)
+        self.assertEqual(len(data['results']), 2)
+        rest = self.get_json(reverse('api_users'), limit=2, before=data['older'])
+        ids = [user['id'] for user in data['results'] + rest['results']]
+        self.assertCountEqual(ids, User.objects.values_list('id', flat=True))
+        self.assertIn('bio', rest['results'][0])
+        self.assertNotIn('email', rest['results'][0])
+
+    def test_api_requires_log_in(self):
+        self.client.logout()
+        for url in [reverse('api_feed'), reverse('api_users'), reverse('api_user_posts', kwargs={'user_id': 1})]:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 401)
+
+    def test_api_is_read_only(self):
+        response = self.client.post(reverse('api_feed'))
+        self.assertEqual(response.status_code, 405)
+
+    def post_follows(self, body):
+        return self.client.post(reverse('api_follows'), json.dumps(body), content_type='application/json')
+
+    def test_bulk_follow(self):
+        petra = User.objects.get(username='@petrapickles')
+        self.user.toggle_follow(petra)
+        create_posts(self.other_user, 0, 2)
+        response = self.post_follows({'follow': [self.other_user.id], 'unfollow': [petra.id, self.user.id + 9999]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'followed': [self.other_user.id],
+            'unfollowed': [petra.id],
+            'following': [self.other_user.id],
+            'followee_count': 1,
+        })
+        self.assertEqual(self.user.timeline().count(), 2)
+
+    def test_bulk_follow_is_idempotent(self):
+        self.post_follows({'follow': [self.other_user.id]})
+        response = self.post_follows({'follow': [self.other_user.id]})
+        self.assertEqual(response.json()['followed'], [])
+        self.assertEqual(response.json()['following'], [self.other_user.id])
+        self.assertEqual(User.objects.get(pk=self.other_user.pk).num_followers, 1)
+
+    def test_bulk_follow_rejects_invalid_bodies(self):
+        for body in [[1], {'follow': 'all'}, {'follow': ['1']}, {'follow': [2], 'unfollow': [2]}]:
+            with self.subTest(body=body):
+                self.assertEqual(self.post_follows(body).status_code, 400)
+        response = self.client.post(reverse('api_follows'), 'nonsense', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(BULK_FOLLOW_MAX_USERS=2)
+    def test_bulk_follow_limits_users(self):
+        response = self.post_follows({'follow': [2, 3, 4]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.user.followee_count(), 0)
@@ -0,0 +1,74 @@
+import asyncio
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import path, reverse
+from clucker import urls
+from microblogs import views
+from microblogs.models import User
+from microblogs.tests.helpers import create_posts, reverse_with_next
+
+ASYNC_VIEWS = {
+    'feed': path('feed/', views.feed_async, name='feed'),
+    'user_list': path('users/', views.user_list_async, name='user_list'),
+    'show_user': path('user/<int:user_id>/', views.show_user_async, name='show_user'),
+}
+
+urlpatterns = [ASYNC_VIEWS.get(getattr(pattern, 'name', None), pattern) for pattern in urls.urlpatterns]
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncViewsTestCase(TestCase):
+    """Test suite for the async variants of the read views"""
+
+    fixtures = [
+        'microblogs/tests/fixtures/default_user.json',
+        'microblogs/tests/fixtures/other_users.json',
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.other_user = User.objects.get(username='@janedoe')
+        self.client.login(username=self.user.username, password='Password123')
+
+    def test_views_are_coroutines(self):
+        for view in [views.feed_async, views.user_list_async, views.show_user_async]:
+            self.assertTrue(asyncio.iscoroutinefunction(view))
+
+    def test_get_feed(self):
+        self.user.toggle_follow(self.other_user)
+        create_posts(self.other_user, 0, 3)
+        response = self.client.get(reverse('feed'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'feed.html')
+        self.assertEqual([post.text for post in response.context['posts']], ['Post__2', 'Post__1', 'Post__0'])
+        self.assertContains(response, 'Post__2')
+
+    async def test_get_feed_through_asgi_handler(self):
+        self.async_client.cookies = self.client.cookies
+        response = await self.async_client.get(reverse('feed'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'feed.html')
+
+    def test_get_user_list(self):
+        response = self.client.get(reverse('user_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'user_list.html')
+        self.assertEqual(len(response.context['users']), min(User.objects.count(), settings.USERS_PER_PAGE))
+        self.assertContains(response, '@janedoe')
+
+    def test_get_show_user(self):
+        create_posts(self.other_user, 0, 2)
+        response = self.client.get(reverse('show_user', kwargs={'user_id': self.other_user.id}))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'show_user.html')
+        self.assertTrue(response.context['followable'])
+        self.assertContains(response, 'Post__1')
+
+    def test_get_show_user_with_invalid_id(self):
+        response = self.client.get(reverse('show_user', kwargs={'user_id': self.user.id + 9999}))
+        self.assertRedirects(response, reverse('user_list'), status_code=302, target_status_code=200)
+
+    def test_views_redirect_when_not_logged_in(self):
+        self.client.logout()
+        for url in [reverse('feed'), reverse('user_list')]:
+            response = self.client.get(url)
+            self.assertRedirects(response, reverse_with_next('log_in', url), status_code=302, target_status_code=200)
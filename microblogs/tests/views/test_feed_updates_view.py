@@ -0,0 +1,102 @@
+import asyncio
+import threading
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from microblogs.live import InProcessBroker, get_broker
+from microblogs.models import User, Post
+from microblogs.pagination import encode_cursor
+from microblogs.tests.helpers import create_posts
+
+@override_settings(LIVE_UPDATES_TIMEOUT=0.05)
+class FeedUpdatesViewTestCase(TestCase):
+    """Test suite for the feed updates view"""
+
+    fixtures = [
+        'microblogs/tests/fixtures/default_user.json',
+        'microblogs/tests/fixtures/other_users.json',
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.other_user = User.objects.get(username='@janedoe')
+        self.url = reverse('feed_updates')
+        self.client.login(username=self.user.username, password='Password123')
+
+    def test_feed_updates_url(self):
+        self.assertEqual(self.url, '/feed/updates/')
+
+    @override_settings(LIVE_UPDATES_ENABLED=True)
+    def test_feed_page_carries_live_cursor(self):
+        create_posts(self.user, 0, 3)
+        response = self.client.get(reverse('feed'))
+        newest = self.user.timeline().first()
+        cursor = encode_cursor(newest.timeline_created_at, newest.timeline_post_id)
+        self.assertEqual(response.context['live_cursor'], cursor)
+        self.assertContains(response, f'data-cursor="{cursor}"')
+
+    def test_feed_page_does_not_wait_for_updates_by_default(self):
+        response = self.client.get(reverse('feed'))
+        self.assertIsNone(response.context['live_cursor'])
+        self.assertNotContains(response, 'data-updates-url')
+
+    def test_returns_posts_newer_than_cursor(self):
+        cursor = encode_cursor(timezone.now(), 0)
+        self.user.toggle_follow(self.other_user)
+        create_posts(self.other_user, 0, 2)
+        response = self.client.get(self.url, {'after': cursor})
+        self.assertEqual(response.status_code, 200)
+        update = response.json()
+        self.assertEqual(update['count'], 2)
+        self.assertFalse(update['more'])
+        self.assertLess(update['html'].index('Post__1'), update['html'].index('Post__0'))
+        newest = self.user.timeline().first()
+        self.assertEqual(update['newer'], encode_cursor(newest.timeline_created_at, newest.timeline_post_id))
+
+    def test_returns_nothing_after_timeout(self):
+        cursor = encode_cursor(timezone.now(), 0)
+        response = self.client.get(self.url, {'after': cursor})
+        self.assertEqual(response.json(), {'html': '', 'count': 0, 'newer': cursor, 'more': False})
+
+    def test_does_not_return_posts_outside_feed(self):
+        cursor = encode_cursor(timezone.now(), 0)
+        create_posts(self.other_user, 0, 2)
+        response = self.client.get(self.url, {'after': cursor})
+        self.assertEqual(response.json()['count'], 0)
+
+    def test_requires_valid_cursor(self):
+        response = self.client.get(self.url, {'after': 'nonsense'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_requires_log_in(self):
+        self.client.logout()
+        response = self.client.get(self.url, {'after': encode_cursor(timezone.now(), 0)})
+        self.assertEqual(response.status_code, 401)
+
+    def test_fan_out_publishes_on_commit(self):
+        self.user.toggle_follow(self.other_user)
+        with mock.patch.object(get_broker(), 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                Post.objects.create(author=self.other_user, text='Hello')
+        publish.assert_called_once_with([self.other_user.id, self.user.id])
+
+
+class InProcessBrokerTestCase(TestCase):
+    """Test suite for the in-process live updates broker"""
+
+    def test_publish_wakes_subscribers_of_user(self):
+        broker = InProcessBroker()
+
+        async def wait_for_publish():
+            subscription = broker.subscribe(1)
+            other = broker.subscribe(2)
+            threading.Timer(0.01, broker.publish, args=[[1]]).start()
+            woken = await subscription.wait(5)
+            other_woken = await other.wait(0.05)
+            broker.unsubscribe(subscription)
+            broker.unsubscribe(other)
+            return woken, other_woken
+
+        self.assertEqual(asyncio.run(wait_for_publish()), (True, False))
+        self.assertEqual(broker._subscriptions, {})
@@ -1,5 +1,8 @@
 """Tests of the feed view."""
+from django.conf import settings
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from microblogs.forms import PostForm
 from microblogs.models import User
@@ -54,3 +57,47 @@ class FeedViewTestCase(TestCase):
             self.assertContains(response, f"Post__{count}")
         for count in range(400, 403):
             self.assertNotContains(response, f"Post__{count}")
+
+    def test_feed_is_paginated_with_cursors(self):
+        self.client.login(username=self.user.username, password='Password123')
+        create_posts(self.user, 100, 100 + settings.POSTS_PER_PAGE + 5)
+        response = self.client.get(self.url)
+        page = response.context['posts']
+        self.assertEqual(len(page), settings.POSTS_PER_PAGE)
+        self.assertTrue(page.has_older)
+        self.assertFalse(page.has_newer)
+        newest = f"Post__{100 + settings.POSTS_PER_PAGE + 4}"
+        self.assertEqual(page[0].text, newest)
+        response = self.client.get(self.url, {'before': page.older_cursor})
+        page = response.context['posts']
+        texts = [post.text for post in page]
+        self.assertEqual(texts, [f"Post__{count}" for count in range(104, 99, -1)])
+        self.assertFalse(page.has_older)
+        self.assertTrue(page.has_newer)
+        response = self.client.get(self.url, {'after': page.newer_cursor})
+        page = response.context['posts']
+        self.assertEqual(len(page), settings.POSTS_PER_PAGE)
+        self.assertFalse(page.has_newer)
+        self.assertEqual(page[0].text, newest)
+
+    def test_feed_ignores_invalid_cursor(self):
+        self.client.login(username=self.user.username, password='Password123')
+        create_posts(self.user, 100, 103)
+        response = self.client.get(self.url, {'before': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['posts']), 3)
+
+    def test_feed_query_count_does_not_grow_with_posts(self):
+        self.client.login(username=self.user.username, password='Password123')
+        jane = User.objects.get(username='@janedoe')
+        petra = User.objects.get(username='@petrapickles')
+        self.user.toggle_follow(jane)
+        self.user.toggle_follow(petra)
+        create_posts(jane, 100, 101)
+        with CaptureQueriesContext(connection) as few_posts:
+            self.client.get(self.url)
+        create_posts(jane, 200, 210)
+        create_posts(petra, 300, 310)
+        with CaptureQueriesContext(connection) as many_posts:
+            self.client.get(self.url)
+        self.assertEqual(len(few_posts), len(many_posts))
@@ -30,6 +30,8 @@ class ShowUserViewTestCase(TestCase):
         user_followers_before = self.user.follower_count()
         followee_followers_before = self.followee.follower_count()
         response = self.client.get(self.url, follow=True)
+        self.user.refresh_from_db()
+        self.followee.refresh_from_db()
         user_followers_after = self.user.follower_count()
         followee_followers_after = self.followee.follower_count()
         self.assertEqual(user_followers_before, user_followers_after)
@@ -43,6 +45,8 @@ class ShowUserViewTestCase(TestCase):
         user_followers_before = self.user.follower_count()
         followee_followers_before = self.followee.follower_count()
         response = self.client.get(self.url, follow=True)
+        self.user.refresh_from_db()
+        self.followee.refresh_from_db()
         user_followers_after = self.user.follower_count()
         followee_followers_after = self.followee.follower_count()
         self.assertEqual(user_followers_before, user_followers_after)
@@ -0,0 +1,139 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from microblogs.models import User, Post
+from microblogs.search import InMemorySearchIndex, SQLiteSearchIndex, get_search_index, tokenize
+from microblogs.tests.helpers import reverse_with_next
+
+class SearchIndexTests:
+    """Tests shared by the search index backends."""
+
+    fixtures = [
+        'microblogs/tests/fixtures/default_user.json',
+        'microblogs/tests/fixtures/other_users.json',
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.jane = User.objects.get(username='@janedoe')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.eggs = Post.objects.create(author=self.user, text='Fresh eggs for breakfast')
+            self.bacon = Post.objects.create(author=self.jane, text='Bacon and eggs, eggs and bacon')
+            self.toast = Post.objects.create(author=self.jane, text='Toast with Crème fraîche')
+        self.index = self.make_index()
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.index.search_posts('eggs breakfast', 0, 10), [self.eggs.id])
+        self.assertEqual(self.index.search_posts('toast eggs', 0, 10), [])
+
+    def test_more_frequent_matches_rank_first(self):
+        self.assertEqual(self.index.search_posts('eggs', 0, 10), [self.bacon.id, self.eggs.id])
+
+    def test_last_term_matches_prefix(self):
+        self.assertEqual(self.index.search_posts('bac', 0, 10), [self.bacon.id])
+        self.assertEqual(self.index.search_posts('bac and', 0, 10), [])
+
+    def test_matching_ignores_case_and_diacritics(self):
+        self.assertEqual(self.index.search_posts('CREME FRAICHE', 0, 10), [self.toast.id])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self.index.search_posts('eggs OR "toast" NOT -(', 0, 10), [])
+        self.assertEqual(self.index.search_posts('"', 0, 10), [])
+
+    def test_results_are_paginated(self):
+        self.assertEqual(self.index.search_posts('eggs', 1, 10), [self.eggs.id])
+        self.assertEqual(self.index.search_posts('eggs', 0, 1), [self.bacon.id])
+
+    def test_new_posts_are_searchable(self):
+        self.index.search_posts('eggs', 0, 10)
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(author=self.user, text='Scrambled eggs')
+        self.assertIn(post.id, self.index.search_posts('scrambled', 0, 10))
+
+    def test_users_match_names_usernames_and_bios(self):
+        self.assertEqual(self.index.search_users('jane', 0, 10)[0], self.jane.id)
+        self.assertIn(self.user.id, self.index.search_users('@johndoe', 0, 10))
+
+    def test_profile_updates_are_searchable(self):
+        self.index.search_users('jane', 0, 10)
+        self.jane.bio = 'Loves omelettes'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.jane.save()
+        self.assertEqual(self.index.search_users('omelettes', 0, 10), [self.jane.id])
+        self.jane.bio = ''
+        with self.captureOnCommitCallbacks(execute=True):
+            self.jane.save()
+        self.assertEqual(self.index.search_users('omelettes', 0, 10), [])
+
+
+class SQLiteSearchIndexTestCase(SearchIndexTests, TestCase):
+    """Test suite for the FTS5 search index"""
+
+    def make_index(self):
+        return SQLiteSearchIndex()
+
+
+@override_settings(SEARCH_BACKEND='microblogs.search.InMemorySearchIndex')
+class InMemorySearchIndexTestCase(SearchIndexTests, TestCase):
+    """Test suite for the in-memory search index"""
+
+    def setUp(self):
+        get_search_index.cache_clear()
+        self.addCleanup(get_search_index.cache_clear)
+        super().setUp()
+
+    def make_index(self):
+        return get_search_index()
+
+    def test_index_uses_in_memory_backend(self):
+        self.assertIsInstance(self.index, InMemorySearchIndex)
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize('@JohnDoe: Crème brûlée!'), ['johndoe', 'creme', 'brulee'])
+
+
+class SearchViewTestCase(TestCase):
+    """Test suite for the search view"""
+
+    fixtures = [
+        'microblogs/tests/fixtures/default_user.json',
+        'microblogs/tests/fixtures/other_users.json',
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.jane = User.objects.get(username='@janedoe')
+        self.url = reverse('search')
+        self.client.login(username=self.user.username, password='Password123')
+
+    def test_search_url(self):
+        self.assertEqual(self.url, '/search/')
+
+    def test_get_search_without_query(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'search.html')
+        self.assertEqual(response.context['posts'], [])
+
+    def test_search_finds_posts_and_users(self):
+        post = Post.objects.create(author=self.jane, text='Janet likes cheese')
+        response = self.client.get(self.url, {'q': 'jane'})
+        self.assertEqual(response.context['users'][0], self.jane)
+        self.assertEqual(response.context['posts'], [post])
+        self.assertContains(response, 'Janet likes cheese')
+
+    @override_settings(SEARCH_RESULTS_PER_PAGE=2)
+    def test_search_results_are_paginated(self):
+        for count in range(5):
+            Post.objects.create(author=self.jane, text=f'Cheese number {count}')
+        texts = []
+        for page in [1, 2, 3]:
+            response = self.client.get(self.url, {'q': 'cheese', 'page': page})
+            texts += [post.text for post in response.context['posts']]
+            self.assertEqual(response.context['has_next'], page < 3)
+        self.assertEqual(sorted(texts), [f'Cheese number {count}' for count in range(5)])
+        self.assertEqual(response.context['users'], [])
+
+    def test_search_redirects_when_not_logged_in(self):
+        self.client.logout()
+        response = self.client.get(self.url)
+        self.assertRedirects(response, reverse_with_next('log_in', self.url), status_code=302, target_status_code=200)
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.test import TestCase
 from django.urls import reverse
 from microblogs.models import User, Post
@@ -72,3 +73,16 @@ class ShowUserViewTestCase(TestCase):
             self.assertContains(response, f"Post__{count}")
         for count in range(200, 203):
             self.assertNotContains(response, f"Post__{count}")
+
+    def test_show_user_posts_are_paginated_with_cursors(self):
+        self.client.login(username=self.user.username, password='Password123')
+        create_posts(self.target_user, 100, 100 + settings.POSTS_PER_PAGE + 3)
+        response = self.client.get(self.url)
+        page = response.context['posts']
+        self.assertEqual(len(page), settings.POSTS_PER_PAGE)
+        self.assertTrue(page.has_older)
+        response = self.client.get(self.url, {'before': page.older_cursor})
+        page = response.context['posts']
+        self.assertEqual([post.text for post in page], ['Post__102', 'Post__101', 'Post__100'])
+        self.assertFalse(page.has_older)
+        self.assertTrue(page.has_newer)
@@ -1,5 +1,6 @@
 from django.conf import settings
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from microblogs.models import User
 from microblogs.tests.helpers import reverse_with_next
@@ -64,11 +65,82 @@ class UserListTest(TestCase):
         self.assertTemplateUsed(response, 'user_list.html')
         self.assertEqual(len(response.context['users']), 3)
 
+    def test_get_user_list_shows_follow_state(self):
+        self.client.login(username=self.user.username, password='Password123')
+        self._create_test_users(3)
+        followed = User.objects.get(username='@user1')
+        self.user.toggle_follow(followed)
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['following_ids'], {followed.id})
+        self.assertContains(response, 'Unfollow', count=1)
+        self.assertContains(response, '>Follow<', count=2)
+
+    def test_deep_pages_match_offset_pagination(self):
+        self.client.login(username=self.user.username, password='Password123')
+        self._bulk_create_test_users(settings.USERS_PER_PAGE * 23 + 4)
+        expected = list(User.objects.order_by('last_name', 'first_name', 'id').values_list('id', flat=True))
+        response = self.client.get(self.url)
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, len(expected))
+        self.assertEqual(page_obj.paginator.num_pages, 24)
+        listed = []
+        for page in range(1, 25):
+            response = self.client.get(self.url, {'page': page})
+            listed += [user.id for user in response.context['users']]
+        self.assertEqual(listed, expected)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_deep_page_with_cached_anchors_skips_count(self):
+        cache.clear()
+        self.client.login(username=self.user.username, password='Password123')
+        self._bulk_create_test_users(settings.USERS_PER_PAGE * 30)
+        self.client.get(self.url, {'page': 25})
+        # Session, user, the page of users and their follow state.
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url, {'page': 25})
+        self.assertEqual(len(response.context['users']), settings.USERS_PER_PAGE)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_new_users_invalidate_cached_anchors(self):
+        cache.clear()
+        self.client.login(username=self.user.username, password='Password123')
+        self._bulk_create_test_users(settings.USERS_PER_PAGE * 12)
+        self.client.get(self.url, {'page': 12})
+        first = User.objects.create_user('@aaron', email='aaron@test.org', first_name='Aaron', last_name='Aardvark')
+        response = self.client.get(self.url, {'page': 12})
+        self.assertEqual(response.context['page_obj'].paginator.count, settings.USERS_PER_PAGE * 12 + 2)
+        expected = User.objects.order_by('last_name', 'first_name', 'id')[110:120]
+        self.assertEqual(list(response.context['users']), list(expected))
+        self.assertEqual(self.client.get(self.url).context['users'][0], first)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_deleted_users_invalidate_cached_anchors(self):
+        cache.clear()
+        self.client.login(username=self.user.username, password='Password123')
+        self._bulk_create_test_users(settings.USERS_PER_PAGE * 12)
+        self.client.get(self.url, {'page': 12})
+        User.objects.exclude(pk=self.user.pk).order_by('last_name', 'first_name', 'id').first().delete()
+        response = self.client.get(self.url, {'page': 12})
+        self.assertEqual(response.context['page_obj'].paginator.count, settings.USERS_PER_PAGE * 12)
+        self.assertEqual(len(response.context['users']), settings.USERS_PER_PAGE)
+
     def test_get_user_list_redirects_when_not_logged_in(self):
         redirect_url = reverse_with_next('log_in', self.url)
         response = self.client.get(self.url)
         self.assertRedirects(response, redirect_url, status_code=302, target_status_code=200)
 
+    def _bulk_create_test_users(self, user_count):
+        # Repeated names make the id break ties in the ordering.
+        User.objects.bulk_create([
+            User(
+                username=f'@user{user_id}',
+                email=f'user{user_id}@test.org',
+                first_name=f'First{user_id % 7}',
+                last_name=f'Last{user_id % 13}',
+            )
+            for user_id in range(user_count)
+        ])
+
     def _create_test_users(self, user_count=10):
         for user_id in range(user_count):
             User.objects.create_user(f'@user{user_id}',
@@ -0,0 +1,139 @@
+"""Rate limits on the views that write.
+
+Each scope in THROTTLE_RATES allows a number of requests per period of
+seconds, counted per logged in user, or per client IP for anonymous requests.
+Views opt in with the throttle decorator, and requests over the limit are
+answered with 429 and a Retry-After header.
+
+The backend class is set by THROTTLE_BACKEND. The in-process backend keeps a
+token bucket per client in memory and only counts the requests of its own
+process; the cache backend keeps sliding window counters in the default cache,
+shared by every process that uses the same cache.
+"""
+import asyncio
+import math
+import threading
+import time
+from functools import lru_cache, wraps
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from django.utils.module_loading import import_string
+
+class InProcessThrottle:
+    """Token buckets held in memory, of which the THROTTLE_MAX_CLIENTS most recently used are kept."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def hit(self, key, limit, period):
+        """Takes a token from the bucket of key; returns the seconds until one is available if it is empty, or None."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (limit, now))
+            tokens = min(limit, tokens + (now - updated) * limit / period)
+            retry_after = None
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                retry_after = (1 - tokens) * period / limit
+            # Reinserted last, so the dict stays ordered from least to most recently used.
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > settings.THROTTLE_MAX_CLIENTS:
+                del self._buckets[next(iter(self._buckets))]
+        return retry_after
+
+    def reset(self):
+        """Forgets every bucket."""
+        with self._lock:
+            self._buckets.clear()
+
+class CacheThrottle:
+    """Sliding window counters in the default cache.
+
+    Requests are counted in fixed windows of one period. The count of the
+    previous window is weighted by how much of it still overlaps the sliding
+    window that ends now.
+    """
+
+    def hit(self, key, limit, period):
+        """Counts a request for key; returns the seconds until one would be allowed if it is over limit, or None."""
+        now = time.time()
+        window, offset = divmod(now, period)
+        current_key = f'throttle:{key}:{period}:{int(window)}'
+        cache.add(current_key, 0, timeout=2 * period)
+        try:
+            count = cache.incr(current_key)
+        except ValueError:
+            # Evicted since it was added.
+            cache.set(current_key, 1, timeout=2 * period)
+            count = 1
+        previous = cache.get(f'throttle:{key}:{period}:{int(window) - 1}', 0)
+        remaining = 1 - offset / period
+        if previous * remaining + count <= limit:
+            return None
+        # Rejected requests are not counted.
+        cache.decr(current_key)
+        if count > limit:
+            return period - offset
+        # Wait until enough of the previous window has slid out to let one more request in.
+        return (remaining - (limit - count) / previous) * period
+
+@lru_cache(maxsize=None)
+def get_throttle():
+    """Returns the throttle backend configured by THROTTLE_BACKEND."""
+    return import_string(settings.THROTTLE_BACKEND)()
+
+def client_key(request):
+    """Returns the key requests are counted under: the logged in user, or else the client IP."""
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+def check_throttle(request, scope):
+    """Counts the request against the limit of scope; returns the seconds to wait if it is over, or None."""
+    if not settings.THROTTLE_ENABLED:
+        return None
+    limit, period = settings.THROTTLE_RATES[scope]
+    return get_throttle().hit(f'{scope}:{client_key(request)}', limit, period)
+
+def throttled_response(retry_after, as_json=False):
+    """Returns a 429 response asking the client to retry after the given seconds."""
+    seconds = max(1, math.ceil(retry_after))
+    message = f'Too many requests. Try again in {seconds} seconds.'
+    if as_json:
+        response = JsonResponse({'error': message}, status=429)
+    else:
+        response = HttpResponse(message, status=429, content_type='text/plain; charset=utf-8')
+    response['Retry-After'] = str(seconds)
+    return response
+
+def throttle(scope, methods=None, as_json=False):
+    """Decorator that limits the requests to a view by THROTTLE_RATES[scope].
+
+    Only requests with one of the given methods are counted, or all if methods
+    is None. as_json answers throttled requests with a JSON error.
+    """
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            @wraps(view)
+            async def throttled_view(request, *args, **kwargs):
+                if methods is None or request.method in methods:
+                    # request.user may still need to be read from the database.
+                    retry_after = await sync_to_async(check_throttle)(request, scope)
+                    if retry_after is not None:
+                        return throttled_response(retry_after, as_json)
+                return await view(request, *args, **kwargs)
+            return throttled_view
+
+        @wraps(view)
+        def throttled_view(request, *args, **kwargs):
+            if methods is None or request.method in methods:
+                retry_after = check_throttle(request, scope)
+                if retry_after is not None:
+                    return throttled_response(retry_after, as_json)
+            return view(request, *args, **kwargs)
+        return throttled_view
+    return decorator
@@ -0,0 +1,85 @@
+"""Cheap relative formatting of post timestamps.
+
+RelativeTimeFormatter produces the same text as humanize's naturaltime for past
+times, but takes "now" once for a whole page, buckets each timestamp with
+integer arithmetic over a precomputed unit table and translates each distinct
+bucket only once.
+"""
+import calendar
+from datetime import timedelta
+from functools import lru_cache
+from django.contrib.humanize.templatetags.humanize import NaturalTimeFormatter
+from django.utils import timezone
+from django.utils.html import avoid_wrapping
+from django.utils.timesince import TIMESINCE_CHUNKS
+from django.utils.translation import get_language, gettext
+
+def bucket_for(seconds):
+    """Returns the display bucket of a time that is the given number of whole seconds in the past.
+
+    Buckets are ('now',), ('second', n), ('minute', n), ('hour', n) under a day,
+    and otherwise up to two adjacent (unit, n) pairs, as naturaltime shows them.
+    """
+    if seconds <= 0:
+        return ('now',)
+    if seconds < 60:
+        return ('second', seconds)
+    if seconds < 60 * 60:
+        return ('minute', seconds // 60)
+    if seconds < 60 * 60 * 24:
+        return ('hour', seconds // (60 * 60))
+    for index, (unit_seconds, name) in enumerate(TIMESINCE_CHUNKS):
+        count = seconds // unit_seconds
+        if count:
+            break
+    bucket = (name, count)
+    remainder = seconds - count * unit_seconds
+    if index + 1 < len(TIMESINCE_CHUNKS):
+        next_seconds, next_name = TIMESINCE_CHUNKS[index + 1]
+        next_count = remainder // next_seconds
+        if next_count:
+            bucket += (next_name, next_count)
+    return bucket
+
+def leap_days(since, until):
+    """Returns the leap days that timesince leaves out of the time between two datetimes."""
+    days = calendar.leapdays(since.year, until.year)
+    if days != 0:
+        if calendar.isleap(since.year):
+            days -= 1
+        elif calendar.isleap(until.year):
+            days += 1
+    return days
+
+@lru_cache(maxsize=4096)
+def _bucket_text(language, bucket):
+    """Returns the translated text of a bucket; language only keys the cache."""
+    strings = NaturalTimeFormatter.time_strings
+    if bucket[0] == 'now':
+        return str(strings['now'])
+    if len(bucket) == 2 and bucket[0] in ('second', 'minute', 'hour'):
+        name, count = bucket
+        return str(strings[f'past-{name}'] % {'count': count})
+    parts = [
+        avoid_wrapping(NaturalTimeFormatter.past_substrings[name] % count)
+        for name, count in zip(bucket[0::2], bucket[1::2])
+    ]
+    return str(strings['past-day'] % {'delta': gettext(', ').join(parts)})
+
+class RelativeTimeFormatter:
+    """Formats timestamps as text like '5 minutes ago', relative to a single fixed now."""
+
+    def __init__(self, now=None):
+        self.now = now or timezone.now()
+        self.language = get_language()
+
+    def __call__(self, value):
+        delta = self.now - value
+        if delta.days > 0:
+            # naturaltime goes through timesince for times over a day ago, which leaves out leap days.
+            delta -= timedelta(days=leap_days(value, self.now))
+        return _bucket_text(self.language, bucket_for(delta.days * 24 * 60 * 60 + delta.seconds))
+
+def absolute_time(value):
+    """Formats a timestamp as an absolute UTC time, for formatting on the client."""
+    return value.astimezone(timezone.utc).strftime('%Y-%m-%d %H:%M UTC')
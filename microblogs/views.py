@@ -1,20 +1,32 @@
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout, update_session_auth_hash
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.views import redirect_to_login
 from django.core.exceptions import ImproperlyConfigured
-from django.http import Http404
+from django.http import Http404, HttpResponseNotAllowed, JsonResponse
 from django.shortcuts import redirect, render
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.views import View
 from django.views.generic import ListView
 from django.views.generic.detail import DetailView
 from django.views.generic.edit import FormView, UpdateView
+from .auth import get_user
+from .db import read_from_replica
 from .forms import SignUpForm, LogInForm, PostForm, ProfileUpdateForm, PasswordUpdateForm
-from .models import User, Post
-from .helpers import login_prohibited, LoginProhibitedMixin
+from .hashers import authenticate_offloaded
+from .models import USER_LIST, User, Post
+from .fragments import render_post_rows
+from .helpers import login_prohibited, attach_author_cards, LoginProhibitedMixin
+from .live import get_broker
+from .pagination import CursorPaginator, KeysetPaginator, cursor_paginator, decode_cursor, encode_cursor
+from .search import get_search_index, in_rank_order
+from .templatetags.microblogs_tags import timestamp_formatter
+from .throttling import throttle
 
 @login_prohibited
 def home(request):
@@ -22,6 +34,7 @@ def home(request):
     return render(request, 'home.html')
 
 
+@method_decorator(throttle('log_in', methods=('POST',)), name='dispatch')
 class LogInView(LoginProhibitedMixin, View):
     """View that handles log in."""
     http_method_names = ['get', 'post']
@@ -49,6 +62,28 @@ class LogInView(LoginProhibitedMixin, View):
         return render(self.request, 'log_in.html', {'form': form, 'next': next})
 
 
+@throttle('log_in', methods=('POST',))
+async def log_in_async(request):
+    """Async variant of LogInView, which checks the password on the password hashing threads."""
+    if request.method not in ('GET', 'POST'):
+        return HttpResponseNotAllowed(['GET', 'POST'])
+    if await authenticate_async(request):
+        return redirect(settings.REDIRECT_URL_WHEN_LOGGED_IN)
+    if request.method == 'GET':
+        next = request.GET.get('next') or ''
+        return render(request, 'log_in.html', {'form': LogInForm(), 'next': next})
+    form = LogInForm(request.POST)
+    next = request.POST.get('next') or settings.REDIRECT_URL_WHEN_LOGGED_IN
+    user = None
+    if form.is_valid():
+        user = await authenticate_offloaded(form.cleaned_data.get('username'), form.cleaned_data.get('password'))
+    if user is not None:
+        await sync_to_async(login)(request, user)
+        return redirect(next)
+    messages.add_message(request, messages.ERROR, "The username/password provided were invalid.")
+    return render(request, 'log_in.html', {'form': LogInForm(), 'next': next})
+
+
 def log_out(request):
     """View for getting the log out page, which redirects to home."""
     logout(request)
@@ -70,17 +105,85 @@ class SignUpView(LoginProhibitedMixin, FormView):
         return reverse(settings.REDIRECT_URL_WHEN_LOGGED_IN)
 
 
+@read_from_replica
 @login_required
 def feed(request):
     """View for getting the user's main feed."""
+    return render(request, 'feed.html', feed_context(request))
+
+
+def feed_context(request):
+    """Returns the template context of the feed, with every query already run."""
     form = PostForm()
     current_user = request.user
-    authors = list(current_user.followees.all()) + [current_user]
-    posts = Post.objects.filter(author__in=authors)
-    return render(request, 'feed.html', {'form': form, 'user': current_user, 'posts': posts})
+    paginator = cursor_paginator(
+        [posts.with_authors() for posts in current_user.timeline_shards()],
+        per_page=settings.POSTS_PER_PAGE,
+        key=('timeline_created_at', 'timeline_post_id'),
+    )
+    posts = paginator.page(before=request.GET.get('before'), after=request.GET.get('after'))
+    attach_author_cards(posts)
+    context = {'form': form, 'user': current_user, 'posts': posts, 'live_cursor': None}
+    if settings.LIVE_UPDATES_ENABLED and not posts.has_newer:
+        # The newest page waits for posts newer than its first one.
+        if posts:
+            context['live_cursor'] = encode_cursor(posts[0].timeline_created_at, posts[0].timeline_post_id)
+        else:
+            context['live_cursor'] = encode_cursor(timezone.now(), 0)
+    return context
+
+
+async def feed_updates(request):
+    """View that waits for posts newer than the after cursor to reach the user's feed.
+
+    Responds with the table rows of the new posts and the cursor to wait from
+    next, or with no rows once LIVE_UPDATES_TIMEOUT seconds pass without any.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    user = await sync_to_async(get_user)(request)
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    after = request.GET.get('after') or ''
+    if decode_cursor(after) is None:
+        return JsonResponse({'error': 'A valid after cursor is required.'}, status=400)
+    broker = get_broker()
+    # Subscribe before reading, so a post committed in between still wakes the wait.
+    subscription = broker.subscribe(user.pk)
+    try:
+        update = await sync_to_async(feed_update)(request, user, after)
+        if update is None and await subscription.wait(settings.LIVE_UPDATES_TIMEOUT):
+            update = await sync_to_async(feed_update)(request, user, after)
+    finally:
+        broker.unsubscribe(subscription)
+    return JsonResponse(update or {'html': '', 'count': 0, 'newer': after, 'more': False})
+
+
+def feed_update(request, user, after):
+    """Returns the rows of the oldest page of posts newer than the after cursor, or None if there are none."""
+    paginator = cursor_paginator(
+        [posts.with_authors() for posts in user.timeline_shards()],
+        per_page=settings.POSTS_PER_PAGE,
+        key=('timeline_created_at', 'timeline_post_id'),
+    )
+    posts = list(paginator.queryset_for(after=after))
+    if not posts:
+        return None
+    more = len(posts) > paginator.per_page
+    posts = posts[:paginator.per_page]
+    newest = posts[-1]
+    posts.reverse()
+    attach_author_cards(posts)
+    return {
+        'html': render_post_rows(posts, timestamp_formatter(request)),
+        'count': len(posts),
+        'newer': encode_cursor(newest.timeline_created_at, newest.timeline_post_id),
+        'more': more,
+    }
 
 
 @login_required
+@throttle('follow')
 def follow_toggle(request, user_id):
     current_user = request.user
     try:
@@ -92,6 +195,7 @@ def follow_toggle(request, user_id):
         return redirect('show_user', user_id=user_id)
 
 
+@throttle('new_post', methods=('POST',))
 def new_post(request):
     """View for posting a Post from a user."""
     if request.method == 'POST':
@@ -106,14 +210,33 @@ def new_post(request):
     return redirect('feed')
 
 
+@method_decorator(read_from_replica, name='dispatch')
 class UserListView(LoginRequiredMixin, ListView):
     """View that shows a list of all users."""
     model = User
     template_name = 'user_list.html'
     context_object_name = 'users'
     paginate_by = settings.USERS_PER_PAGE
+    ordering = ('last_name', 'first_name', 'id')
 
+    def get_paginator(self, queryset, per_page, **kwargs):
+        return KeysetPaginator(
+            queryset,
+            per_page,
+            key=self.ordering,
+            name=USER_LIST,
+            timeout=settings.USER_LIST_CACHE_TIMEOUT,
+            **kwargs,
+        )
 
+    def get_context_data(self, *args, **kwargs):
+        """Generate content to be displayed in the template."""
+        context = super().get_context_data(*args, **kwargs)
+        context['following_ids'] = self.request.user.following_ids(context['users'])
+        return context
+
+
+@method_decorator(read_from_replica, name='dispatch')
 class ShowUserView(LoginRequiredMixin, DetailView):
     """View that shows individual user details."""
     model = User
@@ -124,8 +247,13 @@ class ShowUserView(LoginRequiredMixin, DetailView):
     def get_context_data(self, *args, **kwargs):
         """Generate content to be displayed in the template."""
         context = super().get_context_data(*args, **kwargs)
-        user = self.get_object()
-        context['posts'] = Post.objects.filter(author=user)
+        user = self.object
+        posts = Post.objects.filter(author=user).with_authors()
+        paginator = CursorPaginator(posts, per_page=settings.POSTS_PER_PAGE)
+        context['posts'] = attach_author_cards(paginator.page(
+            before=self.request.GET.get('before'),
+            after=self.request.GET.get('after'),
+        ))
         context['following'] = self.request.user.is_following(user)
         context['followable'] = (self.request.user != user)
         return context
@@ -137,6 +265,96 @@ class ShowUserView(LoginRequiredMixin, DetailView):
             return redirect('user_list')
 
 
+async def authenticate_async(request):
+    """Loads the user of the request off the event loop, and returns whether they are logged in."""
+    user = await sync_to_async(get_user)(request)
+    # Replace the lazy user, so templates rendered in the event loop do not query for it.
+    request.user = user
+    return user.is_authenticated
+
+
+def list_view_context(view_class, request, **kwargs):
+    """Returns the template context of a ListView, with the page of objects read."""
+    view = view_class()
+    view.setup(request, **kwargs)
+    view.object_list = view.get_queryset()
+    context = view.get_context_data()
+    page = context['page_obj']
+    if page is not None:
+        page.object_list = list(page.object_list)
+        context['object_list'] = context[view.context_object_name] = page.object_list
+    return context
+
+
+def detail_view_context(view_class, request, **kwargs):
+    """Returns the template context of a DetailView; raises Http404 if its object does not exist."""
+    view = view_class()
+    view.setup(request, **kwargs)
+    view.object = view.get_object()
+    return view.get_context_data(object=view.object)
+
+
+@read_from_replica
+async def feed_async(request):
+    """Async variant of feed, which runs its queries on the sync thread and renders in the event loop."""
+    if not await authenticate_async(request):
+        return redirect_to_login(request.get_full_path())
+    context = await sync_to_async(feed_context)(request)
+    return render(request, 'feed.html', context)
+
+
+@read_from_replica
+async def user_list_async(request):
+    """Async variant of UserListView."""
+    if not await authenticate_async(request):
+        return redirect_to_login(request.get_full_path())
+    context = await sync_to_async(list_view_context)(UserListView, request)
+    return render(request, UserListView.template_name, context)
+
+
+@read_from_replica
+async def show_user_async(request, user_id):
+    """Async variant of ShowUserView."""
+    if not await authenticate_async(request):
+        return redirect_to_login(request.get_full_path())
+    try:
+        context = await sync_to_async(detail_view_context)(ShowUserView, request, user_id=user_id)
+    except Http404:
+        return redirect('user_list')
+    return render(request, ShowUserView.template_name, context)
+
+
+@login_required
+def search(request):
+    """View for searching posts and users."""
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
+    per_page = settings.SEARCH_RESULTS_PER_PAGE
+    users = []
+    posts = []
+    has_next = False
+    if query:
+        index = get_search_index()
+        if page == 1:
+            user_ids = index.search_users(query, 0, settings.SEARCH_USERS_SHOWN)
+            users = in_rank_order(User.objects.all(), user_ids)
+        # One extra result shows whether there is a next page, without counting every match.
+        post_ids = index.search_posts(query, (page - 1) * per_page, per_page + 1)
+        has_next = len(post_ids) > per_page
+        posts = attach_author_cards(in_rank_order(Post.objects.with_authors(), post_ids[:per_page]))
+    return render(request, 'search.html', {
+        'query': query,
+        'users': users,
+        'posts': posts,
+        'page': page,
+        'has_previous': page > 1,
+        'has_next': has_next,
+    })
+
+
 class ProfileUpdateView(LoginRequiredMixin, UpdateView):
     """View to update logged-in user's profile."""
     model = ProfileUpdateForm
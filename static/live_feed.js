@@ -0,0 +1,35 @@
+// Waits for new posts on the newest feed page and adds their rows to the top of the table.
+(function () {
+  var feed = document.getElementById('live-feed');
+  if (!feed || !feed.dataset.updatesUrl) {
+    return;
+  }
+  var table = feed.querySelector('table');
+
+  function poll() {
+    var url = feed.dataset.updatesUrl + '?after=' + encodeURIComponent(feed.dataset.cursor);
+    fetch(url, { credentials: 'same-origin' })
+      .then(function (response) {
+        if (!response.ok) {
+          throw new Error(response.status);
+        }
+        return response.json();
+      })
+      .then(function (update) {
+        if (update.count) {
+          table.insertAdjacentHTML('afterbegin', update.html);
+          if (window.formatRelativeTimes) {
+            window.formatRelativeTimes(table);
+          }
+        }
+        feed.dataset.cursor = update.newer;
+        poll();
+      })
+      .catch(function () {
+        // Back off before retrying after a failed request.
+        setTimeout(poll, 5000);
+      });
+  }
+
+  poll();
+})();
@@ -0,0 +1,24 @@
+// Formats post timestamps sent as absolute times relative to the reader's clock.
+(function () {
+  var units = [
+    ['year', 365 * 24 * 3600], ['month', 30 * 24 * 3600], ['week', 7 * 24 * 3600],
+    ['day', 24 * 3600], ['hour', 3600], ['minute', 60], ['second', 1]
+  ];
+  var format = new Intl.RelativeTimeFormat(document.documentElement.lang || undefined, { numeric: 'auto' });
+
+  function formatRelativeTimes(root) {
+    root.querySelectorAll('time[data-client-relative]').forEach(function (element) {
+      var seconds = (new Date(element.getAttribute('datetime')) - Date.now()) / 1000;
+      for (var i = 0; i < units.length; i++) {
+        if (Math.abs(seconds) >= units[i][1] || units[i][0] === 'second') {
+          element.textContent = format.format(Math.round(seconds / units[i][1]), units[i][0]);
+          element.title = element.getAttribute('datetime');
+          return;
+        }
+      }
+    });
+  }
+
+  window.formatRelativeTimes = formatRelativeTimes;
+  formatRelativeTimes(document);
+})();